@@ -1,51 +1,89 @@
-import time
+import hashlib
 from datetime import timedelta
+from typing import Union
+from urllib.parse import urlencode
 
-from apscheduler import events
-from apscheduler.schedulers.background import BackgroundScheduler
+from django import db
 from django.conf import settings
-from django.contrib import admin, messages
-from django.db.models import Avg
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db.models import Avg, Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.utils import timezone
-from django.utils.html import format_html
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.html import format_html, format_html_join
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 
-from django_apscheduler.models import DjangoJob, DjangoJobExecution
+from django_apscheduler.models import (
+    DjangoJob,
+    DjangoJobExecution,
+    DjangoJobExecutionProfile,
+    TIME_SERIES_RESOLUTIONS,
+)
 from django_apscheduler import util
-from django_apscheduler.jobstores import DjangoJobStore, DjangoMemoryJobStore
 
 
 @admin.register(DjangoJob)
 class DjangoJobAdmin(admin.ModelAdmin):
     search_fields = ["id"]
-    list_display = ["id", "local_run_time", "average_duration"]
+    list_display = [
+        "id",
+        "local_run_time",
+        "last_run_time",
+        "last_status",
+        "error_rate",
+        "average_duration",
+    ]
 
     def __init__(self, model, admin_site):
         super().__init__(model, admin_site)
 
-        self._django_jobstore = DjangoJobStore()
-        self._memory_jobstore = DjangoMemoryJobStore()
-
-        self._jobs_scheduled = None
-        self._jobs_executed = None
-        self._job_execution_timeout = getattr(
-            settings, "APSCHEDULER_RUN_NOW_TIMEOUT", 15
+        self._profile_runs = getattr(settings, "APSCHEDULER_PROFILE_RUNS", 5)
+        self._error_rate_window = getattr(
+            settings, "APSCHEDULER_ERROR_RATE_WINDOW", 86_400
         )
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
 
-        self.avg_duration_qs = (
-            DjangoJobExecution.objects.filter(
-                job_id__in=qs.values_list("id", flat=True)
-            )
-            .order_by("job_id")
-            .values_list("job")
-            .annotate(avg_duration=Avg("duration"))
+        # Calculate the health of each job as part of the same query that retrieves the jobs, so that the number of
+        # queries does not depend on the number of jobs that are displayed.
+        executions = DjangoJobExecution.objects.filter(job_id=OuterRef("pk"))
+        latest_execution = executions.order_by("-run_time")
+        recent_executions = executions.filter(
+            run_time__gte=timezone.now() - timedelta(seconds=self._error_rate_window)
         )
 
-        return qs
+        def aggregate(queryset, expression):
+            return Subquery(
+                queryset.order_by()
+                .values("job_id")
+                .annotate(value=expression)
+                .values("value")
+            )
+
+        return qs.annotate(
+            last_run=Subquery(latest_execution.values("run_time")[:1]),
+            last_run_status=Subquery(latest_execution.values("status")[:1]),
+            avg_duration=aggregate(executions, Avg("duration")),
+            recent_runs=Coalesce(aggregate(recent_executions, Count("pk")), 0),
+            recent_errors=Coalesce(
+                aggregate(
+                    recent_executions.filter(status=DjangoJobExecution.ERROR),
+                    Count("pk"),
+                ),
+                0,
+            ),
+        )
 
     def local_run_time(self, obj):
         if obj.next_run_time:
@@ -53,83 +91,213 @@ class DjangoJobAdmin(admin.ModelAdmin):
 
         return "(paused)"
 
+    def last_run_time(self, obj):
+        if obj.last_run:
+            return util.get_local_dt_format(obj.last_run)
+
+        return "None"
+
+    def last_status(self, obj):
+        if obj.last_run_status is None:
+            return "None"
+
+        return format_html(
+            '<p style="color: {}">{}</p>',
+            DjangoJobExecutionAdmin.status_color_mapping[obj.last_run_status],
+            obj.last_run_status,
+        )
+
+    def error_rate(self, obj):
+        if not obj.recent_runs:
+            return "N/A"
+
+        return f"{obj.recent_errors / obj.recent_runs:.1%}"
+
     def average_duration(self, obj):
-        try:
-            return self.avg_duration_qs.get(job_id=obj.id)[1]
-        except DjangoJobExecution.DoesNotExist:
+        if obj.avg_duration is None:
             return "None"
 
+        return obj.avg_duration
+
+    last_run_time.short_description = _("Last run time")
+    last_run_time.admin_order_field = "last_run"
+    last_status.short_description = _("Last status")
+    last_status.admin_order_field = "last_run_status"
+    error_rate.short_description = _("Error rate")
     average_duration.short_description = _("Average Duration (sec)")
+    average_duration.admin_order_field = "avg_duration"
 
-    actions = ["run_selected_jobs"]
+    actions = ["run_selected_jobs", "profile_selected_jobs"]
 
     def run_selected_jobs(self, request, queryset):
-        scheduler = BackgroundScheduler()
-        scheduler.add_jobstore(self._memory_jobstore)
-        scheduler.add_listener(self._handle_execution_event, events.EVENT_JOB_EXECUTED)
-
-        scheduler.start()
-
-        self._jobs_scheduled = set()
-        self._jobs_executed = set()
-        start_time = timezone.now()
-
-        for item in queryset:
-            django_job = self._django_jobstore.lookup_job(item.id)
-
-            if not django_job:
-                msg = _("Could not find job {} in the database! Skipping execution...")
-                self.message_user(request, format_html(msg, item.id), messages.WARNING)
-                continue
-
-            scheduler.add_job(
-                django_job.func_ref,
-                trigger=None,  # Run immediately
-                args=django_job.args,
-                kwargs=django_job.kwargs,
-                id=django_job.id,
-                name=django_job.name,
-                misfire_grace_time=django_job.misfire_grace_time,
-                coalesce=django_job.coalesce,
-                max_instances=django_job.max_instances,
-            )
+        requested_at = timezone.now()
+        # The scheduler picks up the run requests and submits the jobs to its executors (see `DjangoJobStore`).
+        updated = queryset.update(run_requested_at=requested_at)
+
+        self.message_user(
+            request,
+            format_html(
+                _(
+                    "Requested {} job(s) to run. Their executions will be listed below as soon as they are picked up "
+                    "by the scheduler."
+                ),
+                updated,
+            ),
+        )
 
-            self._jobs_scheduled.add(django_job.id)
+        # Track the progress of the requested runs on the job executions page
+        url = reverse(
+            f"{self.admin_site.name}:django_apscheduler_djangojobexecution_changelist"
+        )
+        query = urlencode(
+            {
+                "job__id__in": ",".join(queryset.values_list("id", flat=True)),
+                "run_time__gte": requested_at.isoformat(),
+            }
+        )
+        return HttpResponseRedirect(f"{url}?{query}")
 
-        while self._jobs_scheduled != self._jobs_executed:
-            # Wait for selected jobs to be executed.
-            if timezone.now() > start_time + timedelta(
-                seconds=self._job_execution_timeout
-            ):
-                msg = _(
-                    "Maximum runtime of {} seconds exceeded! Not all jobs could be completed successfully. "
-                    "Pending jobs: {}"
+    run_selected_jobs.short_description = _("Run the selected django jobs")
+
+    def profile_selected_jobs(self, request, queryset):
+        updated = queryset.update(profile_runs=self._profile_runs)
+
+        self.message_user(
+            request,
+            format_html(
+                _("The next {} runs of {} job(s) will be profiled."),
+                self._profile_runs,
+                updated,
+            ),
+        )
+
+    profile_selected_jobs.short_description = _(
+        "Profile the next runs of the selected django jobs"
+    )
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids counting every row of very large tables.
+
+    Unfiltered querysets use the row count estimate that is maintained by the database backend (PostgreSQL and MySQL
+    only). Otherwise, the rows are only counted up to `settings.APSCHEDULER_ADMIN_COUNT_LIMIT`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.count_limit = getattr(settings, "APSCHEDULER_ADMIN_COUNT_LIMIT", 10_000)
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+
+        if not queryset.query.where:
+            estimate = self._get_estimated_count()
+            if estimate is not None and estimate > self.count_limit:
+                return estimate
+
+        return queryset[: self.count_limit].count()
+
+    def _get_estimated_count(self) -> Union[int, None]:
+        connection = db.connections[self.object_list.db]
+        table = self.object_list.model._meta.db_table
+
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [table]
                 )
-                self.message_user(
-                    request,
-                    format_html(
-                        msg,
-                        self._job_execution_timeout,
-                        ",".join(self._jobs_scheduled - self._jobs_executed),
-                    ),
-                    messages.ERROR,
+            elif connection.vendor == "mysql":
+                cursor.execute(
+                    "SELECT table_rows FROM information_schema.tables "
+                    "WHERE table_schema = DATABASE() AND table_name = %s",
+                    [table],
                 )
-
-                scheduler.shutdown(wait=False)
+            else:
                 return None
 
-            time.sleep(0.1)
+            row = cursor.fetchone()
 
-        for job_id in self._jobs_executed:
-            self.message_user(request, format_html(_("Executed job '{}'!"), job_id))
+        # PostgreSQL reports -1 for tables that have never been analyzed
+        if row is None or row[0] is None or row[0] < 0:
+            return None
 
-        scheduler.shutdown()
-        return None
+        return int(row[0])
 
-    def _handle_execution_event(self, event: events.JobExecutionEvent):
-        self._jobs_executed.add(event.job_id)
 
-    run_selected_jobs.short_description = _("Run the selected django jobs")
+class KeysetChangeList(ChangeList):
+    """
+    Changelist that pages through job executions by seeking past the last job execution of the previous page (using
+    the `(run_time, id)` index), instead of skipping over all of the preceding job executions with an OFFSET. The cost of
+    retrieving a page therefore does not depend on how deep into the changelist that page is.
+
+    Only the default `(-run_time, -id)` ordering is paged in this way. Numbered pages are used when the changelist is
+    sorted on another column.
+    """
+
+    # Query string parameter that holds the `run_time` and `id` of the last job execution on the previous page
+    CURSOR_VAR = "cursor"
+
+    keyset_ordering = ["-run_time", "-pk"]
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(self.CURSOR_VAR, None)
+
+        return lookup_params
+
+    def get_results(self, request):
+        self.seek = list(self.queryset.query.order_by) == self.keyset_ordering
+        self.cursor = self.params.get(self.CURSOR_VAR) if self.seek else None
+        if self.seek:
+            # Page numbers are not used when seeking
+            self.page_num = 1
+
+        super().get_results(request)
+
+        if self.seek and self.show_all and self.can_show_all:
+            self.seek = False
+
+        if not self.seek:
+            return
+
+        queryset = self.queryset
+        if self.cursor:
+            run_time, pk = self.parse_cursor(self.cursor)
+            queryset = queryset.filter(
+                Q(run_time__lt=run_time) | Q(run_time=run_time, pk__lt=pk)
+            )
+
+        # Retrieve one extra job execution to find out whether there is a next page
+        result_list = list(queryset[: self.list_per_page + 1])
+        has_next = len(result_list) > self.list_per_page
+        self.result_list = result_list[: self.list_per_page]
+        self.multi_page = bool(self.cursor) or has_next
+
+        self.first_page_url = self.get_query_string(remove=[self.CURSOR_VAR, PAGE_VAR])
+        self.next_page_url = None
+        if has_next:
+            last = self.result_list[-1]
+            self.next_page_url = self.get_query_string(
+                {self.CURSOR_VAR: f"{last.run_time.isoformat()},{last.pk}"},
+                [PAGE_VAR],
+            )
+
+    @staticmethod
+    def parse_cursor(cursor: str):
+        try:
+            run_time, pk = cursor.rsplit(",", 1)
+            run_time = parse_datetime(run_time)
+            pk = int(pk)
+        except ValueError:
+            raise IncorrectLookupParameters
+
+        if run_time is None:
+            raise IncorrectLookupParameters
+
+        return run_time, pk
 
 
 @admin.register(DjangoJobExecution)
@@ -142,8 +310,122 @@ class DjangoJobExecutionAdmin(admin.ModelAdmin):
         DjangoJobExecution.ERROR: "red",
     }
 
-    list_display = ["id", "job", "html_status", "local_run_time", "duration_text"]
-    list_filter = ["job__id", "run_time", "status"]
+    list_display = [
+        "id",
+        "job",
+        "html_status",
+        "local_run_time",
+        "duration_text",
+        "cpu_time_text",
+        "db_query_count",
+        "slow",
+    ]
+    # Filtering on a particular job is done via the search box (or the `job__id__in` query string parameter): listing
+    # every job ID in the filter sidebar does not scale to large numbers of jobs.
+    list_filter = ["run_time", "status", "slow"]
+    search_fields = ["job__id"]
+    search_help_text = _("Search by exact job ID.")
+
+    # The changelist is ordered on `(-run_time, -id)`, which is served by the corresponding index. Avoid counting
+    # every row in the table.
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # Time range that is covered by the time series view for each resolution
+    time_series_windows = {
+        "minute": timedelta(hours=1),
+        "hour": timedelta(days=2),
+        "day": timedelta(days=30),
+    }
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path(
+                "time_series/",
+                self.admin_site.admin_view(self.time_series_view),
+                name="%s_%s_time_series" % info,
+            ),
+        ] + super().get_urls()
+
+    def time_series_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        resolution = request.GET.get("resolution", "hour")
+        if resolution not in TIME_SERIES_RESOLUTIONS:
+            resolution = "hour"
+
+        job_id = request.GET.get("job") or None
+
+        # The time series are aggregated in the database, but still cache them briefly so that repeatedly refreshing the
+        # page does not put additional load on the database.
+        cache_key = "django_apscheduler:time_series:{}:{}".format(
+            resolution, hashlib.md5(str(job_id).encode()).hexdigest()
+        )
+        time_series = cache.get(cache_key)
+        if time_series is None:
+            end = timezone.now()
+            time_series = DjangoJobExecution.objects.get_time_series(
+                end - self.time_series_windows[resolution], end, resolution, job_id
+            )
+            cache.set(
+                cache_key,
+                time_series,
+                getattr(settings, "APSCHEDULER_TIME_SERIES_CACHE_TIMEOUT", 60),
+            )
+
+        statuses = list(self.status_color_mapping)
+        dt_format = util.get_dt_format()
+
+        jobs = []
+        for job_id_, buckets in time_series.items():
+            max_total = max(bucket["total"] for bucket in buckets)
+            rows = []
+            for bucket in buckets:
+                error_rate = (
+                    bucket["statuses"][DjangoJobExecution.ERROR] / bucket["total"]
+                )
+                rows.append(
+                    {
+                        "start": util.get_local_dt_format(bucket["bucket"], dt_format),
+                        "total": bucket["total"],
+                        "width": round(bucket["total"] / max_total * 100),
+                        "counts": [bucket["statuses"][status] for status in statuses],
+                        "error_rate": f"{error_rate:.1%}",
+                        "avg_duration": bucket["avg_duration"],
+                    }
+                )
+
+            jobs.append({"id": job_id_, "buckets": rows})
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": _("Job execution time series"),
+            "resolution": resolution,
+            "resolutions": TIME_SERIES_RESOLUTIONS,
+            "job_id": job_id,
+            "statuses": statuses,
+            "jobs": jobs,
+        }
+
+        return TemplateResponse(
+            request,
+            "admin/django_apscheduler/djangojobexecution/time_series.html",
+            context,
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        # Match job IDs exactly, so that the index on `job_id` can be used instead of scanning the whole table.
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        return queryset.filter(job_id=search_term), False
 
     def html_status(self, obj):
         return mark_safe(
@@ -156,5 +438,52 @@ class DjangoJobExecutionAdmin(admin.ModelAdmin):
     def duration_text(self, obj):
         return obj.duration or "N/A"
 
+    def cpu_time_text(self, obj):
+        if obj.cpu_user_time is None:
+            return "N/A"
+
+        return obj.cpu_user_time + (obj.cpu_system_time or 0)
+
     html_status.short_description = _("Status")
     duration_text.short_description = _("Duration (sec)")
+    cpu_time_text.short_description = _("CPU time (sec)")
+
+
+@admin.register(DjangoJobExecutionProfile)
+class DjangoJobExecutionProfileAdmin(admin.ModelAdmin):
+    list_display = ["execution", "job", "local_run_time"]
+    list_select_related = ["execution"]
+    fields = ["execution", "top_functions"]
+    readonly_fields = ["execution", "top_functions"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def job(self, obj):
+        return obj.execution.job_id
+
+    def local_run_time(self, obj):
+        return util.get_local_dt_format(obj.execution.run_time)
+
+    def top_functions(self, obj):
+        rows = format_html_join(
+            "",
+            "<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>",
+            (
+                (func, num_calls, f"{total_time:.6f}", f"{cumulative_time:.6f}")
+                for func, num_calls, total_time, cumulative_time in obj.get_top_functions()
+            ),
+        )
+        return format_html(
+            "<table><thead><tr><th>{}</th><th>{}</th><th>{}</th><th>{}</th></tr></thead>"
+            "<tbody>{}</tbody></table>",
+            _("Function"),
+            _("Calls"),
+            _("Total time (sec)"),
+            _("Cumulative time (sec)"),
+            rows,
+        )
+
+    job.short_description = _("Job")
+    local_run_time.short_description = _("Run time")
+    top_functions.short_description = _("Top functions by cumulative time")
@@ -0,0 +1,362 @@
+import gzip
+import hashlib
+import itertools
+import json
+import logging
+import lzma
+import os
+import uuid
+from pathlib import Path
+from typing import List, Tuple, Union
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+from django_apscheduler.models import DjangoJob, DjangoJobExecution
+
+logger = logging.getLogger(__name__)
+
+# Supported compression formats: file extension, function for compressing a batch of job executions, and function for
+# opening the archive file.
+COMPRESSION_FORMATS = {
+    "gzip": (".jsonl.gz", gzip.compress, gzip.open),
+    "lzma": (".jsonl.xz", lzma.compress, lzma.open),
+}
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def _fsync(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_json_atomically(path: Path, data: dict):
+    # Write to a temporary file first, so that readers never see a partially written file
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(data, cls=DjangoJSONEncoder, indent=2))
+    _fsync(tmp_path)
+    os.replace(tmp_path, path)
+    if os.name == "posix":
+        # Also persist the directory entry of the file
+        _fsync(path.parent)
+
+
+def _sha256(path: Path, size: int) -> str:
+    checksum = hashlib.sha256()
+    with open(path, "rb") as f:
+        while size > 0:
+            chunk = f.read(min(size, 1024 * 1024))
+            if not chunk:
+                break
+
+            checksum.update(chunk)
+            size -= len(chunk)
+
+    return checksum.hexdigest()
+
+
+class JobExecutionArchiver:
+    """
+    Streams job executions to rotating, compressed JSON Lines files, and deletes them from the database once they have
+    been written to disk durably.
+
+    Each batch of job executions is appended to the current archive file as a separate gzip member / xz stream, which
+    is flushed to disk before the batch is deleted from the database. Each archive file is accompanied by a manifest
+    (`<archive file>.manifest.json`) that is updated atomically after every batch. It records the number of job
+    executions that the archive file contains, the range of primary keys and run times, and the size and SHA-256
+    checksum of the archive file.
+
+    A batch is only deleted from the database once it is recorded in the manifest. Until the deletion succeeds, the
+    manifest also records the primary keys of the batch as pending. If the archiver is interrupted in between, the next
+    archiver that writes to the same directory deletes the pending job executions before archiving anything else, so
+    that they are not archived twice.
+
+    Job executions are read in primary key order, one batch at a time, so memory usage is bounded by the batch size
+    regardless of the size of the table.
+
+    Usage::
+
+        with JobExecutionArchiver("/var/archive/apscheduler") as archiver:
+            archiver.archive(DjangoJobExecution.objects.filter(run_time__lte=cutoff))
+
+    :param directory: The directory to write archive files to. Will be created if it does not exist.
+    :param compression: One of 'gzip' or 'lzma'.
+    :param rows_per_file: The maximum number of job executions to write to each archive file.
+    :param batch_size: The number of job executions to read, and delete, at a time.
+    :param delete: Whether to delete job executions from the database after they have been archived. When disabled,
+    job executions that match more than one of the querysets passed to `archive` are archived more than once.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        compression: str = "gzip",
+        rows_per_file: int = 100_000,
+        batch_size: int = 1000,
+        delete: bool = True,
+    ):
+        if compression not in COMPRESSION_FORMATS:
+            raise ValueError(
+                f"Unsupported compression format '{compression}'. Expected one of {list(COMPRESSION_FORMATS)}."
+            )
+
+        self.directory = Path(directory)
+        self.compression = compression
+        self.rows_per_file = rows_per_file
+        self.batch_size = batch_size
+        self.delete = delete
+
+        self.manifests = []
+        self.rows_archived = 0
+
+        # Unique per archiver, so that archivers that are started at the same time never write to the same files
+        self._prefix = f"job_executions_{timezone.now().strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        self._deleted_pending = False
+        self._path = None
+        self._manifest = None
+        self._checksum = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Every batch that has been written is already recorded in the manifest of its archive file, so there is
+        # nothing to roll back if something went wrong.
+        self.close()
+
+    def archive(self, queryset: models.QuerySet) -> int:
+        """
+        Archive all of the job executions in `queryset`.
+
+        :return: The number of job executions that were archived.
+        """
+        if self.delete and not self._deleted_pending:
+            self._delete_pending()
+
+        fields = [field.attname for field in DjangoJobExecution._meta.concrete_fields]
+        queryset = queryset.order_by("pk").values(*fields)
+
+        archived = 0
+        last_pk = None
+
+        while True:
+            batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            rows = list(batch[: self.batch_size])
+            if not rows:
+                break
+
+            self._write_batch(rows)
+            archived += len(rows)
+            last_pk = rows[-1]["id"]
+
+            if len(rows) < self.batch_size:
+                break
+
+        return archived
+
+    def close(self):
+        """Finish writing the current archive file (if any)"""
+        if self._path is not None:
+            self._finish_file()
+
+    def _delete_pending(self):
+        """
+        Delete the job executions that a previous archiver recorded in a manifest, but was interrupted before it could
+        delete them from the database.
+        """
+        for manifest_path in sorted(self.directory.glob(f"*{MANIFEST_SUFFIX}")):
+            manifest = json.loads(manifest_path.read_text())
+            if not manifest.get("pending_ids"):
+                continue
+
+            deleted = DjangoJobExecution.objects.delete_batch(manifest["pending_ids"])
+            logger.warning(
+                f"Deleted {deleted} job executions that were archived to '{manifest['file']}' by an archiver that was "
+                f"interrupted."
+            )
+
+            manifest["pending_ids"] = []
+            _write_json_atomically(manifest_path, manifest)
+
+        self._deleted_pending = True
+
+    def _write_batch(self, rows: List[dict]):
+        while rows:
+            if self._path is None:
+                self._open_file()
+
+            capacity = self.rows_per_file - self._manifest["rows"]
+            self._append(rows[:capacity])
+            rows = rows[capacity:]
+
+            if self._manifest["rows"] >= self.rows_per_file:
+                self._finish_file()
+
+    def _append(self, rows: List[dict]):
+        _, compress, _ = COMPRESSION_FORMATS[self.compression]
+        data = compress(
+            b"".join(
+                json.dumps(row, cls=DjangoJSONEncoder).encode() + b"\n" for row in rows
+            )
+        )
+
+        ids = [row["id"] for row in rows]
+
+        with open(self._path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._checksum.update(data)
+
+        manifest = self._manifest
+        manifest["rows"] += len(rows)
+        manifest["size"] += len(data)
+        manifest["sha256"] = self._checksum.hexdigest()
+        manifest["first_id"] = manifest["first_id"] or ids[0]
+        manifest["last_id"] = ids[-1]
+        manifest["pending_ids"] = ids if self.delete else []
+
+        run_times = [row["run_time"] for row in rows]
+        if manifest["min_run_time"] is not None:
+            run_times.append(manifest["min_run_time"])
+        if manifest["max_run_time"] is not None:
+            run_times.append(manifest["max_run_time"])
+        manifest["min_run_time"] = min(run_times)
+        manifest["max_run_time"] = max(run_times)
+
+        self._write_manifest()
+
+        # The batch is only deleted once it is recorded in a durable manifest, so that a crash cannot lose job
+        # executions. If the archiver is interrupted before the deletion succeeds, the batch remains pending in the
+        # manifest (see `_delete_pending`).
+        if self.delete:
+            DjangoJobExecution.objects.delete_batch(ids)
+            manifest["pending_ids"] = []
+
+        self.rows_archived += len(rows)
+
+    def _open_file(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        extension, _, _ = COMPRESSION_FORMATS[self.compression]
+        path = self.directory / f"{self._prefix}_{len(self.manifests):04d}{extension}"
+        if path.with_name(path.name + MANIFEST_SUFFIX).exists():
+            raise FileExistsError(f"Archive manifest for '{path}' already exists!")
+
+        # Never append to (or overwrite) an archive file that was created by another archiver
+        open(path, "xb").close()
+
+        self._path = path
+        self._checksum = hashlib.sha256()
+        self._manifest = {
+            "file": self._path.name,
+            "compression": self.compression,
+            "created": timezone.now(),
+            "rows": 0,
+            "size": 0,
+            "sha256": self._checksum.hexdigest(),
+            "first_id": None,
+            "last_id": None,
+            "min_run_time": None,
+            "max_run_time": None,
+            "pending_ids": [],
+        }
+
+    def _write_manifest(self):
+        # Write the manifest atomically, so that a manifest only ever refers to batches that have been written to the
+        # archive file completely.
+        _write_json_atomically(
+            self._path.with_name(self._path.name + MANIFEST_SUFFIX), self._manifest
+        )
+
+    def _finish_file(self):
+        if self._manifest["rows"]:
+            # Persist that the last batch is no longer pending (if it has been deleted)
+            self._write_manifest()
+
+        logger.info(
+            f"Archived {self._manifest['rows']} job executions to '{self._path}'."
+        )
+
+        self.manifests.append(self._manifest)
+        self._path = None
+        self._manifest = None
+        self._checksum = None
+
+
+def load_archive(
+    manifest_path: Union[str, Path], using: str = "default", batch_size: int = 1000
+) -> Tuple[int, int]:
+    """
+    Re-import the job executions from an archive file that was created by `JobExecutionArchiver`.
+
+    The archive file's checksum is verified against the manifest before anything is imported. Only the job executions
+    that are recorded in the manifest are imported (a batch that was being appended when the archiver was interrupted
+    is ignored). Job executions that already exist in the database, or that belong to jobs that no longer exist, are
+    skipped. Consider loading archives into a separate database (see the `using` parameter) when investigating
+    executions of jobs that have since been removed.
+
+    :param manifest_path: Path to the manifest of the archive file to load.
+    :param using: Alias of the database to import the job executions into.
+    :param batch_size: The number of job executions to insert at a time.
+    :return: A tuple containing the number of job executions that were loaded and skipped.
+    """
+    manifest_path = Path(manifest_path)
+    manifest = json.loads(manifest_path.read_text())
+
+    archive_path = manifest_path.with_name(manifest["file"])
+    if _sha256(archive_path, manifest["size"]) != manifest["sha256"]:
+        raise ValueError(f"Checksum mismatch for archive file '{archive_path}'!")
+
+    _, _, open_func = COMPRESSION_FORMATS[manifest["compression"]]
+
+    loaded = 0
+    skipped = 0
+
+    def load_batch(rows: List[dict]) -> int:
+        existing_job_ids = set(
+            DjangoJob.objects.using(using)
+            .filter(id__in={row["job_id"] for row in rows})
+            .values_list("id", flat=True)
+        )
+        existing_execution_ids = set(
+            DjangoJobExecution.objects.using(using)
+            .filter(id__in=[row["id"] for row in rows])
+            .values_list("id", flat=True)
+        )
+
+        executions = [
+            DjangoJobExecution(**row)
+            for row in rows
+            if row["job_id"] in existing_job_ids
+            and row["id"] not in existing_execution_ids
+        ]
+        DjangoJobExecution.objects.using(using).bulk_create(
+            executions, ignore_conflicts=True
+        )
+
+        return len(executions)
+
+    with open_func(archive_path, "rb") as f:
+        rows = []
+        for line in itertools.islice(f, manifest["rows"]):
+            rows.append(json.loads(line))
+
+            if len(rows) >= batch_size:
+                count = load_batch(rows)
+                loaded += count
+                skipped += len(rows) - count
+                rows = []
+
+        if rows:
+            count = load_batch(rows)
+            loaded += count
+            skipped += len(rows) - count
+
+    return loaded, skipped
@@ -0,0 +1,79 @@
+"""
+Repeatable benchmarks for the hot paths of the job store and result store.
+
+The benchmarks create (and delete) their own jobs and job executions, so they should be run against a throwaway
+database: the `benchmarkapscheduler` and `loadtestapscheduler` management commands take care of this by creating a test
+database based on the configured `default` database.
+"""
+
+import platform
+from contextlib import contextmanager
+from typing import Dict, Callable, List
+
+import django
+from django import db
+from django.utils import timezone
+
+from django_apscheduler.benchmarks import scenarios
+
+# All of the available scenarios, keyed on name
+SCENARIOS: Dict[str, Callable[..., List[dict]]] = {
+    "jobstore_crud": scenarios.jobstore_crud,
+    "get_due_jobs": scenarios.get_due_jobs,
+    "atomic_update_or_create": scenarios.atomic_update_or_create,
+    "admin_changelist": scenarios.admin_changelist,
+    "retention": scenarios.retention,
+    "memory_jobstore": scenarios.memory_jobstore,
+}
+
+
+def run_benchmarks(names: List[str] = None, **options) -> dict:
+    """
+    Run the benchmark scenarios with the given names (defaults to all of them).
+
+    :param names: The names of the scenarios to run (see `SCENARIOS`).
+    :param options: Options that are passed on to every scenario, e.g. `repeat` or `num_jobs`. Each scenario ignores the
+    options that it does not use.
+    :return: A JSON serializable dictionary containing details of the environment, and the results of each scenario.
+    """
+    names = names or list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(
+            f"Unknown scenario(s): {sorted(unknown)}. Expected any of {list(SCENARIOS)}."
+        )
+
+    results = []
+    for name in names:
+        for result in SCENARIOS[name](**options):
+            results.append({"scenario": name, **result})
+
+    return {"environment": get_environment(), "results": results}
+
+
+def get_environment() -> dict:
+    """Details of the environment that the benchmarks are run in"""
+    return {
+        "timestamp": timezone.now().isoformat(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": db.connection.vendor,
+    }
+
+
+@contextmanager
+def test_database(interactive: bool = True):
+    """
+    Context manager that creates a test database based on the settings of the `default` database, and destroys it again
+    on exit.
+
+    :param interactive: Prompt before destroying an existing test database with the same name.
+    """
+    connection = db.connections[db.DEFAULT_DB_ALIAS]
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=not interactive)
+
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,239 @@
+"""
+A synthetic load generator that measures how far behind schedule a real scheduler, backed by a `DjangoJobStore`, fires
+its jobs under a given workload.
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+
+from apscheduler import events
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from django_apscheduler import util
+from django_apscheduler.benchmarks.scenarios import _clear, _rate, _summarize
+from django_apscheduler.jobstores import DjangoJobStore
+
+TRIGGER_TYPES = ("interval", "cron", "date")
+
+# The cron 'second' steps that divide a minute evenly, so that cron jobs fire at regular intervals
+CRON_STEPS = (1, 2, 3, 4, 5, 6, 10, 12, 15, 20, 30)
+
+# (scheduled run time, actual start time) of every synthetic job run
+_runs = []
+_runs_lock = threading.Lock()
+
+
+def synthetic_job(duration: float):
+    """The job that is scheduled by the load test: records when it was started, and then sleeps for `duration`"""
+    started = datetime.now(timezone.utc)
+    _, run_time = util.get_current_job_run()
+    with _runs_lock:
+        _runs.append((run_time, started))
+
+    time.sleep(duration)
+
+
+def _create_trigger(
+    trigger_type: str,
+    rng: random.Random,
+    now: datetime,
+    window: float,
+    min_interval: float,
+    max_interval: float,
+):
+    if trigger_type == "interval":
+        interval = rng.uniform(min_interval, max_interval)
+        # Spread the first run times, so that jobs with similar intervals do not all fire at once
+        return IntervalTrigger(
+            seconds=interval,
+            start_date=now + timedelta(seconds=rng.uniform(0, interval)),
+            timezone=timezone.utc,
+        )
+
+    if trigger_type == "cron":
+        steps = [step for step in CRON_STEPS if min_interval <= step <= max_interval]
+        step = rng.choice(steps or CRON_STEPS)
+        return CronTrigger(
+            second=f"{rng.randrange(step)}/{step}", timezone=timezone.utc
+        )
+
+    if trigger_type == "date":
+        return DateTrigger(
+            run_date=now + timedelta(seconds=rng.uniform(0, window)),
+            timezone=timezone.utc,
+        )
+
+    raise ValueError(
+        f"Unknown trigger type '{trigger_type}'. Expected any of {TRIGGER_TYPES}."
+    )
+
+
+def run_load_test(
+    num_jobs: int = 1000,
+    window: float = 60,
+    trigger_mix: Dict[str, float] = None,
+    min_interval: float = 1,
+    max_interval: float = 30,
+    min_duration: float = 0,
+    max_duration: float = 0.1,
+    max_workers: int = 10,
+    misfire_grace_time: int = 1,
+    seed: int = None,
+) -> dict:
+    """
+    Register `num_jobs` synthetic jobs with a `DjangoJobStore`, run a real scheduler for `window` seconds, and report
+    how late the jobs were started compared to their scheduled run times.
+
+    The jobs are registered while the scheduler is paused. Runs that became due while the jobs were still being
+    registered are reported as the 'backlog', and are excluded from the lag percentiles.
+
+    :param num_jobs: The number of synthetic jobs to register.
+    :param window: The number of seconds to run the scheduler for.
+    :param trigger_mix: The relative weights of the 'interval', 'cron', and 'date' triggers of the jobs. Defaults to
+    interval triggers only.
+    :param min_interval: The minimum number of seconds between runs of the same interval or cron job.
+    :param max_interval: The maximum number of seconds between runs of the same interval or cron job.
+    :param min_duration: The minimum number of seconds that each job run takes.
+    :param max_duration: The maximum number of seconds that each job run takes.
+    :param max_workers: The number of threads of the executor that runs the jobs.
+    :param misfire_grace_time: The number of seconds that a job run is allowed to be late, before it is considered
+    to have been missed.
+    :param seed: Seed for generating the jobs, which makes it possible to repeat the same workload.
+    :return: A JSON serializable dictionary with the parameters and metrics of the load test.
+    """
+    trigger_mix = trigger_mix or {"interval": 1}
+    unknown = set(trigger_mix) - set(TRIGGER_TYPES)
+    if unknown:
+        raise ValueError(
+            f"Unknown trigger type(s): {sorted(unknown)}. Expected any of {TRIGGER_TYPES}."
+        )
+
+    _clear()
+    with _runs_lock:
+        _runs.clear()
+
+    rng = random.Random(seed)
+    scheduler = BackgroundScheduler(
+        executors={"default": ThreadPoolExecutor(max_workers)},
+        job_defaults={"misfire_grace_time": misfire_grace_time},
+        timezone=timezone.utc,
+    )
+    scheduler.add_jobstore(DjangoJobStore(), "default")
+
+    event_counts = {
+        events.EVENT_JOB_MISSED: 0,
+        events.EVENT_JOB_MAX_INSTANCES: 0,
+        events.EVENT_JOB_ERROR: 0,
+    }
+    event_lock = threading.Lock()
+
+    def count_event(event):
+        with event_lock:
+            event_counts[event.code] += 1
+
+    scheduler.add_listener(
+        count_event,
+        events.EVENT_JOB_MISSED
+        | events.EVENT_JOB_MAX_INSTANCES
+        | events.EVENT_JOB_ERROR,
+    )
+
+    # The scheduler and executor use their own threads, and hence their own database connections: install a query
+    # counter on each connection as soon as it is created.
+    query_counters = {}
+    query_counters_lock = threading.Lock()
+
+    def install_query_counter(sender, connection, **kwargs):
+        with query_counters_lock:
+            if connection not in query_counters:
+                query_counters[connection] = util.QueryCounter()
+                connection.execute_wrappers.append(query_counters[connection])
+
+    def count_queries() -> int:
+        with query_counters_lock:
+            return sum(counter.count for counter in query_counters.values())
+
+    connection_created.connect(install_query_counter)
+    try:
+        scheduler.start(paused=True)
+
+        now = datetime.now(timezone.utc)
+        trigger_types = rng.choices(
+            list(trigger_mix), weights=list(trigger_mix.values()), k=num_jobs
+        )
+        started = time.perf_counter()
+        for i, trigger_type in enumerate(trigger_types):
+            scheduler.add_job(
+                synthetic_job,
+                _create_trigger(
+                    trigger_type, rng, now, window, min_interval, max_interval
+                ),
+                args=(rng.uniform(min_duration, max_duration),),
+                id=f"load_{i}",
+            )
+        registration_time = time.perf_counter() - started
+
+        window_start = datetime.now(timezone.utc)
+        queries_before = count_queries()
+        scheduler.resume()
+        time.sleep(window)
+        # Waits for all of the running jobs to complete
+        scheduler.shutdown(wait=True)
+        queries = count_queries() - queries_before
+
+    finally:
+        if scheduler.running:
+            scheduler.shutdown(wait=False)
+        connection_created.disconnect(install_query_counter)
+        for connection, counter in query_counters.items():
+            connection.execute_wrappers.remove(counter)
+
+    with _runs_lock:
+        runs = list(_runs)
+    lags = [
+        (started_at - run_time).total_seconds()
+        for run_time, started_at in runs
+        if run_time >= window_start
+    ]
+
+    _clear()
+    return {
+        "params": {
+            "num_jobs": num_jobs,
+            "window": window,
+            "trigger_mix": {
+                trigger_type: trigger_types.count(trigger_type)
+                for trigger_type in trigger_mix
+            },
+            "min_interval": min_interval,
+            "max_interval": max_interval,
+            "min_duration": min_duration,
+            "max_duration": max_duration,
+            "max_workers": max_workers,
+            "misfire_grace_time": misfire_grace_time,
+            "seed": seed,
+        },
+        "metrics": {
+            "registration": {
+                "duration": registration_time,
+                "jobs_per_second": _rate(num_jobs, registration_time),
+            },
+            "fired": len(runs),
+            "backlog": len(runs) - len(lags),
+            "lag": _summarize(lags, percentiles=(90, 95, 99)) if lags else None,
+            "missed": event_counts[events.EVENT_JOB_MISSED],
+            "max_instances": event_counts[events.EVENT_JOB_MAX_INSTANCES],
+            "errors": event_counts[events.EVENT_JOB_ERROR],
+            "db_queries": queries,
+            "db_queries_per_fired_job": queries / len(runs) if runs else None,
+        },
+    }
@@ -0,0 +1,445 @@
+import pickle
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import List, Sequence
+
+from apscheduler.job import Job
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.util import datetime_to_utc_timestamp
+from django import db
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.test import RequestFactory
+from django.utils import timezone
+
+from django_apscheduler.jobstores import (
+    DjangoIndexedMemoryJobStore,
+    DjangoJobStore,
+    DjangoMemoryJobStore,
+)
+from django_apscheduler.models import DjangoJob, DjangoJobExecution
+from django_apscheduler.util import get_django_internal_datetime
+
+
+def noop():
+    """The job that is scheduled by all of the benchmarks"""
+    pass
+
+
+def _summarize(timings: List[float], percentiles: Sequence[int] = (95,)) -> dict:
+    """Summarize a list of timings (in seconds)"""
+    timings = sorted(timings)
+    return {
+        "min": timings[0],
+        "median": statistics.median(timings),
+        # Nearest-rank percentiles
+        **{
+            f"p{percentile}": timings[
+                max(round(percentile / 100 * len(timings)) - 1, 0)
+            ]
+            for percentile in percentiles
+        },
+        "max": timings[-1],
+    }
+
+
+def _create_jobstore():
+    scheduler = BackgroundScheduler(timezone=timezone.utc)
+    jobstore = DjangoJobStore()
+    # Only attach the job store to the scheduler: the job store's background threads are not needed here, and would
+    # skew the results. Removed jobs are purged by `_clear` instead.
+    jobstore._scheduler = scheduler
+    jobstore._alias = "default"
+    jobstore._start_purge = lambda: None
+
+    return scheduler, jobstore
+
+
+def _create_job(scheduler, job_id: str, next_run_time, trigger=None) -> Job:
+    return Job(
+        scheduler,
+        id=job_id,
+        func=noop,
+        trigger=trigger or IntervalTrigger(hours=1, timezone=timezone.utc),
+        executor="default",
+        args=(),
+        kwargs={},
+        name=job_id,
+        misfire_grace_time=1,
+        coalesce=True,
+        max_instances=1,
+        next_run_time=next_run_time,
+    )
+
+
+def _clear():
+    DjangoJobExecution.objects.all().delete()
+    DjangoJob._base_manager.all().delete()
+
+
+def _rate(count: int, elapsed: float) -> float:
+    return count / elapsed if elapsed else float("inf")
+
+
+def jobstore_crud(num_jobs: int = 1000, **options) -> List[dict]:
+    """Throughput of adding, updating, and removing jobs one at a time"""
+    _clear()
+    scheduler, jobstore = _create_jobstore()
+    now = timezone.now()
+    jobs = [_create_job(scheduler, f"job_{i}", now) for i in range(num_jobs)]
+
+    results = []
+    for operation, func in [
+        ("add_job", jobstore.add_job),
+        ("update_job", jobstore.update_job),
+        ("remove_job", lambda job: jobstore.remove_job(job.id)),
+    ]:
+        started = time.perf_counter()
+        for job in jobs:
+            func(job)
+        elapsed = time.perf_counter() - started
+
+        results.append(
+            {
+                "params": {"operation": operation, "num_jobs": num_jobs},
+                "metrics": {"ops_per_second": _rate(num_jobs, elapsed)},
+            }
+        )
+
+    _clear()
+    return results
+
+
+def get_due_jobs(
+    job_counts: List[int] = (1000, 10_000, 100_000),
+    num_due: int = 100,
+    repeat: int = 5,
+    **options,
+) -> List[dict]:
+    """Latency of `get_due_jobs` and `get_next_run_time` for job stores of increasing size"""
+    scheduler, jobstore = _create_jobstore()
+    now = timezone.now()
+    state = _create_job(scheduler, "template", now).__getstate__()
+
+    results = []
+    for job_count in job_counts:
+        _clear()
+
+        # Bypass the job store when creating the jobs, as that would be far too slow for large numbers of jobs
+        djangojobs = []
+        for i in range(job_count):
+            next_run_time = now if i < num_due else now + timedelta(days=1)
+            djangojobs.append(
+                DjangoJob(
+                    id=f"job_{i}",
+                    next_run_time=get_django_internal_datetime(next_run_time),
+                    job_state=pickle.dumps(
+                        {**state, "id": f"job_{i}", "next_run_time": next_run_time},
+                        jobstore.pickle_protocol,
+                    ),
+                )
+            )
+        DjangoJob.objects.bulk_create(djangojobs, batch_size=1000)
+
+        for operation, func in [
+            ("get_due_jobs", lambda: jobstore.get_due_jobs(now)),
+            ("get_next_run_time", jobstore.get_next_run_time),
+        ]:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - started)
+
+            results.append(
+                {
+                    "params": {
+                        "operation": operation,
+                        "num_jobs": job_count,
+                        "num_due": min(num_due, job_count),
+                    },
+                    "metrics": {"latency": _summarize(timings)},
+                }
+            )
+
+    _clear()
+    return results
+
+
+def atomic_update_or_create(
+    thread_counts: List[int] = (1, 2, 4, 8, 16, 32, 64),
+    events_per_thread: int = 100,
+    **options,
+) -> List[dict]:
+    """
+    Number of job execution events that `DjangoJobExecution.atomic_update_or_create` can process per second when called
+    from an increasing number of threads. Each job run results in two events: one when the job is submitted, and one
+    once it has been executed.
+    """
+    _clear()
+    DjangoJob.objects.create(id="job", next_run_time=None)
+    # All events are processed with the same lock, as is the case for a single scheduler
+    lock = threading.RLock()
+
+    def log_events(thread_index: int) -> int:
+        errors = 0
+        try:
+            start = timezone.now() + timedelta(days=thread_index)
+            for i in range(events_per_thread // 2):
+                run_time = start + timedelta(seconds=i)
+                for status in [DjangoJobExecution.SENT, DjangoJobExecution.SUCCESS]:
+                    try:
+                        DjangoJobExecution.atomic_update_or_create(
+                            lock, "job", run_time, status
+                        )
+                    except db.Error:
+                        errors += 1
+        finally:
+            db.connection.close()
+
+        return errors
+
+    results = []
+    for thread_count in thread_counts:
+        DjangoJobExecution.objects.all().delete()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=thread_count) as executor:
+            errors = sum(executor.map(log_events, range(thread_count)))
+        elapsed = time.perf_counter() - started
+
+        num_events = thread_count * (events_per_thread // 2) * 2
+        results.append(
+            {
+                "params": {
+                    "threads": thread_count,
+                    "events_per_thread": events_per_thread,
+                },
+                "metrics": {
+                    "events_per_second": _rate(num_events - errors, elapsed),
+                    "errors": errors,
+                },
+            }
+        )
+
+    _clear()
+    return results
+
+
+def admin_changelist(
+    num_jobs: int = 1000, num_executions: int = 10_000, repeat: int = 5, **options
+) -> List[dict]:
+    """Time that it takes to render the changelists of the Django admin pages"""
+    _clear()
+    now = timezone.now()
+
+    DjangoJob.objects.bulk_create(
+        [DjangoJob(id=f"job_{i}", next_run_time=now) for i in range(num_jobs)],
+        batch_size=1000,
+    )
+    DjangoJobExecution.objects.bulk_create(
+        [
+            DjangoJobExecution(
+                job_id=f"job_{i % num_jobs}",
+                status=DjangoJobExecution.SUCCESS,
+                run_time=now - timedelta(seconds=i),
+                duration=1,
+            )
+            for i in range(num_executions)
+        ],
+        batch_size=1000,
+    )
+
+    user = get_user_model()._default_manager.create_superuser(
+        "apscheduler_benchmark", "benchmark@example.com", "benchmark"
+    )
+    request_factory = RequestFactory()
+
+    results = []
+    for model in [DjangoJob, DjangoJobExecution]:
+        model_admin = admin.site._registry[model]
+        timings = []
+        for _ in range(repeat):
+            request = request_factory.get("/")
+            request.user = user
+            request._messages = CookieStorage(request)
+
+            started = time.perf_counter()
+            model_admin.changelist_view(request).render()
+            timings.append(time.perf_counter() - started)
+
+        results.append(
+            {
+                "params": {
+                    "model": model.__name__,
+                    "num_jobs": num_jobs,
+                    "num_executions": num_executions,
+                },
+                "metrics": {"render_time": _summarize(timings)},
+            }
+        )
+
+    user.delete()
+    _clear()
+    return results
+
+
+def retention(
+    num_executions: int = 10_000, batch_size: int = 1000, **options
+) -> List[dict]:
+    """Rate at which old job executions are deleted"""
+    _clear()
+    now = timezone.now()
+
+    DjangoJob.objects.create(id="job", next_run_time=now)
+    DjangoJobExecution.objects.bulk_create(
+        [
+            DjangoJobExecution(
+                job_id="job",
+                status=DjangoJobExecution.SUCCESS,
+                run_time=now - timedelta(days=1, seconds=i),
+            )
+            for i in range(num_executions)
+        ],
+        batch_size=1000,
+    )
+
+    started = time.perf_counter()
+    deleted = DjangoJobExecution.objects.delete_old_job_executions(
+        max_age=3600, batch_size=batch_size
+    )
+    elapsed = time.perf_counter() - started
+
+    _clear()
+    return [
+        {
+            "params": {"num_executions": num_executions, "batch_size": batch_size},
+            "metrics": {
+                "deleted": deleted,
+                "rows_per_second": _rate(deleted, elapsed),
+            },
+        }
+    ]
+
+
+def memory_jobstore(
+    memory_job_counts: List[int] = (10_000, 100_000, 1_000_000),
+    num_operations: int = 1000,
+    num_due: int = 100,
+    repeat: int = 5,
+    **options,
+) -> List[dict]:
+    """
+    Throughput of adding, updating, and removing jobs, and latency of `get_due_jobs`, for `DjangoMemoryJobStore` and
+    `DjangoIndexedMemoryJobStore` instances that already contain an increasing number of jobs
+    """
+    scheduler = BackgroundScheduler(timezone=timezone.utc)
+    trigger = IntervalTrigger(hours=1, timezone=timezone.utc)
+    now = timezone.now()
+    rng = random.Random(0)
+
+    results = []
+    for job_count in memory_job_counts:
+        # Jobs are due at one second intervals from now, so that exactly `num_due` of them are due at `due_time`
+        jobs = [
+            _create_job(scheduler, f"job_{i}", now + timedelta(seconds=i), trigger)
+            for i in range(job_count)
+        ]
+        due_time = now + timedelta(seconds=num_due - 1)
+        updated_jobs = [
+            _create_job(
+                scheduler,
+                f"job_{rng.randrange(job_count)}",
+                now + timedelta(seconds=rng.randrange(job_count)),
+                trigger,
+            )
+            for _ in range(num_operations)
+        ]
+        new_jobs = [
+            _create_job(
+                scheduler,
+                f"new_job_{i}",
+                now + timedelta(seconds=rng.randrange(job_count)),
+                trigger,
+            )
+            for i in range(num_operations)
+        ]
+
+        for store_class in [DjangoMemoryJobStore, DjangoIndexedMemoryJobStore]:
+            jobstore = store_class()
+            _fill_memory_jobstore(jobstore, jobs)
+
+            metrics = {
+                "add_job": _measure_rate(jobstore.add_job, new_jobs),
+                "update_job": _measure_rate(jobstore.update_job, updated_jobs),
+                "remove_job": _measure_rate(
+                    jobstore.remove_job, [job.id for job in new_jobs]
+                ),
+            }
+
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                jobstore.get_due_jobs(due_time)
+                jobstore.get_next_run_time()
+                timings.append(time.perf_counter() - started)
+
+            for operation, ops_per_second in metrics.items():
+                results.append(
+                    {
+                        "params": {
+                            "store": store_class.__name__,
+                            "operation": operation,
+                            "num_jobs": job_count,
+                        },
+                        "metrics": {"ops_per_second": ops_per_second},
+                    }
+                )
+            results.append(
+                {
+                    "params": {
+                        "store": store_class.__name__,
+                        "operation": "get_due_jobs",
+                        "num_jobs": job_count,
+                        "num_due": min(num_due, job_count),
+                    },
+                    "metrics": {"latency": _summarize(timings)},
+                }
+            )
+
+            jobstore.remove_all_jobs()
+
+    return results
+
+
+def _measure_rate(func, items: list) -> float:
+    """Number of items that `func` can process per second"""
+    started = time.perf_counter()
+    for item in items:
+        func(item)
+
+    return _rate(len(items), time.perf_counter() - started)
+
+
+def _fill_memory_jobstore(jobstore, jobs: List[Job]):
+    """
+    Add the jobs to a memory job store. `MemoryJobStore` takes O(n^2) time to add n jobs one by one, which would take
+    far too long for the larger job counts, so its sorted job list is built directly instead.
+    """
+    if isinstance(jobstore, DjangoIndexedMemoryJobStore):
+        for job in jobs:
+            jobstore.add_job(job)
+        return
+
+    entries = sorted(
+        ((job, datetime_to_utc_timestamp(job.next_run_time)) for job in jobs),
+        key=lambda entry: (entry[1], entry[0].id),
+    )
+    jobstore._jobs = entries
+    jobstore._jobs_index = {job.id: (job, timestamp) for job, timestamp in entries}
@@ -0,0 +1,421 @@
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List
+
+from apscheduler.executors.base import BaseExecutor, MaxInstancesReachedError, run_job
+from apscheduler.executors.pool import (
+    BasePoolExecutor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from apscheduler.job import Job as AppSchedulerJob
+from django import db
+
+from django_apscheduler import util
+from django_apscheduler.jobstores import DjangoJobStore
+from django_apscheduler.models import (
+    DjangoJobExecution,
+    DjangoJobLease,
+    DjangoQueuedJobRun,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DjangoMaxInstancesMixin:
+    """
+    Mixin class for APScheduler executors that enforces the `max_instances` of each job across all of the schedulers
+    that share the same database, instead of only within the current process.
+
+    Before a job is submitted, a lease is acquired on one of the concurrency slots of the job (see `DjangoJobLease`).
+    If all of the slots are taken, `MaxInstancesReachedError` is raised, so that the scheduler dispatches an
+    `EVENT_JOB_MAX_INSTANCES` event that is logged by the result store in the same way as for the local limit. If the
+    slot is taken by another scheduler that is already running the same run of the job, the submission is skipped
+    silently instead: that run is logged by the other scheduler.
+
+    The lease is released as soon as the run that it was acquired for has finished. While the job is running, a
+    background thread renews its lease every `lease_timeout / 3` seconds, so jobs can run for longer than
+    `lease_timeout`. Leases that are not renewed expire after `lease_timeout` seconds, so that the slots of schedulers
+    that were terminated unexpectedly are freed up again soon.
+
+    :param lease_timeout: number of seconds after which the lease on a concurrency slot expires, unless it is renewed
+    """
+
+    def __init__(self, *args, lease_timeout: float = 120, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lease_timeout = lease_timeout
+        # Leases that are held by the running instances of each job, keyed on `(job ID, first run time)`
+        self._leases = {}
+
+        self._renewal_thread = None
+        self._renewal_stopped = threading.Event()
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+
+        if self._renewal_thread is None:
+            self._renewal_stopped.clear()
+            self._renewal_thread = threading.Thread(
+                target=self._renew_leases_periodically,
+                name=f"{self.__class__.__name__}-lease-renewal",
+                daemon=True,
+            )
+            self._renewal_thread.start()
+
+    def shutdown(self, wait=True):
+        super().shutdown(wait)
+        self._renewal_stopped.set()
+        self._renewal_thread = None
+
+    def submit_job(self, job: AppSchedulerJob, run_times):
+        assert self._lock is not None, "This executor has not been started yet"
+        with self._lock:
+            # Check the local limit first, to avoid querying the database needlessly
+            if self._instances[job.id] >= job.max_instances:
+                raise MaxInstancesReachedError(job)
+
+        lease = DjangoJobLease.acquire(
+            job.id, job.max_instances, run_times[0], self.lease_timeout
+        )
+        if lease is None:
+            if DjangoJobLease.is_held(job.id, run_times[0]):
+                logger.info(
+                    f"Skipping run of job '{job.id}' at {run_times[0]}: already running on another scheduler."
+                )
+                return
+
+            raise MaxInstancesReachedError(job)
+
+        key = (job.id, run_times[0])
+        # Register the lease and the instance of the job at the same time, so that `_release_orphaned_leases` never
+        # sees one without the other
+        with self._lock:
+            self._leases[key] = lease
+            try:
+                super().submit_job(job, run_times)
+            except BaseException:
+                self._release_lease(key)
+                raise
+
+    def _run_job_success(self, job_id, events):
+        if events:
+            # `run_job` reports an event for each of the run times, starting with the first one
+            self._release_lease((job_id, events[0].scheduled_run_time))
+        super()._run_job_success(job_id, events)
+        self._release_orphaned_leases(job_id)
+
+    def _run_job_error(self, job_id, exc, traceback=None):
+        # The run that failed is not known, so its lease is only released once no other instances of the job remain
+        super()._run_job_error(job_id, exc, traceback)
+        self._release_orphaned_leases(job_id)
+
+    def renew_leases(self) -> int:
+        """
+        Renew the leases of all of the jobs that are currently running.
+
+        :return: The number of leases that were renewed.
+        """
+        with self._lock:
+            leases = list(self._leases.values())
+
+        if not leases:
+            return 0
+
+        return DjangoJobLease.renew(leases, self.lease_timeout)
+
+    def _renew_leases_periodically(self):
+        try:
+            while not self._renewal_stopped.wait(self.lease_timeout / 3):
+                try:
+                    self.renew_leases()
+                except Exception:
+                    # Retried on the next iteration
+                    logger.exception("Unable to renew leases!")
+                finally:
+                    db.close_old_connections()
+        finally:
+            db.connection.close()
+
+    def _release_lease(self, key: tuple):
+        """Release the lease of the run with the given `(job ID, first run time)`, if any"""
+        with self._lock:
+            lease = self._leases.pop(key, None)
+
+        if lease is not None:
+            self._do_release_lease(lease)
+
+    def _release_orphaned_leases(self, job_id: str):
+        """Release the leases of a job that no longer has any running instances"""
+        with self._lock:
+            if self._instances.get(job_id):
+                return
+
+            leases = [
+                self._leases.pop(key) for key in list(self._leases) if key[0] == job_id
+            ]
+
+        for lease in leases:
+            self._do_release_lease(lease)
+
+    @staticmethod
+    def _do_release_lease(lease: DjangoJobLease):
+        try:
+            lease.release()
+        except Exception:
+            # The lease will expire eventually
+            logger.exception(f"Unable to release lease of job '{lease.job_id}'!")
+
+
+class RunAlreadyClaimedError(Exception):
+    """Raised when none of the run times of a job could be claimed, because another scheduler already claimed them"""
+
+    def __init__(self, job: AppSchedulerJob):
+        super().__init__(
+            f"All run times of job '{job.id}' have already been claimed by another scheduler"
+        )
+
+
+def _ignore_claimed_runs(record: logging.LogRecord) -> bool:
+    """
+    Logging filter for the scheduler's logger that drops its 'Error submitting job' traceback for runs that were
+    skipped because another scheduler had already claimed them (which is logged by the executor instead).
+    """
+    return not (
+        record.exc_info and isinstance(record.exc_info[1], RunAlreadyClaimedError)
+    )
+
+
+class DjangoAtMostOnceMixin:
+    """
+    Mixin class for APScheduler executors that makes sure that each run of a job that is stored in a `DjangoJobStore` is
+    executed at most once, even if more than one scheduler is (accidentally) running on the same job store, e.g. one
+    for each of the worker processes of a web server.
+
+    Before a job is submitted, each of its run times is claimed by logging the corresponding `DjangoJobExecution` (see
+    `DjangoJobExecution.claim`). Run times that have already been claimed by another scheduler are skipped. If none of
+    its run times could be claimed, `RunAlreadyClaimedError` is raised instead of submitting the job, so that the
+    scheduler does not dispatch an `EVENT_JOB_SUBMITTED` event (or log an execution) for a run that is not executed
+    by this scheduler.
+    """
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        scheduler._logger.addFilter(_ignore_claimed_runs)
+
+    def submit_job(self, job: AppSchedulerJob, run_times):
+        if isinstance(
+            self._scheduler._lookup_jobstore(job._jobstore_alias), DjangoJobStore
+        ):
+            claimed_run_times = [
+                run_time
+                for run_time in run_times
+                if DjangoJobExecution.claim(job.id, run_time)
+            ]
+            if not claimed_run_times:
+                logger.info(
+                    f"Skipping run of job '{job.id}' at {run_times[0]}: already claimed by another scheduler."
+                )
+                raise RunAlreadyClaimedError(job)
+
+            run_times = claimed_run_times
+
+        super().submit_job(job, run_times)
+
+
+class DjangoAtMostOnceThreadPoolExecutor(DjangoAtMostOnceMixin, ThreadPoolExecutor):
+    """
+    A thread pool executor that executes each run of a job at most once, even if more than one scheduler is running on
+    the same job store.
+
+    :param max_workers: the maximum number of spawned threads
+    :param pool_kwargs: dict of keyword arguments to pass to the underlying ThreadPoolExecutor constructor
+    """
+
+
+class DjangoThreadPoolExecutor(DjangoMaxInstancesMixin, ThreadPoolExecutor):
+    """
+    A thread pool executor that enforces `max_instances` across all of the schedulers that share the same database.
+
+    :param max_workers: the maximum number of spawned threads
+    :param pool_kwargs: dict of keyword arguments to pass to the underlying ThreadPoolExecutor constructor
+    :param lease_timeout: number of seconds after which the lease on a concurrency slot expires
+    """
+
+
+class DjangoQueueExecutor(BaseExecutor):
+    """
+    An executor that does not run jobs itself, but adds them to a queue in the database instead. The queued runs are
+    picked up by separate worker processes (see the `runapschedulerworker` management command), which log their
+    executions in the same way as the scheduler does.
+
+    This decouples scheduling jobs from running them: a single scheduler process keeps track of when each job is due,
+    while any number of worker processes, on any number of hosts, run the jobs.
+
+    The worker processes import the function of each job by reference, so functions must be importable (which is
+    already required for jobs that are stored in a `DjangoJobStore`). The `max_instances` of jobs is not enforced.
+    """
+
+    def submit_job(self, job: AppSchedulerJob, run_times):
+        assert self._lock is not None, "This executor has not been started yet"
+        # Jobs are not run in this process, so there are no local instances to keep track of
+        self._do_submit_job(job, run_times)
+
+    def _do_submit_job(self, job: AppSchedulerJob, run_times):
+        DjangoQueuedJobRun.objects.enqueue(job, run_times)
+
+
+# Number of jobs that have been run by the current worker process of a `DjangoProcessPoolExecutor`
+_worker_job_count = 0
+
+
+def run_django_job(
+    job: AppSchedulerJob,
+    jobstore_alias: str,
+    run_times: list,
+    logger_name: str,
+    job_wrappers: List[Callable] = None,
+    max_jobs_per_worker: int = None,
+    max_memory_per_worker: float = None,
+):
+    """
+    Run a job in a worker process of a `DjangoProcessPoolExecutor`.
+
+    :return: A tuple containing the APScheduler events of the job, the data that was collected for each run time by the
+    job wrappers (see `util.update_job_run_data`), and whether the worker process should be recycled.
+    """
+    global _worker_job_count
+    _worker_job_count += 1
+
+    # The job wrappers of the job store are not pickled along with the job, so they are applied again here
+    func = util.close_old_connections(job.func)
+    for wrapper in job_wrappers or []:
+        func = wrapper(func)
+    job.func = func
+
+    job_events = run_job(job, jobstore_alias, run_times, logger_name)
+
+    run_data = {}
+    for run_time in run_times:
+        data = util.pop_job_run_data(job.id, run_time)
+        if data:
+            run_data[run_time] = data
+
+    max_rss = util.ResourceUsage._get_max_rss()
+    recycle = bool(
+        (max_jobs_per_worker and _worker_job_count >= max_jobs_per_worker)
+        or (
+            max_memory_per_worker
+            and max_rss is not None
+            and max_rss > max_memory_per_worker * 1024 * 1024
+        )
+    )
+
+    return job_events, run_data, recycle
+
+
+class DjangoProcessPoolExecutor(ProcessPoolExecutor):
+    """
+    A process pool executor for jobs that use Django, e.g. to run CPU-bound jobs on all of the available cores.
+
+    Each worker process sets up Django once when it is started, and discards any database connections that were
+    inherited from the scheduler process. Jobs are wrapped with `util.close_old_connections` and the `job_wrappers` of
+    the job store that they were loaded from, and the data that the job wrappers collect (e.g. resource usage) is sent
+    back to the scheduler process, to be logged by the result store along with the job execution.
+
+    The process pool is replaced with a fresh one as soon as one of its worker processes has run `max_jobs_per_worker`
+    jobs, or has exceeded a peak memory usage of `max_memory_per_worker` megabytes. Jobs that are still running in the
+    old pool are allowed to complete.
+
+    :param max_workers: the maximum number of spawned processes
+    :param pool_kwargs: dict of keyword arguments to pass to the underlying ProcessPoolExecutor constructor
+    :param max_jobs_per_worker: number of jobs after which worker processes are recycled
+    :param max_memory_per_worker: peak resident set size (in megabytes) above which worker processes are recycled
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 10,
+        pool_kwargs: dict = None,
+        max_jobs_per_worker: int = None,
+        max_memory_per_worker: float = None,
+    ):
+        self.max_workers = int(max_workers)
+        self.pool_kwargs = dict(pool_kwargs or {})
+        self.pool_kwargs.setdefault("mp_context", multiprocessing.get_context("spawn"))
+        self.pool_kwargs["initargs"] = (
+            os.environ.get("DJANGO_SETTINGS_MODULE"),
+            self.pool_kwargs.pop("initializer", None),
+            self.pool_kwargs.pop("initargs", ()),
+        )
+        # Defined in `util`, which can be imported in the worker processes before Django has been set up
+        self.pool_kwargs["initializer"] = util.initialize_worker_process
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_memory_per_worker = max_memory_per_worker
+
+        # Create the pool here: `ProcessPoolExecutor` only accepts `pool_kwargs` as of APScheduler 3.9
+        BasePoolExecutor.__init__(self, self._create_pool())
+
+    def _create_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        return concurrent.futures.ProcessPoolExecutor(
+            self.max_workers, **self.pool_kwargs
+        )
+
+    def _do_submit_job(self, job: AppSchedulerJob, run_times):
+        try:
+            self._submit_to_pool(job, run_times)
+        except BrokenProcessPool:
+            self._logger.warning(
+                "Process pool is broken; replacing pool with a fresh instance"
+            )
+            self._replace_pool(self._pool)
+            self._submit_to_pool(job, run_times)
+
+    def _submit_to_pool(self, job: AppSchedulerJob, run_times):
+        pool = self._pool
+        jobstore = self._scheduler._lookup_jobstore(job._jobstore_alias)
+
+        def callback(f):
+            exc, tb = (
+                f.exception_info()
+                if hasattr(f, "exception_info")
+                else (f.exception(), getattr(f.exception(), "__traceback__", None))
+            )
+            if exc:
+                self._run_job_error(job.id, exc, tb)
+                return
+
+            job_events, run_data, recycle = f.result()
+            for run_time, data in run_data.items():
+                util.update_job_run_data((job.id, run_time), **data)
+
+            if recycle:
+                self._replace_pool(pool)
+
+            self._run_job_success(job.id, job_events)
+
+        f = pool.submit(
+            run_django_job,
+            job,
+            job._jobstore_alias,
+            run_times,
+            self._logger.name,
+            getattr(jobstore, "job_wrappers", []),
+            self.max_jobs_per_worker,
+            self.max_memory_per_worker,
+        )
+        f.add_done_callback(callback)
+
+    def _replace_pool(self, pool):
+        """Replace the given pool with a fresh instance, unless that has been done already"""
+        with self._lock:
+            if self._pool is not pool:
+                return
+
+            self._pool = self._create_pool()
+
+        self._logger.info("Recycling the worker processes of the process pool")
+        pool.shutdown(wait=False)
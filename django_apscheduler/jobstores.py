@@ -1,20 +1,35 @@
+import hashlib
+import heapq
+import itertools
 import logging
 import pickle
+import threading
+import time
 import warnings
-from typing import Union, List
+from datetime import timedelta
+from typing import Callable, Union, List
 
 from apscheduler import events
 from apscheduler.events import JobSubmissionEvent, JobExecutionEvent
+from apscheduler.executors.base import MaxInstancesReachedError
 from apscheduler.job import Job as AppSchedulerJob
 from apscheduler.jobstores.base import BaseJobStore, JobLookupError, ConflictingIdError
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.schedulers.base import BaseScheduler
+from apscheduler.util import datetime_to_utc_timestamp
 
 from django import db
-from django.db import transaction, IntegrityError
-
-from django_apscheduler import util
-from django_apscheduler.models import DjangoJob, DjangoJobExecution
+from django.conf import settings
+from django.db import transaction, DatabaseError, IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from django_apscheduler import util, signals
+from django_apscheduler.models import (
+    DjangoJob,
+    DjangoJobExecution,
+    DjangoJobExecutionProfile,
+)
 from django_apscheduler.util import (
     get_apscheduler_datetime,
     get_django_internal_datetime,
@@ -22,12 +37,62 @@ from django_apscheduler.util import (
 
 logger = logging.getLogger(__name__)
 
+# ID of the job that applies the job execution retention policies (see `apply_retention_policies`).
+RETENTION_JOB_ID = "django_apscheduler.apply_retention_policies"
+
+
+def _restore_next_run_time(job_state: dict, next_run_time):
+    """
+    Replace the next run time in the (unpickled) state of a job with the one in the `DjangoJob.next_run_time` column,
+    which is the authoritative one: `DjangoJobStore.update_job` only updates that column if nothing else about the job
+    has changed.
+    """
+    if next_run_time and timezone.is_naive(next_run_time):
+        # The inverse of `get_django_internal_datetime`
+        next_run_time = timezone.make_aware(next_run_time)
+
+    if next_run_time != job_state["next_run_time"]:
+        if next_run_time and job_state["next_run_time"]:
+            # Keep the timezone of the trigger
+            next_run_time = next_run_time.astimezone(job_state["next_run_time"].tzinfo)
+        job_state["next_run_time"] = next_run_time
+
 
 class DjangoResultStoreMixin:
-    """Mixin class that adds the ability for a JobStore to store job execution results in the Django database"""
+    """
+    Mixin class that adds the ability for a JobStore to store job execution results in the Django database
+
+    If `settings.APSCHEDULER_SINGLE_WRITE_EXECUTIONS` is enabled, job submissions are only tracked in memory, and each
+    job execution is written to the database once, when it has finished. Executions that are still running after
+    `settings.APSCHEDULER_EXECUTION_CHECKPOINT_INTERVAL` seconds are written to the database by a background thread,
+    so that long-running jobs remain visible in the Django admin site. Executions are no longer tracked in memory once
+    they have been written, so executions that finish elsewhere (e.g. in a `runapschedulerworker` process) are only
+    tracked for one checkpoint interval. If checkpoints are disabled, submissions are not tracked at all.
+    """
 
     lock = None
 
+    # Slow run thresholds that were derived from the execution history of each job, keyed on job ID. Each entry is a
+    # `(threshold, expiry time)` tuple so that thresholds can be refreshed periodically. Shared by all of the job
+    # stores (and the threads that handle their events), so only accessed while holding the lock.
+    _slow_run_thresholds = {}
+    _slow_run_thresholds_lock = threading.Lock()
+
+    # Executions that have been submitted, but not written to the database yet, keyed on `(job ID, run time)`. The
+    # values are the (monotonic) times at which the executions were submitted. Only tracked while the checkpoint
+    # thread is running, on behalf of the started job stores in `_checkpoint_stores`.
+    _running_executions = {}
+    _running_executions_lock = threading.Lock()
+    _checkpoint_stores = set()
+    _checkpoint_thread = None
+    _checkpoint_stopped = None
+
+    # The most recent 'missed' job execution of each job, as `[execution ID, first run time, last run time, open]`.
+    # Consecutive missed run times of a job are collapsed into a single job execution, until the job runs again.
+    # Shared by all of the threads that handle events, so only accessed while holding the lock. Entries are discarded
+    # when their job is removed.
+    _missed_runs = {}
+
     def start(self, scheduler, alias):
         super().start(scheduler, alias)
 
@@ -35,53 +100,380 @@ class DjangoResultStoreMixin:
         DjangoResultStoreMixin.lock = self._scheduler._create_lock()
 
         self.register_event_listeners()
+        self.schedule_retention_job()
+
+        if getattr(settings, "APSCHEDULER_SINGLE_WRITE_EXECUTIONS", False):
+            self._start_checkpoints()
+
+    def shutdown(self):
+        super().shutdown()
+        self._stop_checkpoints()
+
+    def _start_checkpoints(self):
+        """Start writing long-running executions to the database in a background thread, if not already doing so"""
+        interval = getattr(settings, "APSCHEDULER_EXECUTION_CHECKPOINT_INTERVAL", 60)
+        if not interval:
+            return
+
+        with self._running_executions_lock:
+            DjangoResultStoreMixin._checkpoint_stores.add(self)
+            if DjangoResultStoreMixin._checkpoint_thread is not None:
+                return
+
+            DjangoResultStoreMixin._checkpoint_stopped = threading.Event()
+            DjangoResultStoreMixin._checkpoint_thread = threading.Thread(
+                target=self._checkpoint_periodically,
+                args=(interval, DjangoResultStoreMixin._checkpoint_stopped),
+                name=f"{self.__class__.__name__}-checkpoints",
+                daemon=True,
+            )
+            DjangoResultStoreMixin._checkpoint_thread.start()
+
+    def _stop_checkpoints(self):
+        """Stop the checkpoint thread once the last of the job stores that it writes checkpoints for has shut down"""
+        with self._running_executions_lock:
+            DjangoResultStoreMixin._checkpoint_stores.discard(self)
+            thread = DjangoResultStoreMixin._checkpoint_thread
+            if DjangoResultStoreMixin._checkpoint_stores or thread is None:
+                return
+
+            DjangoResultStoreMixin._checkpoint_stopped.set()
+            DjangoResultStoreMixin._checkpoint_thread = None
+            # Executions that are still running are no longer checkpointed
+            DjangoResultStoreMixin._running_executions.clear()
+
+        thread.join()
+
+    @classmethod
+    def _checkpoint_periodically(cls, interval: float, stopped: threading.Event):
+        try:
+            while not stopped.wait(interval):
+                try:
+                    cls.checkpoint_running_executions(interval)
+                except Exception:
+                    logger.exception("Unable to checkpoint running job executions!")
+                finally:
+                    db.close_old_connections()
+        finally:
+            db.connection.close()
+
+    @classmethod
+    def checkpoint_running_executions(cls, min_duration: float = 0) -> int:
+        """
+        Write the executions that have been submitted more than `min_duration` seconds ago, and that have not finished
+        yet, to the database with a status of `DjangoJobExecution.SENT`.
+
+        :return: The number of executions that were written.
+        """
+        submitted_before = time.monotonic() - min_duration
+        with cls._running_executions_lock:
+            due = [
+                key
+                for key, submitted in cls._running_executions.items()
+                if submitted <= submitted_before
+            ]
+            for key in due:
+                del cls._running_executions[key]
+
+        for job_id, run_time in due:
+            try:
+                DjangoJobExecution.atomic_update_or_create(
+                    cls.lock, job_id, run_time, DjangoJobExecution.SENT
+                )
+            except IntegrityError:
+                # The job has been removed in the meantime
+                pass
+
+        return len(due)
+
+    @classmethod
+    def _discard_running_execution(cls, job_id: str, run_time):
+        with cls._running_executions_lock:
+            cls._running_executions.pop((job_id, run_time), None)
+
+    @classmethod
+    def _store_job_run_data(cls, job_execution: DjangoJobExecution, run_data: dict):
+        """Store any additional data that was collected for a job run, that is not kept on the DjangoJobExecution itself"""
+        if "profile" in run_data:
+            DjangoJobExecutionProfile.objects.update_or_create(
+                execution=job_execution, defaults={"stats": run_data["profile"]}
+            )
+            # Only count down the runs that remain to be profiled once a profile has actually been recorded: runs that
+            # are skipped (e.g. missed, or at their maximum number of instances) are never profiled.
+            DjangoJob.objects.filter(
+                id=job_execution.job_id, profile_runs__gt=0
+            ).update(profile_runs=F("profile_runs") - 1)
+
+    @classmethod
+    def get_slow_run_threshold(cls, job_id: str) -> Union[float, None]:
+        """
+        Get the duration (in seconds) above which executions of a job are considered to be slow.
+
+        Thresholds can be configured explicitly for each job via `settings.APSCHEDULER_SLOW_RUN_THRESHOLDS`. Otherwise,
+        if `settings.APSCHEDULER_SLOW_RUN_P95_MULTIPLIER` is set, the threshold is derived from the 95th percentile
+        of the job's historical durations. Derived thresholds are cached for
+        `settings.APSCHEDULER_SLOW_RUN_CACHE_TIMEOUT` seconds to avoid querying the database on every run.
+
+        :return: The slow run threshold, or None if slow run detection is not enabled for this job.
+        """
+        configured_thresholds = getattr(settings, "APSCHEDULER_SLOW_RUN_THRESHOLDS", {})
+        if job_id in configured_thresholds:
+            return configured_thresholds[job_id]
+
+        multiplier = getattr(settings, "APSCHEDULER_SLOW_RUN_P95_MULTIPLIER", None)
+        if multiplier is None:
+            return None
+
+        now = time.monotonic()
+        expires_at = now + getattr(settings, "APSCHEDULER_SLOW_RUN_CACHE_TIMEOUT", 3600)
+
+        with cls._slow_run_thresholds_lock:
+            threshold, refresh_at = cls._slow_run_thresholds.get(job_id, (None, 0))
+            refresh = now >= refresh_at
+            if refresh:
+                # Claim the refresh, so that other threads keep using the current threshold in the meantime instead of
+                # all querying the execution history of the job at once.
+                cls._slow_run_thresholds[job_id] = (threshold, expires_at)
+
+        if refresh:
+            # Query the database without holding the lock, so that the thresholds of other jobs are not held up
+            p95 = DjangoJobExecution.objects.get_duration_percentile(
+                job_id,
+                95,
+                min_samples=getattr(settings, "APSCHEDULER_SLOW_RUN_MIN_SAMPLES", 20),
+            )
+            threshold = p95 * multiplier if p95 is not None else None
+
+            with cls._slow_run_thresholds_lock:
+                cls._slow_run_thresholds[job_id] = (threshold, expires_at)
+
+        return threshold
+
+    @classmethod
+    def _check_slow_run(cls, job_execution: DjangoJobExecution):
+        """Flag the job execution if it exceeded the slow run threshold of its job, and notify any listeners"""
+        if job_execution.duration is None:
+            return
+
+        threshold = cls.get_slow_run_threshold(job_execution.job_id)
+        if threshold is None or float(job_execution.duration) <= threshold:
+            return
+
+        DjangoJobExecution.objects.filter(id=job_execution.id).update(slow=True)
+        job_execution.slow = True
+
+        logger.warning(
+            f"Execution of job '{job_execution.job_id}' took {job_execution.duration} seconds, which exceeds the slow "
+            f"run threshold of {threshold:.2f} seconds."
+        )
+        signals.job_execution_slow.send(
+            sender=DjangoJobExecution, execution=job_execution, threshold=threshold
+        )
+
+    def remove_job(self, job_id: str):
+        super().remove_job(job_id)
+        self._forget_job(job_id)
+
+    def remove_all_jobs(self):
+        super().remove_all_jobs()
+        self._forget_all_jobs()
+
+    @classmethod
+    def _forget_job(cls, job_id: str):
+        """Discard the in-memory state that is kept for a job that has been removed"""
+        if cls.lock is None:
+            # No events have been handled yet, so there is nothing to discard
+            return
+
+        with cls.lock:
+            cls._missed_runs.pop(job_id, None)
+
+    @classmethod
+    def _forget_all_jobs(cls):
+        if cls.lock is None:
+            return
+
+        with cls.lock:
+            cls._missed_runs.clear()
+
+    @classmethod
+    def _get_collapsed_missed_run(cls, job_id: str, run_time) -> Union[int, None]:
+        """
+        Get the ID of the most recent 'missed' job execution of the job, if the run time has been logged as part of it
+        """
+        with cls.lock:
+            missed_runs = cls._missed_runs.get(job_id)
+            if missed_runs is not None and missed_runs[1] <= run_time <= missed_runs[2]:
+                return missed_runs[0]
+
+        return None
+
+    @classmethod
+    def _close_missed_runs(cls, job_id: str):
+        """Stop collapsing missed run times of the job into its most recent 'missed' job execution"""
+        with cls.lock:
+            missed_runs = cls._missed_runs.get(job_id)
+            if missed_runs is not None:
+                missed_runs[3] = False
+
+    @classmethod
+    def _log_missed_runs(cls, job_id: str, run_times: list) -> int:
+        """
+        Log consecutive missed run times of a job, collapsing them into the most recent 'missed' job execution of the
+        job if it has not run since.
+
+        :return: The ID of the 'missed' job execution that the run times were logged as part of.
+        """
+        with cls.lock:
+            missed_runs = cls._missed_runs.get(job_id)
+            if (
+                missed_runs is not None
+                and missed_runs[3]
+                and DjangoJobExecution.atomic_add_missed_runs(
+                    cls.lock, missed_runs[0], job_id, run_times
+                )
+            ):
+                missed_runs[2] = run_times[-1]
+                return missed_runs[0]
+
+            job_execution = DjangoJobExecution.atomic_create_missed_runs(
+                cls.lock,
+                job_id,
+                run_times,
+                exception=f"Run time of job '{job_id}' was missed!",
+            )
+            cls._missed_runs[job_id] = [
+                job_execution.id,
+                run_times[0],
+                run_times[-1],
+                True,
+            ]
+
+        return job_execution.id
+
+    @classmethod
+    def _get_missed_run_times(cls, job_id: str, run_times: list) -> list:
+        """
+        Get the run times that the executor is going to report as missed, because they are already past the job's
+        misfire grace time (see `apscheduler.executors.base.run_job`).
+        """
+        job_state = (
+            DjangoJob.objects.filter(id=job_id)
+            .values_list("job_state", flat=True)
+            .first()
+        )
+        if job_state is None:
+            return []
+
+        misfire_grace_time = pickle.loads(job_state).get("misfire_grace_time")
+        if misfire_grace_time is None:
+            return []
+
+        missed_before = timezone.now() - timedelta(seconds=misfire_grace_time)
+        return [run_time for run_time in run_times if run_time < missed_before]
 
     @classmethod
     def handle_submission_event(cls, event: JobSubmissionEvent):
         """
         Create and return new job execution instance in the database when the job is submitted to the scheduler.
 
+        If more than one run time is submitted at once, all of them are logged with a single query. Run times that are
+        already past the job's misfire grace time are logged as a single 'missed' job execution straight away, so that
+        the `EVENT_JOB_MISSED` events that the executor reports for them do not need to touch the database again.
+
         :param event: JobExecutionEvent instance
-        :return: DjangoJobExecution ID or None if the job execution could not be logged.
+        :return: DjangoJobExecution ID (of the first run time) or None if the job execution could not be logged, or is
+        only tracked in memory (see `settings.APSCHEDULER_SINGLE_WRITE_EXECUTIONS`).
         """
-        try:
-            if event.code == events.EVENT_JOB_SUBMITTED:
-                # Start logging a new job execution
-                job_execution = DjangoJobExecution.atomic_update_or_create(
-                    cls.lock,
-                    event.job_id,
-                    event.scheduled_run_times[0],
-                    DjangoJobExecution.SENT,
-                )
+        if event.code == events.EVENT_JOB_SUBMITTED:
+            # Start logging a new job execution
+            status = DjangoJobExecution.SENT
+            exception = None
+
+        elif event.code == events.EVENT_JOB_MAX_INSTANCES:
+            status = DjangoJobExecution.MAX_INSTANCES
+            exception = (
+                f"Execution of job '{event.job_id}' skipped: maximum number of running "
+                f"instances reached!"
+            )
 
-            elif event.code == events.EVENT_JOB_MAX_INSTANCES:
-                status = DjangoJobExecution.MAX_INSTANCES
+        else:
+            raise NotImplementedError(
+                f"Don't know how to handle JobSubmissionEvent '{event.code}'. Expected "
+                f"one of '{[events.EVENT_JOB_SUBMITTED, events.EVENT_JOB_MAX_INSTANCES]}'."
+            )
+
+        # The executor might already have reported some of the run times as missed, before the submission event is
+        # received. Don't log those again.
+        run_times = [
+            run_time
+            for run_time in event.scheduled_run_times
+            if cls._get_collapsed_missed_run(event.job_id, run_time) is None
+        ]
+        if not run_times:
+            return None
 
-                exception = (
-                    f"Execution of job '{event.job_id}' skipped: maximum number of running "
-                    f"instances reached!"
+        if status == DjangoJobExecution.SENT and len(run_times) > 1:
+            # A job that does not coalesce its runs is catching up on the runs that it missed
+            try:
+                missed_run_times = cls._get_missed_run_times(event.job_id, run_times)
+                if missed_run_times:
+                    execution_id = cls._log_missed_runs(event.job_id, missed_run_times)
+                    run_times = [
+                        run_time
+                        for run_time in run_times
+                        if run_time not in missed_run_times
+                    ]
+                    if not run_times:
+                        return execution_id
+            except IntegrityError:
+                logger.warning(
+                    f"Job '{event.job_id}' no longer exists! Skipping logging of job execution..."
                 )
+                return None
+
+        if status == DjangoJobExecution.SENT and getattr(
+            settings, "APSCHEDULER_SINGLE_WRITE_EXECUTIONS", False
+        ):
+            # Only the outcome of the execution is written to the database (see `checkpoint_running_executions`)
+            with cls._running_executions_lock:
+                if cls._checkpoint_thread is not None:
+                    for run_time in run_times:
+                        cls._running_executions[(event.job_id, run_time)] = (
+                            time.monotonic()
+                        )
+            return None
 
+        try:
+            if len(run_times) == 1:
                 job_execution = DjangoJobExecution.atomic_update_or_create(
                     cls.lock,
                     event.job_id,
-                    event.scheduled_run_times[0],
+                    run_times[0],
                     status,
                     exception=exception,
                 )
-            else:
-                raise NotImplementedError(
-                    f"Don't know how to handle JobSubmissionEvent '{event.code}'. Expected "
-                    f"one of '{[events.EVENT_JOB_SUBMITTED, events.EVENT_JOB_MAX_INSTANCES]}'."
+                return job_execution.id
+
+            # Jobs that do not coalesce their runs can submit several run times at once when catching up
+            DjangoJobExecution.atomic_bulk_create(
+                cls.lock, event.job_id, run_times, status, exception=exception
+            )
+            return (
+                DjangoJobExecution.objects.filter(
+                    job_id=event.job_id,
+                    run_time=get_django_internal_datetime(run_times[0]),
                 )
+                .values_list("id", flat=True)
+                .first()
+            )
+
         except IntegrityError:
             logger.warning(
                 f"Job '{event.job_id}' no longer exists! Skipping logging of job execution..."
             )
             return None
 
-        return job_execution.id
-
     @classmethod
     def handle_execution_event(cls, event: JobExecutionEvent) -> Union[int, None]:
         """
@@ -96,13 +488,20 @@ class DjangoResultStoreMixin:
                 f"'{events.EVENT_JOB_EXECUTED}'."
             )
 
+        run_data = util.pop_job_run_data(event.job_id, event.scheduled_run_time)
+        cls._discard_running_execution(event.job_id, event.scheduled_run_time)
+        cls._close_missed_runs(event.job_id)
+
         try:
             job_execution = DjangoJobExecution.atomic_update_or_create(
                 cls.lock,
                 event.job_id,
                 event.scheduled_run_time,
                 DjangoJobExecution.SUCCESS,
+                resource_usage=run_data.get("resource_usage"),
             )
+            cls._store_job_run_data(job_execution, run_data)
+            cls._check_slow_run(job_execution)
         except IntegrityError:
             logger.warning(
                 f"Job '{event.job_id}' no longer exists! Skipping logging of job execution..."
@@ -129,6 +528,10 @@ class DjangoResultStoreMixin:
                     exception = f"Job '{event.job_id}' raised an error!"
                     traceback = None
 
+                run_data = util.pop_job_run_data(event.job_id, event.scheduled_run_time)
+                cls._discard_running_execution(event.job_id, event.scheduled_run_time)
+                cls._close_missed_runs(event.job_id)
+
                 job_execution = DjangoJobExecution.atomic_update_or_create(
                     cls.lock,
                     event.job_id,
@@ -136,20 +539,24 @@ class DjangoResultStoreMixin:
                     DjangoJobExecution.ERROR,
                     exception=exception,
                     traceback=traceback,
+                    resource_usage=run_data.get("resource_usage"),
                 )
+                cls._store_job_run_data(job_execution, run_data)
+                cls._check_slow_run(job_execution)
 
             elif event.code == events.EVENT_JOB_MISSED:
-                # Job execution will not have been logged yet - do so now
-                status = DjangoJobExecution.MISSED
-                exception = f"Run time of job '{event.job_id}' was missed!"
+                cls._discard_running_execution(event.job_id, event.scheduled_run_time)
 
-                job_execution = DjangoJobExecution.atomic_update_or_create(
-                    cls.lock,
-                    event.job_id,
-                    event.scheduled_run_time,
-                    status,
-                    exception=exception,
+                # Usually logged already, when the run time was submitted
+                execution_id = cls._get_collapsed_missed_run(
+                    event.job_id, event.scheduled_run_time
                 )
+                if execution_id is None:
+                    execution_id = cls._log_missed_runs(
+                        event.job_id, [event.scheduled_run_time]
+                    )
+
+                return execution_id
 
             else:
                 raise NotImplementedError(
@@ -164,6 +571,28 @@ class DjangoResultStoreMixin:
 
         return job_execution.id
 
+    def schedule_retention_job(self):
+        """
+        Schedule a job that applies the job execution retention policies periodically, if
+        `settings.APSCHEDULER_RETENTION_INTERVAL` has been configured.
+
+        The job is only added once, even if the scheduler uses more than one job store that stores job executions.
+        """
+        interval = getattr(settings, "APSCHEDULER_RETENTION_INTERVAL", None)
+        if not interval or self._scheduler.get_job(RETENTION_JOB_ID) is not None:
+            return
+
+        self._scheduler.add_job(
+            apply_retention_policies,
+            trigger="interval",
+            seconds=interval,
+            id=RETENTION_JOB_ID,
+            jobstore=self._alias,
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True,
+        )
+
     def register_event_listeners(self):
         """
         Register various event listeners.
@@ -187,33 +616,150 @@ class DjangoResultStoreMixin:
         )
 
 
-class DjangoJobStore(DjangoResultStoreMixin, BaseJobStore):
+class _PurgeRemovedJobsMixin:
+    """
+    Purges the execution history of removed jobs in a background thread, so that removing a job with a large execution
+    history never blocks the caller. Classes using this mixin should initialize `_purge_lock`, `_purge_thread`,
+    `_purge_pending`, and `purge_batch_size`.
+    """
+
+    def _start_purge(self):
+        """Start purging the execution history of removed jobs in a background thread, if not already doing so"""
+        with self._purge_lock:
+            self._purge_pending = True
+
+            if self._purge_thread is None:
+                self._purge_thread = threading.Thread(
+                    target=self._purge_removed_jobs,
+                    name=f"{self.__class__.__name__}-purge",
+                    daemon=True,
+                )
+                self._purge_thread.start()
+
+    def _purge_removed_jobs(self):
+        try:
+            while True:
+                with self._purge_lock:
+                    if not self._purge_pending:
+                        self._purge_thread = None
+                        return
+
+                    self._purge_pending = False
+
+                DjangoJob.objects.purge_removed_jobs(batch_size=self.purge_batch_size)
+        except Exception:
+            logger.exception("Unable to purge the execution history of removed jobs!")
+            with self._purge_lock:
+                self._purge_thread = None
+        finally:
+            db.connection.close()
+
+
+class DjangoJobStore(DjangoResultStoreMixin, _PurgeRemovedJobsMixin, BaseJobStore):
     """
     Stores jobs in a Django database. Based on APScheduler's `MongoDBJobStore`.
 
     See: https://github.com/agronholm/apscheduler/blob/master/apscheduler/jobstores/mongodb.py
 
+    Removing jobs only marks the corresponding `DjangoJob` as removed: the execution history of removed jobs is purged
+    from the database in batches by a background thread, so that removing a job with a large execution history does
+    not block the scheduler.
+
+    Jobs that are triggered manually via the Django admin site are flagged in the database, and submitted to the
+    scheduler's executors the next time that the scheduler looks for due jobs. A background thread polls the database
+    for such run requests every `settings.APSCHEDULER_RUN_NOW_POLL_INTERVAL` seconds, and wakes up the scheduler
+    whenever a new request is found. The scheduler itself only looks up the requested runs once the poller has found
+    any (or on every wakeup, if polling is disabled).
+
     :param int pickle_protocol: pickle protocol level to use (for serialization), defaults to the
            highest available
+    :param int purge_batch_size: number of job executions to delete at a time when purging the execution history of
+           removed jobs
+    :param job_wrappers: decorators (e.g. `util.record_resource_usage`) to apply to the function of each job that is
+           about to be run. The wrapped functions are never persisted.
+
+    Updating a job after it has run usually only changes its next run time. The store keeps a fingerprint of the state of
+    each job that it has written, apart from the next run time, and only updates the `next_run_time` column of the
+    corresponding `DjangoJob` if that fingerprint has not changed.
     """
 
-    def __init__(self, pickle_protocol: int = pickle.HIGHEST_PROTOCOL):
+    def __init__(
+        self,
+        pickle_protocol: int = pickle.HIGHEST_PROTOCOL,
+        purge_batch_size: int = 1000,
+        job_wrappers: List[Callable] = None,
+    ):
         super().__init__()
         self.pickle_protocol = pickle_protocol
+        self.purge_batch_size = purge_batch_size
+        self.job_wrappers = job_wrappers or []
+
+        # Fingerprints of the job states (excluding the next run time) that were last written, by job ID
+        self._state_fingerprints = {}
 
+        self._purge_lock = threading.Lock()
+        self._purge_thread = None
+        self._purge_pending = False
+        self._purge_checked = False
+
+        self._run_request_poll_interval = getattr(
+            settings, "APSCHEDULER_RUN_NOW_POLL_INTERVAL", 2
+        )
+        self._run_request_poller = None
+        self._run_request_poller_stopped = threading.Event()
+        # Set by the poller when it finds run requests. Also set initially, to pick up requests that were made while
+        # the scheduler was not running.
+        self._run_requested = threading.Event()
+        self._run_requested.set()
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+
+        if self._run_request_poll_interval and self._run_request_poller is None:
+            self._run_request_poller_stopped.clear()
+            self._run_request_poller = threading.Thread(
+                target=self._poll_run_requests,
+                name=f"{self.__class__.__name__}-run-requests",
+                daemon=True,
+            )
+            self._run_request_poller.start()
+
+    @util.instrumented
     @util.retry_on_db_operational_error
     def lookup_job(self, job_id: str) -> Union[None, AppSchedulerJob]:
         try:
-            job_state = DjangoJob.objects.get(id=job_id).job_state
-            return self._reconstitute_job(job_state) if job_state else None
+            db_job = DjangoJob.objects.get(id=job_id)
+            return (
+                self._reconstitute_job(db_job.job_state, db_job.next_run_time)
+                if db_job.job_state
+                else None
+            )
 
         except DjangoJob.DoesNotExist:
             return None
 
+    @util.instrumented
     def get_due_jobs(self, now) -> List[AppSchedulerJob]:
+        if not self._purge_checked:
+            # Finish purging any jobs that were removed before the scheduler was last shut down
+            self._purge_checked = True
+            if DjangoJob._base_manager.filter(removed=True).exists():
+                self._start_purge()
+
+        if not self._run_request_poll_interval or self._run_requested.is_set():
+            # Cleared first, so that requests that are made in the meantime are picked up on the next wakeup
+            self._run_requested.clear()
+            self._submit_requested_runs(now)
+
         dt = get_django_internal_datetime(now)
-        return self._get_jobs(next_run_time__lte=dt)
+        jobs = self._get_jobs(profile=True, next_run_time__lte=dt)
+
+        for job in jobs:
+            self._wrap_job(job)
+
+        return jobs
 
+    @util.instrumented
     @util.retry_on_db_operational_error
     def get_next_run_time(self):
         try:
@@ -225,59 +771,175 @@ class DjangoJobStore(DjangoResultStoreMixin, BaseJobStore):
             # No active jobs - OK
             return None
 
+    @util.instrumented
     def get_all_jobs(self):
         jobs = self._get_jobs()
         self._fix_paused_jobs_sorting(jobs)
 
         return jobs
 
+    @util.instrumented
     @util.retry_on_db_operational_error
     def add_job(self, job: AppSchedulerJob):
+        next_run_time = get_django_internal_datetime(job.next_run_time)
+        job_state = pickle.dumps(job.__getstate__(), self.pickle_protocol)
+
         with transaction.atomic():
             try:
-                return DjangoJob.objects.create(
-                    id=job.id,
-                    next_run_time=get_django_internal_datetime(job.next_run_time),
-                    job_state=pickle.dumps(job.__getstate__(), self.pickle_protocol),
-                )
+                with transaction.atomic():
+                    return DjangoJob.objects.create(
+                        id=job.id,
+                        next_run_time=next_run_time,
+                        job_state=job_state,
+                    )
             except IntegrityError:
-                raise ConflictingIdError(job.id)
+                # The job might have been removed recently, with its execution history not having been purged yet.
+                # Re-use the existing entry in that case.
+                restored = DjangoJob._base_manager.filter(
+                    id=job.id, removed=True
+                ).update(
+                    removed=False,
+                    next_run_time=next_run_time,
+                    job_state=job_state,
+                    profile_runs=0,
+                    fingerprint=None,
+                )
+                if not restored:
+                    raise ConflictingIdError(job.id)
 
+                return DjangoJob.objects.get(id=job.id)
+
+    @util.instrumented
     @util.retry_on_db_operational_error
     def update_job(self, job: AppSchedulerJob):
+        job_state = job.__getstate__()
+        fingerprint = hashlib.sha256(
+            pickle.dumps({**job_state, "next_run_time": None}, self.pickle_protocol)
+        ).digest()
+
         # Acquire lock for update
         with transaction.atomic():
             try:
-                db_job = DjangoJob.objects.select_for_update().get(id=job.id)
+                db_job = DjangoJob.objects.select_for_update().only("id").get(id=job.id)
 
                 db_job.next_run_time = get_django_internal_datetime(job.next_run_time)
-                db_job.job_state = pickle.dumps(
-                    job.__getstate__(), self.pickle_protocol
-                )
+                update_fields = ["next_run_time"]
+                if fingerprint != self._state_fingerprints.get(job.id):
+                    db_job.job_state = pickle.dumps(job_state, self.pickle_protocol)
+                    update_fields.append("job_state")
 
-                db_job.save()
+                db_job.save(update_fields=update_fields)
 
             except DjangoJob.DoesNotExist:
                 raise JobLookupError(job.id)
 
+        self._state_fingerprints[job.id] = fingerprint
+
+    @util.instrumented
     @util.retry_on_db_operational_error
     def remove_job(self, job_id: str):
         with transaction.atomic():
             try:
-                DjangoJob.objects.select_for_update().get(id=job_id).delete()
+                DjangoJob.objects.select_for_update().only("id").get(id=job_id)
             except DjangoJob.DoesNotExist:
                 raise JobLookupError(job_id)
 
+            DjangoJob.objects.filter(id=job_id).update(removed=True, next_run_time=None)
+
+        self._state_fingerprints.pop(job_id, None)
+        self._forget_job(job_id)
+        self._start_purge()
+
+    @util.instrumented
     @util.retry_on_db_operational_error
     def remove_all_jobs(self):
-        # Implicit: will also delete all DjangoJobExecutions due to on_delete=models.CASCADE
-        DjangoJob.objects.all().delete()
+        # The corresponding DjangoJobExecutions are purged in the background
+        DjangoJob.objects.all().update(removed=True, next_run_time=None)
+        self._state_fingerprints.clear()
+        self._forget_all_jobs()
+        self._start_purge()
 
     def shutdown(self):
+        self._run_request_poller_stopped.set()
+        self._run_request_poller = None
+        self._stop_checkpoints()
+
         db.connection.close()
 
-    def _reconstitute_job(self, job_state):
+    def _wrap_job(self, job: AppSchedulerJob) -> AppSchedulerJob:
+        # Assigning `func` directly leaves `func_ref` unchanged, so the wrappers are never persisted.
+        for wrapper in self.job_wrappers:
+            job.func = wrapper(job.func)
+
+        return job
+
+    def _poll_run_requests(self):
+        while not self._run_request_poller_stopped.wait(
+            self._run_request_poll_interval
+        ):
+            try:
+                if DjangoJob.objects.filter(run_requested_at__isnull=False).exists():
+                    self._run_requested.set()
+                    self._scheduler.wakeup()
+            except Exception:
+                logger.exception("Unable to poll for job run requests!")
+            finally:
+                db.close_old_connections()
+
+        db.connection.close()
+
+    @util.retry_on_db_operational_error
+    def _submit_requested_runs(self, now):
+        """
+        Submit the jobs for which a run has been requested via the Django admin site directly to their executors. The
+        schedule of the jobs is left untouched.
+        """
+        run_requests = DjangoJob.objects.filter(
+            run_requested_at__isnull=False
+        ).values_list("id", "job_state", "next_run_time", "run_requested_at")
+
+        for job_id, job_state, next_run_time, requested_at in run_requests:
+            # Claim the request, in case more than one scheduler is sharing the same database
+            if not DjangoJob.objects.filter(
+                id=job_id, run_requested_at=requested_at
+            ).update(run_requested_at=None):
+                continue
+
+            try:
+                job = self._wrap_job(self._reconstitute_job(job_state, next_run_time))
+                executor = self._scheduler._lookup_executor(job.executor)
+            except Exception:
+                logger.exception(f"Unable to run job '{job_id}' on request!")
+                continue
+
+            run_times = [now]
+            try:
+                executor.submit_job(job, run_times)
+            except MaxInstancesReachedError:
+                logger.warning(
+                    f"Requested run of job '{job}' skipped: maximum number of running instances reached "
+                    f"({job.max_instances})."
+                )
+                event_code = events.EVENT_JOB_MAX_INSTANCES
+            except Exception:
+                logger.exception(
+                    f"Error submitting job '{job}' to executor '{job.executor}'!"
+                )
+                continue
+            else:
+                logger.info(f"Submitted job '{job}' to run on request.")
+                event_code = events.EVENT_JOB_SUBMITTED
+
+            self._scheduler._dispatch_event(
+                JobSubmissionEvent(event_code, job.id, self._alias, run_times)
+            )
+
+    def _reconstitute_job(self, job_state, next_run_time):
+        started = time.perf_counter()
         job_state = pickle.loads(job_state)
+        util.record_unpickle_time(time.perf_counter() - started)
+        _restore_next_run_time(job_state, next_run_time)
+
         job = AppSchedulerJob.__new__(AppSchedulerJob)
         job.__setstate__(job_state)
         job._scheduler = self._scheduler
@@ -286,25 +948,43 @@ class DjangoJobStore(DjangoResultStoreMixin, BaseJobStore):
         return job
 
     @util.retry_on_db_operational_error
-    def _get_jobs(self, **filters):
+    def _get_jobs(self, profile: bool = False, **filters):
+        """
+        :param profile: Wrap the jobs that have been flagged for profiling with `util.profile_job_run`. The flag is
+        retrieved as part of the same query that retrieves the jobs, so that there is no additional database overhead if
+        profiling has not been requested. The number of runs that remain to be profiled is counted down when the
+        profile of a run is stored (see `_store_job_run_data`).
+        """
         jobs = []
         failed_job_ids = set()
 
-        job_states = DjangoJob.objects.filter(**filters).values_list("id", "job_state")
-        for job_id, job_state in job_states:
+        job_states = DjangoJob.objects.filter(**filters).values_list(
+            "id", "job_state", "next_run_time", "profile_runs"
+        )
+        for job_id, job_state, next_run_time, profile_runs in job_states:
             try:
-                jobs.append(self._reconstitute_job(job_state))
+                job = self._reconstitute_job(job_state, next_run_time)
             # TODO: Make this except clause more specific
             except Exception:
                 self._logger.exception(
                     f"Unable to restore job '{job_id}'. Removing it..."
                 )
                 failed_job_ids.add(job_id)
+                continue
+
+            if profile and profile_runs:
+                # Assigning `func` directly leaves `func_ref` unchanged, so the wrapper is never persisted.
+                job.func = util.profile_job_run(job.func)
+
+            jobs.append(job)
 
         # Remove all the jobs we failed to restore
         if failed_job_ids:
             logger.warning(f"Removing failed jobs: {failed_job_ids}")
-            DjangoJob.objects.filter(id__in=failed_job_ids).delete()
+            DjangoJob.objects.filter(id__in=failed_job_ids).update(
+                removed=True, next_run_time=None
+            )
+            self._start_purge()
 
         return jobs
 
@@ -312,6 +992,137 @@ class DjangoJobStore(DjangoResultStoreMixin, BaseJobStore):
         return f"<{self.__class__.__name__}(pickle_protocol={self.pickle_protocol})>"
 
 
+class _JobEntry:
+    """An entry in the index of an `IndexedMemoryJobStore`"""
+
+    __slots__ = ("job", "timestamp", "removed")
+
+    def __init__(self, job: AppSchedulerJob, timestamp: Union[float, None]):
+        self.job = job
+        self.timestamp = timestamp
+        self.removed = False
+
+
+class IndexedMemoryJobStore(BaseJobStore):
+    """
+    Stores jobs in RAM, like APScheduler's `MemoryJobStore`, but keeps the jobs that have a next run time in a heap
+    instead of a sorted list. Adding, updating, and removing a job takes O(log n) time instead of O(n), which makes a
+    big difference for job stores that contain tens of thousands of jobs or more.
+
+    Removed and rescheduled jobs are not deleted from the heap straight away: their old entries are flagged as removed
+    and skipped, and the heap is compacted once more than half of its entries have been removed.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # (timestamp, job ID, sequence number, _JobEntry) tuples of all jobs with a next run time, plus any removed
+        # entries. Tuples are compared much faster than custom objects. The sequence number breaks the tie between a
+        # removed entry and a live entry of the same job with the same timestamp, so that entries are never compared.
+        self._heap = []
+        self._sequence = itertools.count()
+        self._jobs_index = {}  # id -> _JobEntry lookup table
+        self._removed_entries = 0
+
+    def lookup_job(self, job_id: str) -> Union[None, AppSchedulerJob]:
+        entry = self._jobs_index.get(job_id)
+        return entry.job if entry is not None else None
+
+    def get_due_jobs(self, now) -> List[AppSchedulerJob]:
+        now_timestamp = datetime_to_utc_timestamp(now)
+        due = []
+
+        # Pop the due entries in order, and push them back once done. Removed entries are discarded along the way.
+        while self._heap and self._heap[0][0] <= now_timestamp:
+            item = heapq.heappop(self._heap)
+            if item[-1].removed:
+                self._removed_entries -= 1
+            else:
+                due.append(item)
+
+        for item in due:
+            heapq.heappush(self._heap, item)
+
+        return [item[-1].job for item in due]
+
+    def get_next_run_time(self):
+        self._discard_removed_entries()
+        return self._heap[0][-1].job.next_run_time if self._heap else None
+
+    def get_all_jobs(self) -> List[AppSchedulerJob]:
+        # Same order as `MemoryJobStore`: by next run time and job ID, with paused jobs last
+        entries = sorted(
+            self._jobs_index.values(),
+            key=lambda entry: (
+                float("inf") if entry.timestamp is None else entry.timestamp,
+                entry.job.id,
+            ),
+        )
+        return [entry.job for entry in entries]
+
+    def add_job(self, job: AppSchedulerJob):
+        if job.id in self._jobs_index:
+            raise ConflictingIdError(job.id)
+
+        self._add_entry(job, datetime_to_utc_timestamp(job.next_run_time))
+
+    def update_job(self, job: AppSchedulerJob):
+        old_entry = self._jobs_index.get(job.id)
+        if old_entry is None:
+            raise JobLookupError(job.id)
+
+        timestamp = datetime_to_utc_timestamp(job.next_run_time)
+        if timestamp == old_entry.timestamp:
+            # The position of the job in the heap remains the same
+            old_entry.job = job
+            return
+
+        self._remove_entry(old_entry)
+        self._add_entry(job, timestamp)
+
+    def remove_job(self, job_id: str):
+        entry = self._jobs_index.pop(job_id, None)
+        if entry is None:
+            raise JobLookupError(job_id)
+
+        self._remove_entry(entry)
+
+    def remove_all_jobs(self):
+        self._heap = []
+        self._jobs_index = {}
+        self._removed_entries = 0
+
+    def shutdown(self):
+        self.remove_all_jobs()
+
+    def _add_entry(self, job: AppSchedulerJob, timestamp: Union[float, None]):
+        entry = _JobEntry(job, timestamp)
+        self._jobs_index[job.id] = entry
+
+        # Paused jobs are only kept in the index
+        if timestamp is not None:
+            heapq.heappush(self._heap, (timestamp, job.id, next(self._sequence), entry))
+
+    def _remove_entry(self, entry: _JobEntry):
+        if entry.timestamp is None:
+            return
+
+        entry.removed = True
+        self._removed_entries += 1
+
+        if self._removed_entries > len(self._heap) // 2:
+            self._heap = [item for item in self._heap if not item[-1].removed]
+            heapq.heapify(self._heap)
+            self._removed_entries = 0
+
+    def _discard_removed_entries(self):
+        while self._heap and self._heap[0][-1].removed:
+            heapq.heappop(self._heap)
+            self._removed_entries -= 1
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}>"
+
+
 class DjangoMemoryJobStore(DjangoResultStoreMixin, MemoryJobStore):
     """
     Adds the DjangoResultStoreMixin to the standard MemoryJobStore so that job executions can be
@@ -321,6 +1132,241 @@ class DjangoMemoryJobStore(DjangoResultStoreMixin, MemoryJobStore):
     pass
 
 
+class DjangoIndexedMemoryJobStore(DjangoResultStoreMixin, IndexedMemoryJobStore):
+    """
+    Adds the DjangoResultStoreMixin to `IndexedMemoryJobStore` so that job executions can be logged to the Django
+    database. A drop-in replacement for `DjangoMemoryJobStore` that scales to much larger numbers of jobs.
+    """
+
+    pass
+
+
+class DjangoWriteBehindJobStore(
+    DjangoResultStoreMixin, _PurgeRemovedJobsMixin, IndexedMemoryJobStore
+):
+    """
+    Keeps all of the jobs in memory, like `DjangoIndexedMemoryJobStore`, but also persists them to the Django database so that
+    they survive a restart.
+
+    The jobs are loaded from the database with a single query when the job store is started. After that, looking up
+    jobs (including `get_due_jobs` and `get_next_run_time`) never touches the database: changes are queued and written
+    to the database by a background thread every `flush_interval` seconds, and once more when the job store is shut
+    down. Only the latest state of each job is written, no matter how many times the job was changed in between. New
+    jobs are the exception: they are written straight away, so that their executions can always be logged. The
+    execution history of removed jobs is purged in the background.
+
+    This removes all database round trips from the scheduling loop, which makes a big difference for jobs that run
+    every second or so. The trade-off is that up to `flush_interval` seconds worth of changes can be lost if the process
+    is killed, and that the job store must be the only one that accesses its jobs: runs that are requested via the
+    Django admin site are not picked up, and changes that other processes make to the jobs are overwritten.
+
+    :param flush_interval: number of seconds between writes to the database. Set to None to only write changes to the
+           database when `flush` is called explicitly, or when the job store is shut down.
+    :param int pickle_protocol: pickle protocol level to use (for serialization), defaults to the
+           highest available
+    :param int purge_batch_size: number of job executions to delete at a time when purging the execution history of
+           removed jobs
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 1,
+        pickle_protocol: int = pickle.HIGHEST_PROTOCOL,
+        purge_batch_size: int = 1000,
+    ):
+        super().__init__()
+        self.flush_interval = flush_interval
+        self.pickle_protocol = pickle_protocol
+        self.purge_batch_size = purge_batch_size
+
+        # The jobs that still need to be written to the database, keyed on job ID. Removed jobs are recorded as None.
+        self._pending_writes = {}
+        self._pending_remove_all = False
+        self._pending_lock = threading.Lock()
+
+        # Flushes are serialized, so that an older state of a job never overwrites a newer one
+        self._flush_lock = threading.Lock()
+        self._flush_thread = None
+        self._flush_stopped = threading.Event()
+
+        self._purge_lock = threading.Lock()
+        self._purge_thread = None
+        self._purge_pending = False
+
+    def start(self, scheduler, alias):
+        # Load the jobs before the result store schedules any jobs of its own
+        self._load_jobs(scheduler, alias)
+        super().start(scheduler, alias)
+
+        # Finish purging any jobs that were removed before the scheduler was last shut down
+        if DjangoJob._base_manager.filter(removed=True).exists():
+            self._start_purge()
+
+        if self.flush_interval and self._flush_thread is None:
+            self._flush_stopped.clear()
+            self._flush_thread = threading.Thread(
+                target=self._flush_periodically,
+                name=f"{self.__class__.__name__}-flush",
+                daemon=True,
+            )
+            self._flush_thread.start()
+
+    def add_job(self, job: AppSchedulerJob):
+        super().add_job(job)
+        self._queue_write(job.id, job)
+
+        # New jobs are written straight away: the executions of a job cannot be logged until it exists in the database
+        self.flush()
+
+    def update_job(self, job: AppSchedulerJob):
+        super().update_job(job)
+        self._queue_write(job.id, job)
+
+    def remove_job(self, job_id: str):
+        super().remove_job(job_id)
+        self._queue_write(job_id, None)
+
+    def remove_all_jobs(self):
+        super().remove_all_jobs()
+        with self._pending_lock:
+            self._pending_writes.clear()
+            self._pending_remove_all = True
+
+    def shutdown(self):
+        self._flush_stopped.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join()
+            self._flush_thread = None
+
+        self.flush()
+
+        # The jobs have been persisted, so only the in-memory copies are discarded
+        IndexedMemoryJobStore.remove_all_jobs(self)
+        self._stop_checkpoints()
+        db.connection.close()
+
+    @util.instrumented
+    def flush(self) -> int:
+        """
+        Write all of the pending changes to the database.
+
+        :return: The number of jobs that were written. Changes that could not be written are kept, and retried on the
+        next flush.
+        """
+        with self._flush_lock:
+            with self._pending_lock:
+                writes, self._pending_writes = self._pending_writes, {}
+                remove_all, self._pending_remove_all = self._pending_remove_all, False
+
+            if not writes and not remove_all:
+                return 0
+
+            try:
+                self._write(writes, remove_all)
+            except (DatabaseError, pickle.PicklingError):
+                logger.exception(
+                    "Unable to write jobs to the database! Retrying later..."
+                )
+                with self._pending_lock:
+                    # Don't overwrite any changes that were made to the same jobs in the meantime
+                    for job_id, job in writes.items():
+                        self._pending_writes.setdefault(job_id, job)
+                    self._pending_remove_all |= remove_all
+
+                return 0
+
+            return len(writes)
+
+    def _queue_write(self, job_id: str, job: Union[AppSchedulerJob, None]):
+        with self._pending_lock:
+            self._pending_writes[job_id] = job
+
+    @util.retry_on_db_operational_error
+    def _write(self, writes: dict, remove_all: bool):
+        removed = remove_all
+
+        with transaction.atomic():
+            if remove_all:
+                DjangoJob.objects.all().update(removed=True, next_run_time=None)
+
+            for job_id, job in writes.items():
+                if job is None:
+                    removed |= bool(
+                        DjangoJob.objects.filter(id=job_id).update(
+                            removed=True, next_run_time=None
+                        )
+                    )
+                    continue
+
+                next_run_time = get_django_internal_datetime(job.next_run_time)
+                job_state = pickle.dumps(job.__getstate__(), self.pickle_protocol)
+
+                # Also revives jobs that were removed, but whose execution history has not been purged yet
+                if not DjangoJob._base_manager.filter(id=job_id).update(
+                    removed=False, next_run_time=next_run_time, job_state=job_state
+                ):
+                    DjangoJob.objects.create(
+                        id=job_id, next_run_time=next_run_time, job_state=job_state
+                    )
+
+        if removed:
+            # Purged in the background, so that flushes are not held up by a large execution history
+            self._start_purge()
+
+    def _flush_periodically(self):
+        try:
+            while not self._flush_stopped.wait(self.flush_interval):
+                self.flush()
+        finally:
+            db.connection.close()
+
+    @util.retry_on_db_operational_error
+    def _load_jobs(self, scheduler, alias):
+        IndexedMemoryJobStore.remove_all_jobs(self)
+
+        job_states = DjangoJob.objects.values_list("id", "job_state", "next_run_time")
+        for job_id, job_state, next_run_time in job_states:
+            try:
+                job_state = pickle.loads(job_state)
+                _restore_next_run_time(job_state, next_run_time)
+                job = AppSchedulerJob.__new__(AppSchedulerJob)
+                job.__setstate__(job_state)
+                job._scheduler = scheduler
+                job._jobstore_alias = alias
+            except Exception:
+                # Unpickling a job imports its function and arguments, which can raise just about any exception
+                logger.exception(f"Unable to restore job '{job_id}'. Removing it...")
+                self._queue_write(job_id, None)
+                continue
+
+            timestamp = datetime_to_utc_timestamp(job.next_run_time)
+            entry = self._jobs_index[job.id] = _JobEntry(job, timestamp)
+            if timestamp is not None:
+                self._heap.append((timestamp, job.id, next(self._sequence), entry))
+
+        # Build the heap all at once, instead of pushing the jobs one by one
+        heapq.heapify(self._heap)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(pickle_protocol={self.pickle_protocol})>"
+
+
+@util.close_old_connections
+def apply_retention_policies():
+    """
+    Delete the job executions that should no longer be retained, in bounded batches.
+
+    This job is scheduled automatically if `settings.APSCHEDULER_RETENTION_INTERVAL` is set. The time spent on each run
+    is limited to `settings.APSCHEDULER_RETENTION_MAX_RUNTIME` seconds, so that the job does not compete with other jobs
+    for database resources for too long. Any remaining job executions are deleted on the next run.
+    """
+    deleted = DjangoJobExecution.objects.apply_retention_policies(
+        batch_size=getattr(settings, "APSCHEDULER_RETENTION_BATCH_SIZE", 1000),
+        max_runtime=getattr(settings, "APSCHEDULER_RETENTION_MAX_RUNTIME", 60),
+    )
+    logger.info(f"Deleted {deleted} job executions.")
+
+
 def register_events(scheduler, result_storage=None):
     # TODO: Remove this deprecated function in release 1.0
     # DjangoResultStoreMixin now takes care of registering event listeners automatically when the scheduler is started.
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from django_apscheduler.models import DjangoJobExecution
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the job executions that should no longer be retained according to settings.APSCHEDULER_RETENTION_POLICY "
+        "and settings.APSCHEDULER_JOB_RETENTION_POLICIES."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "APSCHEDULER_RETENTION_BATCH_SIZE", 1000),
+            help="Maximum number of job executions to delete per transaction.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Number of seconds to pause between batches.",
+        )
+        parser.add_argument(
+            "--max-runtime",
+            type=float,
+            default=None,
+            help="Stop after this many seconds, even if not all job executions could be deleted yet.",
+        )
+
+    def handle(self, *args, **options):
+        def report_progress(deleted):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"Deleted {deleted} job executions...")
+
+        deleted = DjangoJobExecution.objects.apply_retention_policies(
+            batch_size=options["batch_size"],
+            sleep=options["sleep"],
+            max_runtime=options["max_runtime"],
+            progress_callback=report_progress,
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} job executions."))
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from django_apscheduler.archive import COMPRESSION_FORMATS, JobExecutionArchiver
+from django_apscheduler.models import DjangoJobExecution
+
+
+class Command(BaseCommand):
+    help = (
+        "Archives job executions to compressed JSON Lines files before deleting them from the database. By default, "
+        "the job executions that should no longer be retained according to the configured retention policies are "
+        "archived."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "directory", help="Directory to write the archive files to."
+        )
+        parser.add_argument(
+            "--max-age",
+            type=int,
+            default=None,
+            help="Archive all job executions older than this many seconds, instead of applying the retention policies.",
+        )
+        parser.add_argument(
+            "--compression",
+            choices=list(COMPRESSION_FORMATS),
+            default="gzip",
+            help="Compression format to use for the archive files.",
+        )
+        parser.add_argument(
+            "--rows-per-file",
+            type=int,
+            default=100_000,
+            help="Maximum number of job executions to write to each archive file.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of job executions to read and delete at a time.",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Do not delete job executions from the database after they have been archived.",
+        )
+
+    def handle(self, *args, **options):
+        if options["max_age"] is not None:
+            querysets = [
+                DjangoJobExecution.objects.filter(
+                    run_time__lte=timezone.now() - timedelta(seconds=options["max_age"])
+                )
+            ]
+        else:
+            querysets = DjangoJobExecution.objects.get_querysets_to_purge()
+
+        with JobExecutionArchiver(
+            options["directory"],
+            compression=options["compression"],
+            rows_per_file=options["rows_per_file"],
+            batch_size=options["batch_size"],
+            delete=not options["keep"],
+        ) as archiver:
+            for queryset in querysets:
+                archiver.archive(queryset)
+
+        for manifest in archiver.manifests:
+            self.stdout.write(
+                f"{manifest['file']}: {manifest['rows']} job executions (sha256: {manifest['sha256']})"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {archiver.rows_archived} job executions to {len(archiver.manifests)} file(s)."
+            )
+        )
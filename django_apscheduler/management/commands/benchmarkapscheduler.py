@@ -0,0 +1,116 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from django_apscheduler.benchmarks import SCENARIOS, run_benchmarks, test_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the hot paths of the job store and result store, and writes the results as JSON. The benchmarks are "
+        "run against a test database that is created from the 'default' database settings, and destroyed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=list(SCENARIOS),
+            dest="scenarios",
+            help="Scenario to run. Can be specified more than once. Defaults to all scenarios.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of times to repeat each latency measurement.",
+        )
+        parser.add_argument(
+            "--num-jobs",
+            type=int,
+            default=1000,
+            help="Number of jobs to add, update, and remove, and to display in the Django admin.",
+        )
+        parser.add_argument(
+            "--job-counts",
+            type=int,
+            nargs="+",
+            default=[1000, 10_000, 100_000],
+            help="Sizes of the job store to measure the latency of 'get_due_jobs' for.",
+        )
+        parser.add_argument(
+            "--num-due",
+            type=int,
+            default=100,
+            help="Number of jobs that are due when measuring the latency of 'get_due_jobs'.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            nargs="+",
+            default=[1, 2, 4, 8, 16, 32, 64],
+            help="Numbers of threads to log job execution events from.",
+        )
+        parser.add_argument(
+            "--events-per-thread",
+            type=int,
+            default=100,
+            help="Number of job execution events to log from each thread.",
+        )
+        parser.add_argument(
+            "--num-executions",
+            type=int,
+            default=10_000,
+            help="Number of job executions to display in the Django admin, and to delete.",
+        )
+        parser.add_argument(
+            "--memory-job-counts",
+            type=int,
+            nargs="+",
+            default=[10_000, 100_000, 1_000_000],
+            help="Sizes of the in-memory job stores to measure the throughput of adding, updating, and removing jobs for.",
+        )
+        parser.add_argument(
+            "--num-operations",
+            type=int,
+            default=1000,
+            help="Number of jobs to add, update, and remove when benchmarking the in-memory job stores.",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            default=None,
+            help="Write the results to this file instead of stdout.",
+        )
+        parser.add_argument(
+            "--noinput",
+            "--no-input",
+            action="store_false",
+            dest="interactive",
+            help="Do not prompt before destroying an existing test database.",
+        )
+
+    def handle(self, *args, **options):
+        with test_database(options["interactive"]):
+            results = run_benchmarks(
+                options["scenarios"],
+                repeat=options["repeat"],
+                num_jobs=options["num_jobs"],
+                job_counts=options["job_counts"],
+                num_due=options["num_due"],
+                thread_counts=options["threads"],
+                events_per_thread=options["events_per_thread"],
+                num_executions=options["num_executions"],
+                memory_job_counts=options["memory_job_counts"],
+                num_operations=options["num_operations"],
+            )
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            options["output"].write_text(output)
+            self.stdout.write(
+                self.style.SUCCESS(f"Wrote benchmark results to '{options['output']}'.")
+            )
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from django_apscheduler.archive import load_archive
+
+
+class Command(BaseCommand):
+    help = "Re-imports job executions from archive files that were created with the 'archivejobexecutions' command."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "manifests",
+            nargs="+",
+            help="Manifest files ('*.manifest.json') of the archives to load.",
+        )
+        parser.add_argument(
+            "--database",
+            default="default",
+            help="Database to load the job executions into.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of job executions to insert at a time.",
+        )
+
+    def handle(self, *args, **options):
+        for manifest in options["manifests"]:
+            try:
+                loaded, skipped = load_archive(
+                    manifest,
+                    using=options["database"],
+                    batch_size=options["batch_size"],
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+
+            self.stdout.write(
+                f"{manifest}: loaded {loaded} job executions, skipped {skipped}."
+            )
@@ -0,0 +1,133 @@
+import argparse
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from django_apscheduler.benchmarks import get_environment, test_database
+from django_apscheduler.benchmarks.load import TRIGGER_TYPES, run_load_test
+
+
+def trigger_weight(value: str):
+    """Parse a '<trigger type>=<weight>' command line argument"""
+    trigger_type, _, weight = value.partition("=")
+    if trigger_type not in TRIGGER_TYPES:
+        raise argparse.ArgumentTypeError(
+            f"Unknown trigger type '{trigger_type}'. Expected any of {TRIGGER_TYPES}."
+        )
+
+    try:
+        return trigger_type, float(weight or 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid weight '{weight}'.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Registers synthetic jobs with a DjangoJobStore, runs a real scheduler for a fixed window, and reports the lag "
+        "between the scheduled and actual start times of the jobs as JSON. The load test is run against a test database "
+        "that is created from the 'default' database settings, and destroyed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--num-jobs",
+            type=int,
+            default=1000,
+            help="Number of synthetic jobs to register.",
+        )
+        parser.add_argument(
+            "--window",
+            type=float,
+            default=60,
+            help="Number of seconds to run the scheduler for.",
+        )
+        parser.add_argument(
+            "--trigger-mix",
+            type=trigger_weight,
+            nargs="+",
+            default=[("interval", 1)],
+            metavar="TRIGGER=WEIGHT",
+            help=f"Relative weights of the triggers of the jobs, e.g. 'interval=6 cron=3 date=1'. Any of "
+            f"{', '.join(TRIGGER_TYPES)}.",
+        )
+        parser.add_argument(
+            "--min-interval",
+            type=float,
+            default=1,
+            help="Minimum number of seconds between runs of the same interval or cron job.",
+        )
+        parser.add_argument(
+            "--max-interval",
+            type=float,
+            default=30,
+            help="Maximum number of seconds between runs of the same interval or cron job.",
+        )
+        parser.add_argument(
+            "--min-duration",
+            type=float,
+            default=0,
+            help="Minimum number of seconds that each job run takes.",
+        )
+        parser.add_argument(
+            "--max-duration",
+            type=float,
+            default=0.1,
+            help="Maximum number of seconds that each job run takes.",
+        )
+        parser.add_argument(
+            "--max-workers",
+            type=int,
+            default=10,
+            help="Number of threads of the executor that runs the jobs.",
+        )
+        parser.add_argument(
+            "--misfire-grace-time",
+            type=int,
+            default=1,
+            help="Number of seconds that a job run is allowed to be late before it is considered to have been missed.",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=None,
+            help="Seed for generating the jobs, to repeat the same workload.",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            default=None,
+            help="Write the results to this file instead of stdout.",
+        )
+        parser.add_argument(
+            "--noinput",
+            "--no-input",
+            action="store_false",
+            dest="interactive",
+            help="Do not prompt before destroying an existing test database.",
+        )
+
+    def handle(self, *args, **options):
+        with test_database(options["interactive"]):
+            result = run_load_test(
+                num_jobs=options["num_jobs"],
+                window=options["window"],
+                trigger_mix=dict(options["trigger_mix"]),
+                min_interval=options["min_interval"],
+                max_interval=options["max_interval"],
+                min_duration=options["min_duration"],
+                max_duration=options["max_duration"],
+                max_workers=options["max_workers"],
+                misfire_grace_time=options["misfire_grace_time"],
+                seed=options["seed"],
+            )
+            environment = get_environment()
+
+        output = json.dumps({"environment": environment, **result}, indent=2)
+        if options["output"]:
+            options["output"].write_text(output)
+            self.stdout.write(
+                self.style.SUCCESS(f"Wrote load test results to '{options['output']}'.")
+            )
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,202 @@
+import copy
+import importlib
+import signal
+import threading
+import time
+from typing import Union
+
+from apscheduler import events
+from apscheduler.schedulers.background import BackgroundScheduler
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from django_apscheduler import util
+from django_apscheduler.jobstores import DjangoJobStore
+from django_apscheduler.registry import registry
+
+DEFAULT_EXECUTORS = {"default": {"type": "threadpool", "max_workers": 10}}
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs APScheduler with a DjangoJobStore, using the executors configured in settings.APSCHEDULER_EXECUTORS. "
+        "Running jobs are allowed to complete before the scheduler is shut down on SIGINT or SIGTERM."
+    )
+
+    # Signals that trigger a graceful shutdown of the scheduler
+    shutdown_signals = [signal.SIGINT, signal.SIGTERM]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-workers",
+            type=int,
+            default=None,
+            help="Override the maximum number of workers of the default executor.",
+        )
+        parser.add_argument(
+            "--process-pool",
+            action="store_true",
+            help="Run jobs in a DjangoProcessPoolExecutor instead of a thread pool (default executor only).",
+        )
+        parser.add_argument(
+            "--record-resource-usage",
+            action="store_true",
+            help="Record the CPU time, memory, and database queries used by every job run.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        scheduler, jobstore = self.create_scheduler(
+            max_workers=options["max_workers"],
+            process_pool=options["process_pool"],
+            record_resource_usage=options["record_resource_usage"],
+        )
+
+        timer = time.monotonic()
+        modules = self.preload_job_modules(scheduler)
+        self.stdout.write(
+            f"Preloaded {len(modules)} job module(s) in {time.monotonic() - timer:.3f}s."
+        )
+
+        timer = time.monotonic()
+        result = self.reconcile_registered_jobs(scheduler)
+        if result is not None:
+            self.stdout.write(
+                f"Reconciled {len(registry.definitions)} registered job(s) in "
+                f"{time.monotonic() - timer:.3f}s: {len(result['created'])} created, {len(result['updated'])} updated, "
+                f"{len(result['removed'])} removed."
+            )
+
+        # Load all of the jobs once up front: this reports how long it takes to restore the jobs from the database, and
+        # also weeds out any jobs that can no longer be restored before the scheduler starts.
+        timer = time.monotonic()
+        jobs = jobstore.get_all_jobs()
+        self.stdout.write(
+            f"Loaded {len(jobs)} job(s) from the job store in {time.monotonic() - timer:.3f}s."
+        )
+
+        def report_startup(event):
+            self.stdout.write(
+                f"Scheduler started in {time.monotonic() - started:.3f}s."
+            )
+
+        scheduler.add_listener(report_startup, events.EVENT_SCHEDULER_STARTED)
+
+        # The scheduler runs in a background thread, while the main thread waits for a shutdown to be requested. The
+        # scheduler is then shut down from the main thread, instead of from within a signal handler (where waiting for
+        # the running jobs to complete could deadlock).
+        shutdown_requested = threading.Event()
+        scheduler.add_listener(
+            lambda event: shutdown_requested.set(), events.EVENT_SCHEDULER_SHUTDOWN
+        )
+        self.install_signal_handlers(shutdown_requested)
+
+        scheduler.start()
+        try:
+            shutdown_requested.wait()
+        except KeyboardInterrupt:
+            # Only raised if the default SIGINT handler is still in place
+            pass
+
+        if scheduler.running:
+            self.stdout.write("Waiting for running jobs to complete...")
+            # Waits for the executors to finish all running jobs (which logs their executions), before shutting down
+            # the job stores.
+            scheduler.shutdown(wait=True)
+
+        self.stdout.write(self.style.SUCCESS("Scheduler shut down successfully!"))
+
+    def create_scheduler(
+        self,
+        max_workers: int = None,
+        process_pool: bool = False,
+        record_resource_usage: bool = False,
+    ):
+        """
+        Create a scheduler that uses a `DjangoJobStore` as its default job store, and the executors, job defaults, and
+        job wrappers that are configured in the Django settings.
+
+        :return: A tuple containing the scheduler and the job store.
+        """
+        # APScheduler modifies the executor configuration in place, so make a copy first
+        executors = copy.deepcopy(
+            getattr(settings, "APSCHEDULER_EXECUTORS", DEFAULT_EXECUTORS)
+        )
+        default_executor = executors.setdefault("default", {"type": "threadpool"})
+        if process_pool:
+            default_executor.pop("type", None)
+            default_executor["class"] = (
+                "django_apscheduler.executors:DjangoProcessPoolExecutor"
+            )
+        if max_workers:
+            default_executor["max_workers"] = max_workers
+
+        job_wrappers = [
+            import_string(path)
+            for path in getattr(settings, "APSCHEDULER_JOB_WRAPPERS", [])
+        ]
+        if record_resource_usage and util.record_resource_usage not in job_wrappers:
+            job_wrappers.append(util.record_resource_usage)
+
+        scheduler = BackgroundScheduler(
+            executors=executors,
+            job_defaults=getattr(settings, "APSCHEDULER_JOB_DEFAULTS", {}),
+            timezone=settings.TIME_ZONE,
+        )
+
+        jobstore = DjangoJobStore(job_wrappers=job_wrappers)
+        scheduler.add_jobstore(jobstore, "default")
+
+        return scheduler, jobstore
+
+    def preload_job_modules(self, scheduler) -> list:
+        """
+        Import the modules listed in `settings.APSCHEDULER_JOB_MODULES`, so that the first run of each job does not
+        have to wait for its module to be imported. Modules that define a `register_jobs(scheduler)` function can use it
+        to add their jobs to the scheduler.
+        """
+        modules = []
+        for module_path in getattr(settings, "APSCHEDULER_JOB_MODULES", []):
+            module = importlib.import_module(module_path)
+
+            register_jobs = getattr(module, "register_jobs", None)
+            if callable(register_jobs):
+                register_jobs(scheduler)
+
+            modules.append(module)
+
+        return modules
+
+    def reconcile_registered_jobs(self, scheduler) -> Union[dict, None]:
+        """
+        Reconcile the jobs that are registered with the default job registry (including the ones that are defined in
+        `settings.APSCHEDULER_JOBS`) with the database. Jobs that are no longer registered are removed if
+        `settings.APSCHEDULER_PRUNE_JOBS` is enabled.
+
+        :return: The result of `JobRegistry.reconcile`, or None if there was nothing to reconcile.
+        """
+        registry.load_settings()
+        prune = getattr(settings, "APSCHEDULER_PRUNE_JOBS", False)
+        if not registry.definitions and not prune:
+            return None
+
+        return registry.reconcile(scheduler, prune=prune)
+
+    def install_signal_handlers(self, shutdown_requested: threading.Event):
+        """Request a shutdown of the scheduler (by setting `shutdown_requested`) on SIGINT or SIGTERM"""
+        if threading.current_thread() is not threading.main_thread():
+            # Signal handlers can only be installed in the main thread
+            return
+
+        def handle_signal(signum, frame):
+            # Restore the default handlers, so that sending the signal again terminates the process immediately
+            for signum_ in self.shutdown_signals:
+                signal.signal(signum_, signal.SIG_DFL)
+
+            # Only set the event here: the scheduler is shut down by the main thread once the signal handler returns
+            shutdown_requested.set()
+
+        for signum in self.shutdown_signals:
+            signal.signal(signum, handle_signal)
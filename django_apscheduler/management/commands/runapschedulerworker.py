@@ -0,0 +1,94 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from django_apscheduler import util
+from django_apscheduler.workers import QueueWorker
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the jobs that have been queued by a scheduler that uses a DjangoQueueExecutor. Running jobs are allowed "
+        "to complete before the worker is shut down on SIGINT or SIGTERM."
+    )
+
+    # Signals that trigger a graceful shutdown of the worker
+    shutdown_signals = [signal.SIGINT, signal.SIGTERM]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-workers",
+            type=int,
+            default=10,
+            help="Maximum number of jobs to run concurrently.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1,
+            help="Number of seconds to wait before looking for new runs, if the queue is empty.",
+        )
+        parser.add_argument(
+            "--claim-timeout",
+            type=float,
+            default=300,
+            help="Number of seconds after which the runs of a worker that stopped renewing its claims are re-queued.",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Stop as soon as the queue is empty.",
+        )
+        parser.add_argument(
+            "--record-resource-usage",
+            action="store_true",
+            help="Record the CPU time, memory, and database queries used by every job run.",
+        )
+
+    def handle(self, *args, **options):
+        job_wrappers = [
+            import_string(path)
+            for path in getattr(settings, "APSCHEDULER_JOB_WRAPPERS", [])
+        ]
+        if (
+            options["record_resource_usage"]
+            and util.record_resource_usage not in job_wrappers
+        ):
+            job_wrappers.append(util.record_resource_usage)
+
+        worker = QueueWorker(
+            max_workers=options["max_workers"],
+            poll_interval=options["poll_interval"],
+            job_wrappers=job_wrappers,
+            claim_timeout=options["claim_timeout"],
+        )
+        self.install_signal_handlers(worker)
+
+        self.stdout.write("Starting worker...")
+        processed = worker.run(burst=options["burst"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Worker shut down successfully after processing {processed} queued run(s)!"
+            )
+        )
+
+    def install_signal_handlers(self, worker: QueueWorker):
+        if threading.current_thread() is not threading.main_thread():
+            # Signal handlers can only be installed in the main thread
+            return
+
+        def handle_signal(signum, frame):
+            # Restore the default handlers, so that sending the signal again terminates the process immediately
+            for signum_ in self.shutdown_signals:
+                signal.signal(signum_, signal.SIG_DFL)
+
+            self.stdout.write(
+                f"Received {signal.Signals(signum).name}. Waiting for running jobs to complete..."
+            )
+            worker.stop()
+
+        for signum in self.shutdown_signals:
+            signal.signal(signum, handle_signal)
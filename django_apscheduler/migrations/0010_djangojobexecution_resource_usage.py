@@ -0,0 +1,73 @@
+# Generated by Django 4.0.10 on 2026-10-19 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_apscheduler", "0009_djangojobexecution_unique_job_executions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="djangojobexecution",
+            name="cpu_system_time",
+            field=models.DecimalField(
+                decimal_places=3,
+                default=None,
+                help_text="CPU time spent executing this job in kernel mode (in seconds), if available.",
+                max_digits=15,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="djangojobexecution",
+            name="cpu_user_time",
+            field=models.DecimalField(
+                decimal_places=3,
+                default=None,
+                help_text="CPU time spent executing this job in user mode (in seconds).",
+                max_digits=15,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="djangojobexecution",
+            name="db_query_count",
+            field=models.PositiveIntegerField(
+                default=None,
+                help_text="Number of database queries executed by this job.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="djangojobexecution",
+            name="db_query_time",
+            field=models.DecimalField(
+                decimal_places=3,
+                default=None,
+                help_text="Total time spent executing database queries (in seconds).",
+                max_digits=15,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="djangojobexecution",
+            name="memory_peak_increase",
+            field=models.BigIntegerField(
+                default=None,
+                help_text="Increase in the peak resident set size of the scheduler process while this job was running (in bytes).",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="djangojobexecution",
+            name="memory_traced_peak",
+            field=models.BigIntegerField(
+                default=None,
+                help_text="Peak memory allocated by Python while this job was running, as reported by tracemalloc (in bytes).",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.0.10 on 2026-10-19 12:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_apscheduler", "0010_djangojobexecution_resource_usage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DjangoJobExecutionProfile",
+            fields=[
+                (
+                    "execution",
+                    models.OneToOneField(
+                        help_text="The job execution that was profiled.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="profile",
+                        serialize=False,
+                        to="django_apscheduler.djangojobexecution",
+                    ),
+                ),
+                (
+                    "stats",
+                    models.BinaryField(
+                        help_text="Compressed cProfile statistics that were collected for this job execution."
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="djangojob",
+            name="profile_runs",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of upcoming runs of this job that should be profiled.",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.10 on 2026-10-19 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_apscheduler", "0011_djangojob_profile_runs_djangojobexecutionprofile"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="djangojobexecution",
+            name="slow",
+            field=models.BooleanField(
+                default=False,
+                help_text="Whether this job execution took longer than the slow run threshold of the job.",
+            ),
+        ),
+    ]
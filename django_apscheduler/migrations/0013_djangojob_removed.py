@@ -0,0 +1,21 @@
+# Generated by Django 4.0.10 on 2026-10-19 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_apscheduler", "0012_djangojobexecution_slow"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="djangojob",
+            name="removed",
+            field=models.BooleanField(
+                default=False,
+                help_text="Whether this job has been removed from the scheduler, and is waiting for its execution history to be purged from the database.",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-19 12:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_apscheduler", "0013_djangojob_removed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="djangojob",
+            name="run_requested_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="Date and time at which an immediate run of this job was requested via the Django admin site. Cleared once the scheduler has picked up the request.",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.0.10 on 2026-10-19 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_apscheduler", "0014_djangojob_run_requested_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="djangojobexecution",
+            index=models.Index(
+                fields=["run_time", "id"], name="job_executions_run_time_id"
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-19 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_apscheduler", "0015_djangojobexecution_run_time_id_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="djangojob",
+            name="fingerprint",
+            field=models.CharField(
+                blank=True,
+                help_text="Hash of the definition of jobs that are managed by a job registry, used to detect whether the definition has changed. Empty for jobs that were added to the scheduler directly.",
+                max_length=64,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.0.10 on 2026-10-19 13:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_apscheduler", "0016_djangojob_fingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="djangojobexecution",
+            name="last_missed_run_time",
+            field=models.DateTimeField(
+                default=None,
+                help_text="Date and time of the last run time of the job that was missed (if more than one).",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="djangojobexecution",
+            name="missed_runs",
+            field=models.PositiveIntegerField(
+                default=None,
+                help_text="Number of consecutive run times of the job that were missed, starting at the run time of this job execution (if more than one).",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.0.10 on 2026-10-19 13:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_apscheduler", "0017_djangojobexecution_missed_runs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DjangoJobLease",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "slot",
+                    models.PositiveIntegerField(
+                        help_text="The concurrency slot that is held, from 0 up to `max_instances` of the job."
+                    ),
+                ),
+                (
+                    "run_time",
+                    models.DateTimeField(
+                        help_text="The (first) run time of the job run that holds the lease."
+                    ),
+                ),
+                (
+                    "owner",
+                    models.CharField(
+                        help_text="Host name, process ID, and sequence number of the lease that was last acquired on this slot.",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        help_text="Date and time at which the lease expires, if it has not been released or renewed by then."
+                    ),
+                ),
+                (
+                    "job",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        help_text="The job that this lease relates to.",
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="leases",
+                        to="django_apscheduler.djangojob",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="djangojoblease",
+            constraint=models.UniqueConstraint(
+                fields=("job", "slot"), name="unique_job_lease_slots"
+            ),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.0.10 on 2026-10-19 13:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_apscheduler", "0018_djangojoblease"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DjangoQueuedJobRun",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "run_time",
+                    models.DateTimeField(
+                        help_text="Date and time at which the job was scheduled to run."
+                    ),
+                ),
+                (
+                    "func_ref",
+                    models.CharField(
+                        help_text="Textual reference to the function of the job (e.g. 'myapp.jobs:my_job').",
+                        max_length=1000,
+                    ),
+                ),
+                (
+                    "args",
+                    models.BinaryField(
+                        help_text="Pickled positional and keyword arguments of the function."
+                    ),
+                ),
+                (
+                    "misfire_grace_time",
+                    models.PositiveIntegerField(
+                        default=None,
+                        help_text="Number of seconds after the run time that the job is still allowed to run, if any.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "queued_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="Date and time at which the run was queued.",
+                    ),
+                ),
+                (
+                    "claimed_at",
+                    models.DateTimeField(
+                        blank=True,
+                        db_index=True,
+                        help_text="Date and time at which the run was claimed by a worker (or its claim was last renewed), if any.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "claimed_by",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Identifies the worker that claimed the run.",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "job",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        help_text="The job that should be run.",
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="queued_runs",
+                        to="django_apscheduler.djangojob",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="djangoqueuedjobrun",
+            constraint=models.UniqueConstraint(
+                fields=("job", "run_time"), name="unique_queued_job_runs"
+            ),
+        ),
+    ]
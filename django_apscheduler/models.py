@@ -1,7 +1,30 @@
+import itertools
+import marshal
+import math
+import os
+import pickle
+import pstats
+import socket
+import time
+import zlib
+from collections import defaultdict
 from datetime import timedelta, datetime
+from types import SimpleNamespace
+from typing import Callable, List, Tuple, Union, Dict
 
-from django.db import models, transaction
-from django.db.models import UniqueConstraint
+from django.conf import settings
+from django.db import models, transaction, IntegrityError, connections
+from django.db.models import (
+    UniqueConstraint,
+    Q,
+    OuterRef,
+    Subquery,
+    Exists,
+    Count,
+    Avg,
+    F,
+)
+from django.db.models.functions import Coalesce, Trunc
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -12,6 +35,56 @@ from django_apscheduler.util import get_django_internal_datetime
 
 logger = logging.getLogger(__name__)
 
+# Makes the owner of each `DjangoJobLease` that is acquired by this process unique
+_lease_sequence = itertools.count()
+
+# Bucket sizes that are supported by `DjangoJobExecutionManager.get_time_series`
+TIME_SERIES_RESOLUTIONS = ("minute", "hour", "day")
+
+
+class DjangoJobManager(models.Manager):
+    """
+    Default manager for DjangoJob that excludes jobs that have been removed, but whose execution history has not been
+    purged from the database yet.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(removed=False)
+
+    def purge_removed_jobs(self, batch_size: int = 1000, sleep: float = 0) -> int:
+        """
+        Delete the execution history of all jobs that have been removed in batches, followed by the removed jobs
+        themselves.
+
+        See `DjangoJobExecutionManager.delete_in_batches` for a description of the parameters.
+
+        :return: The number of job executions that were deleted.
+        """
+        removed_jobs = self.model._base_manager.using(self.db).filter(removed=True)
+        executions = DjangoJobExecution.objects.db_manager(self.db)
+
+        deleted = executions.delete_in_batches(
+            executions.filter(job__in=removed_jobs),
+            batch_size=batch_size,
+            sleep=sleep,
+        )
+
+        try:
+            with transaction.atomic(using=self.db):
+                # Jobs are only deleted once all of their executions have been deleted, so there is nothing for the
+                # deletion collector to do.
+                DjangoJobLease.objects.db_manager(self.db).filter(
+                    job__in=removed_jobs
+                ).delete()
+                removed_jobs.filter(
+                    ~Exists(DjangoJobExecution.objects.filter(job_id=OuterRef("pk")))
+                )._raw_delete(self.db)
+        except IntegrityError:
+            # A new execution was logged for one of the removed jobs in the meantime. Try again next time.
+            logger.warning("Could not delete all removed jobs. Will retry later...")
+
+        return deleted
+
 
 class DjangoJob(models.Model):
     id = models.CharField(
@@ -29,6 +102,42 @@ class DjangoJob(models.Model):
 
     job_state = models.BinaryField()
 
+    profile_runs = models.PositiveIntegerField(
+        default=0,
+        help_text=_("Number of upcoming runs of this job that should be profiled."),
+    )
+
+    removed = models.BooleanField(
+        default=False,
+        help_text=_(
+            "Whether this job has been removed from the scheduler, and is waiting for its execution history to be "
+            "purged from the database."
+        ),
+    )
+
+    run_requested_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        # Polled by every scheduler that uses a `DjangoJobStore`
+        db_index=True,
+        help_text=_(
+            "Date and time at which an immediate run of this job was requested via the Django admin site. Cleared "
+            "once the scheduler has picked up the request."
+        ),
+    )
+
+    fingerprint = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text=_(
+            "Hash of the definition of jobs that are managed by a job registry, used to detect whether the definition "
+            "has changed. Empty for jobs that were added to the scheduler directly."
+        ),
+    )
+
+    objects = DjangoJobManager()
+
     def __str__(self):
         status = (
             f"next run at: {util.get_local_dt_format(self.next_run_time)}"
@@ -42,14 +151,370 @@ class DjangoJob(models.Model):
 
 
 class DjangoJobExecutionManager(models.Manager):
-    def delete_old_job_executions(self, max_age: int):
+    def delete_old_job_executions(
+        self,
+        max_age: int,
+        batch_size: int = 1000,
+        sleep: float = 0,
+        max_runtime: float = None,
+        progress_callback: Callable[[int], None] = None,
+    ) -> int:
         """
         Delete old job executions from the database.
 
         :param max_age: The maximum age (in seconds). Executions that are older
         than this will be deleted.
+        :param batch_size: The maximum number of executions to delete per transaction.
+        :param sleep: Number of seconds to pause between batches, to give other database clients a chance to go ahead.
+        :param max_runtime: Stop deleting after this many seconds. Any remaining old executions will be deleted the next
+        time that this method is called.
+        :param progress_callback: Called after each batch with the total number of executions deleted so far.
+        :return: The number of job executions that were deleted.
+        """
+        return self.delete_in_batches(
+            self.filter(run_time__lte=timezone.now() - timedelta(seconds=max_age)),
+            batch_size=batch_size,
+            sleep=sleep,
+            max_runtime=max_runtime,
+            progress_callback=progress_callback,
+        )
+
+    def apply_retention_policies(
+        self,
+        default_policy: dict = None,
+        job_policies: Dict[str, dict] = None,
+        batch_size: int = 1000,
+        sleep: float = 0,
+        max_runtime: float = None,
+        progress_callback: Callable[[int], None] = None,
+    ) -> int:
+        """
+        Delete the job executions that should no longer be retained according to the configured retention policies.
+
+        A retention policy is a dictionary that may contain the following keys:
+
+        - `max_age`: The maximum age (in seconds) of the executions to retain. Can also be a dictionary that maps each
+          job execution status to a different maximum age, e.g. `{DjangoJobExecution.ERROR: 7_776_000,
+          DjangoJobExecution.SUCCESS: 86_400}`. Executions with a status that is not listed are retained.
+        - `max_executions`: The maximum number of executions to retain for each job. Older executions are deleted.
+
+        :param default_policy: The retention policy that applies to all jobs. Defaults to
+        `settings.APSCHEDULER_RETENTION_POLICY`.
+        :param job_policies: A dictionary of retention policies for specific jobs, keyed on job ID. These are merged
+        with, and take precedence over, the default policy. Defaults to `settings.APSCHEDULER_JOB_RETENTION_POLICIES`.
+        :param batch_size: See `delete_old_job_executions`.
+        :param sleep: See `delete_old_job_executions`.
+        :param max_runtime: See `delete_old_job_executions`.
+        :param progress_callback: See `delete_old_job_executions`.
+        :return: The number of job executions that were deleted.
+        """
+        started = time.monotonic()
+        deleted = 0
+
+        def report_progress(count):
+            progress_callback(deleted + count)
+
+        for queryset in self.get_querysets_to_purge(default_policy, job_policies):
+            remaining_runtime = None
+            if max_runtime is not None:
+                remaining_runtime = max_runtime - (time.monotonic() - started)
+                if remaining_runtime <= 0:
+                    break
+
+            deleted += self.delete_in_batches(
+                queryset,
+                batch_size=batch_size,
+                sleep=sleep,
+                max_runtime=remaining_runtime,
+                progress_callback=report_progress if progress_callback else None,
+            )
+
+        return deleted
+
+    def delete_batch(self, pks: List[int]) -> int:
+        """
+        Delete a single batch of job executions (and any related objects) in one transaction, bypassing Django's
+        deletion collector.
+
+        :param pks: The primary keys of the job executions to delete.
+        :return: The number of job executions that were deleted.
+        """
+        with transaction.atomic(using=self.db):
+            for relation in self.model._meta.related_objects:
+                relation.related_model._base_manager.using(self.db).filter(
+                    **{f"{relation.field.name}__in": pks}
+                )._raw_delete(self.db)
+
+            return (
+                self.model._base_manager.using(self.db)
+                .filter(pk__in=pks)
+                ._raw_delete(self.db)
+            )
+
+    def get_querysets_to_purge(
+        self, default_policy: dict = None, job_policies: Dict[str, dict] = None
+    ) -> List[models.QuerySet]:
+        """
+        Return the querysets of the job executions that should no longer be retained according to the given retention
+        policies (see `apply_retention_policies` for details). Each job execution is included in at most one queryset.
+        """
+        if default_policy is None:
+            default_policy = getattr(settings, "APSCHEDULER_RETENTION_POLICY", {})
+
+        if job_policies is None:
+            job_policies = getattr(settings, "APSCHEDULER_JOB_RETENTION_POLICIES", {})
+
+        job_policies = {
+            job_id: {**default_policy, **policy}
+            for job_id, policy in job_policies.items()
+        }
+
+        return self._get_querysets_to_purge(default_policy, job_policies)
+
+    def _get_querysets_to_purge(
+        self, default_policy: dict, job_policies: Dict[str, dict]
+    ) -> List[models.QuerySet]:
+        """Return the querysets of the job executions that violate the given retention policies"""
+        now = timezone.now()
+        querysets = []
+
+        # Age-based retention: combine all of the policies into a single query.
+        expired = self._get_expired_q(default_policy.get("max_age"), now)
+        if expired is not None:
+            expired &= ~Q(job_id__in=list(job_policies))
+
+        for job_id, policy in job_policies.items():
+            job_expired = self._get_expired_q(policy.get("max_age"), now)
+            if job_expired is not None:
+                job_expired &= Q(job_id=job_id)
+                expired = job_expired if expired is None else expired | job_expired
+
+        if expired is not None:
+            querysets.append(self.filter(expired))
+
+        # Count-based retention: look up the run time of the newest execution that should no longer be retained for
+        # each job (using the `(job_id, run_time)` index), and delete everything up to and including that execution.
+        if default_policy.get("max_executions") is not None:
+            querysets += self._get_excess_executions(
+                DjangoJob.objects.exclude(id__in=list(job_policies)),
+                default_policy["max_executions"],
+            )
+
+        job_ids_by_max_executions = defaultdict(list)
+        for job_id, policy in job_policies.items():
+            if policy.get("max_executions") is not None:
+                job_ids_by_max_executions[policy["max_executions"]].append(job_id)
+
+        for max_executions, job_ids in job_ids_by_max_executions.items():
+            querysets += self._get_excess_executions(
+                DjangoJob.objects.filter(id__in=job_ids), max_executions
+            )
+
+        if expired is not None:
+            # Do not return the job executions that have expired more than once
+            querysets[1:] = [queryset.exclude(expired) for queryset in querysets[1:]]
+
+        return querysets
+
+    def _get_excess_executions(
+        self, jobs: models.QuerySet, max_executions: int
+    ) -> List[models.QuerySet]:
+        cutoffs = (
+            jobs.annotate(
+                cutoff=Subquery(
+                    self.filter(job_id=OuterRef("id"))
+                    .order_by("-run_time")
+                    .values("run_time")[max_executions : max_executions + 1]
+                )
+            )
+            .filter(cutoff__isnull=False)
+            .values_list("id", "cutoff")
+        )
+
+        return [
+            self.filter(job_id=job_id, run_time__lte=cutoff)
+            for job_id, cutoff in cutoffs
+        ]
+
+    @staticmethod
+    def _get_expired_q(
+        max_age: Union[int, Dict[str, int], None], now: datetime
+    ) -> Union[Q, None]:
+        if max_age is None:
+            return None
+
+        if not isinstance(max_age, dict):
+            return Q(run_time__lte=now - timedelta(seconds=max_age))
+
+        expired = None
+        for status, status_max_age in max_age.items():
+            status_expired = Q(
+                status=status, run_time__lte=now - timedelta(seconds=status_max_age)
+            )
+            expired = status_expired if expired is None else expired | status_expired
+
+        return expired
+
+    def delete_in_batches(
+        self,
+        queryset: models.QuerySet,
+        batch_size: int = 1000,
+        sleep: float = 0,
+        max_runtime: float = None,
+        progress_callback: Callable[[int], None] = None,
+    ) -> int:
+        """
+        Delete the job executions in `queryset` in batches, in primary key order.
+
+        Unlike `QuerySet.delete()`, this does not load all of the matching primary keys into memory first, and only
+        holds database locks for the duration of a single batch. This prevents the scheduler from being blocked from
+        logging new job executions while a large number of old executions are being deleted.
+
+        Rows are deleted directly in the database, bypassing Django's deletion collector. No `pre_delete` /
+        `post_delete` signals are sent, and objects that are related to the deleted job executions are deleted
+        explicitly (as part of the same batch) instead of via the collector.
+
+        See `delete_old_job_executions` for a description of the parameters.
+
+        :return: The number of job executions that were deleted.
+        """
+        started = time.monotonic()
+        deleted = 0
+        last_pk = None
+
+        queryset = queryset.order_by("pk")
+
+        while True:
+            batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            pks = list(batch.values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+
+            deleted += self.delete_batch(pks)
+            last_pk = pks[-1]
+
+            logger.debug(f"Deleted {deleted} job executions...")
+            if progress_callback is not None:
+                progress_callback(deleted)
+
+            if len(pks) < batch_size:
+                break
+
+            if (
+                max_runtime is not None
+                and time.monotonic() - started + sleep >= max_runtime
+            ):
+                logger.info(
+                    f"Maximum runtime of {max_runtime} seconds exceeded after deleting {deleted} job executions. "
+                    f"Stopping..."
+                )
+                break
+
+            if sleep:
+                time.sleep(sleep)
+
+        return deleted
+
+    def get_duration_percentile(
+        self,
+        job_id: str,
+        percentile: float = 95,
+        sample_size: int = 1000,
+        min_samples: int = 20,
+    ) -> Union[float, None]:
         """
-        self.filter(run_time__lte=timezone.now() - timedelta(seconds=max_age)).delete()
+        Calculate a percentile of the durations of the most recent successful executions of a job.
+
+        :param job_id: The ID of the job to calculate the percentile for.
+        :param percentile: The percentile to calculate (0 - 100).
+        :param sample_size: The maximum number of recent executions to consider.
+        :param min_samples: The minimum number of executions required to calculate a meaningful result.
+        :return: The duration percentile (in seconds), or None if the job does not have enough execution history.
+        """
+        durations = sorted(
+            self.filter(
+                job_id=job_id, status=self.model.SUCCESS, duration__isnull=False
+            )
+            .order_by("-run_time")
+            .values_list("duration", flat=True)[:sample_size]
+        )
+
+        if not durations or len(durations) < min_samples:
+            return None
+
+        # Nearest-rank method
+        rank = max(math.ceil(percentile / 100 * len(durations)), 1)
+        return float(durations[rank - 1])
+
+    def get_time_series(
+        self,
+        start: datetime,
+        end: datetime,
+        resolution: str = "hour",
+        job_id: str = None,
+    ) -> Dict[str, List[dict]]:
+        """
+        Aggregate the job executions that were run in a particular time range into buckets of a fixed size.
+
+        Executions are bucketed and counted in the database, so no individual job executions are retrieved.
+
+        :param start: Start of the time range (inclusive).
+        :param end: End of the time range (exclusive).
+        :param resolution: The size of each bucket. One of 'minute', 'hour', or 'day'.
+        :param job_id: Only aggregate the executions of this job.
+        :return: A dictionary that maps each job ID to a list of buckets, in chronological order. Each bucket contains
+        the start of the bucket ('bucket'), the total number of executions ('total'), the number of executions per
+        status ('statuses'), and the average duration of the executions ('avg_duration').
+        """
+        if resolution not in TIME_SERIES_RESOLUTIONS:
+            raise ValueError(
+                f"Unsupported resolution '{resolution}'. Expected one of {TIME_SERIES_RESOLUTIONS}."
+            )
+
+        statuses = [
+            self.model.SENT,
+            self.model.SUCCESS,
+            self.model.MISSED,
+            self.model.MAX_INSTANCES,
+            self.model.ERROR,
+        ]
+
+        queryset = self.filter(
+            run_time__gte=get_django_internal_datetime(start),
+            run_time__lt=get_django_internal_datetime(end),
+        )
+        if job_id is not None:
+            queryset = queryset.filter(job_id=job_id)
+
+        rows = (
+            queryset.annotate(bucket=Trunc("run_time", resolution))
+            .order_by()  # Prevent the default ordering from being added to the GROUP BY clause
+            .values("job_id", "bucket")
+            .annotate(
+                total=Count("pk"),
+                avg_duration=Avg("duration"),
+                **{
+                    f"status_{i}": Count("pk", filter=Q(status=status))
+                    for i, status in enumerate(statuses)
+                },
+            )
+            .order_by("job_id", "bucket")
+        )
+
+        time_series = defaultdict(list)
+        for row in rows:
+            time_series[row["job_id"]].append(
+                {
+                    "bucket": row["bucket"],
+                    "total": row["total"],
+                    "statuses": {
+                        status: row[f"status_{i}"] for i, status in enumerate(statuses)
+                    },
+                    "avg_duration": row["avg_duration"],
+                }
+            )
+
+        return dict(time_series)
 
 
 class DjangoJobExecution(models.Model):
@@ -124,9 +589,82 @@ class DjangoJobExecution(models.Model):
         ),
     )
 
+    cpu_user_time = models.DecimalField(
+        max_digits=15,
+        decimal_places=3,
+        default=None,
+        null=True,
+        help_text=_("CPU time spent executing this job in user mode (in seconds)."),
+    )
+
+    cpu_system_time = models.DecimalField(
+        max_digits=15,
+        decimal_places=3,
+        default=None,
+        null=True,
+        help_text=_(
+            "CPU time spent executing this job in kernel mode (in seconds), if available."
+        ),
+    )
+
+    memory_peak_increase = models.BigIntegerField(
+        default=None,
+        null=True,
+        help_text=_(
+            "Increase in the peak resident set size of the scheduler process while this job was running (in bytes)."
+        ),
+    )
+
+    memory_traced_peak = models.BigIntegerField(
+        default=None,
+        null=True,
+        help_text=_(
+            "Peak memory allocated by Python while this job was running, as reported by tracemalloc (in bytes)."
+        ),
+    )
+
+    db_query_count = models.PositiveIntegerField(
+        default=None,
+        null=True,
+        help_text=_("Number of database queries executed by this job."),
+    )
+
+    db_query_time = models.DecimalField(
+        max_digits=15,
+        decimal_places=3,
+        default=None,
+        null=True,
+        help_text=_("Total time spent executing database queries (in seconds)."),
+    )
+
+    slow = models.BooleanField(
+        default=False,
+        help_text=_(
+            "Whether this job execution took longer than the slow run threshold of the job."
+        ),
+    )
+
+    missed_runs = models.PositiveIntegerField(
+        default=None,
+        null=True,
+        help_text=_(
+            "Number of consecutive run times of the job that were missed, starting at the run time of this job "
+            "execution (if more than one)."
+        ),
+    )
+
+    last_missed_run_time = models.DateTimeField(
+        default=None,
+        null=True,
+        help_text=_(
+            "Date and time of the last run time of the job that was missed (if more than one)."
+        ),
+    )
+
     objects = DjangoJobExecutionManager()
 
     @classmethod
+    @util.instrumented
     @util.retry_on_db_operational_error
     def atomic_update_or_create(
         cls,
@@ -136,6 +674,7 @@ class DjangoJobExecution(models.Model):
         status: str,
         exception: str = None,
         traceback: str = None,
+        resource_usage: dict = None,
     ) -> "DjangoJobExecution":
         """
         Uses an APScheduler lock to ensure that only one database entry can be created / updated at a time.
@@ -148,6 +687,8 @@ class DjangoJobExecution(models.Model):
         :param status: The new status for ths job execution.
         :param exception: Details of any exceptions that need to be logged.
         :param traceback: Traceback of any exceptions that occurred while executing the job.
+        :param resource_usage: Resource usage measurements for this job execution, keyed on field name (see
+        `util.record_resource_usage`).
         :return: The ID of the newly created or updated DjangoJobExecution.
         """
 
@@ -188,6 +729,9 @@ class DjangoJobExecution(models.Model):
                     if traceback:
                         job_execution.traceback = traceback
 
+                    for field, value in (resource_usage or {}).items():
+                        setattr(job_execution, field, value)
+
                     job_execution.save()
 
             except DjangoJobExecution.DoesNotExist:
@@ -205,10 +749,162 @@ class DjangoJobExecution(models.Model):
                     finished=finished,
                     exception=exception,
                     traceback=traceback,
+                    **(resource_usage or {}),
                 )
 
         return job_execution
 
+    @classmethod
+    @util.instrumented
+    @util.retry_on_db_operational_error
+    def atomic_bulk_create(
+        cls,
+        lock,
+        job_id: str,
+        run_times: List[datetime],
+        status: str,
+        exception: str = None,
+    ):
+        """
+        Log several run times of a job at once, with a single query. APScheduler submits more than one run time at a
+        time when a job that does not coalesce its runs is catching up on the runs that it missed.
+
+        Run times that have already been logged are left untouched.
+
+        :param lock: The lock to use when updating the database - probably obtained by calling _scheduler._create_lock()
+        :param job_id: The ID to the APScheduler job that the job executions are for.
+        :param run_times: The scheduler runtimes of the job executions.
+        :param status: The status of the job executions.
+        :param exception: Details of any exceptions that need to be logged.
+        """
+        with lock:
+            finished = get_django_internal_datetime(timezone.now())
+
+            job_executions = []
+            for run_time in run_times:
+                run_time = get_django_internal_datetime(run_time)
+                job_execution = DjangoJobExecution(
+                    job_id=job_id, run_time=run_time, status=status, exception=exception
+                )
+                if status != DjangoJobExecution.SENT:
+                    job_execution.duration = (finished - run_time).total_seconds()
+                    job_execution.finished = finished.timestamp()
+
+                job_executions.append(job_execution)
+
+            DjangoJobExecution.objects.bulk_create(
+                job_executions, ignore_conflicts=True
+            )
+
+    @classmethod
+    @util.instrumented
+    @util.retry_on_db_operational_error
+    def atomic_create_missed_runs(
+        cls, lock, job_id: str, run_times: List[datetime], exception: str = None
+    ) -> "DjangoJobExecution":
+        """
+        Log one or more consecutive missed run times of a job as a single 'missed' job execution, for the first run
+        time. Any job executions that were logged when the run times were submitted are discarded.
+
+        :param lock: The lock to use when updating the database - probably obtained by calling _scheduler._create_lock()
+        :param job_id: The ID to the APScheduler job that missed its run times.
+        :param run_times: The run times that were missed, in ascending order.
+        :param exception: Details of any exceptions that need to be logged.
+        :return: The 'missed' job execution that was created.
+        """
+        with lock:
+            run_times = [
+                get_django_internal_datetime(run_time) for run_time in run_times
+            ]
+            finished = get_django_internal_datetime(timezone.now())
+
+            with transaction.atomic():
+                cls._discard_submitted(job_id, run_times)
+
+                return DjangoJobExecution.objects.create(
+                    job_id=job_id,
+                    run_time=run_times[0],
+                    status=DjangoJobExecution.MISSED,
+                    duration=(finished - run_times[0]).total_seconds(),
+                    finished=finished.timestamp(),
+                    exception=exception,
+                    missed_runs=len(run_times) if len(run_times) > 1 else None,
+                    last_missed_run_time=run_times[-1] if len(run_times) > 1 else None,
+                )
+
+    @classmethod
+    @util.instrumented
+    @util.retry_on_db_operational_error
+    def atomic_add_missed_runs(
+        cls, lock, execution_id: int, job_id: str, run_times: List[datetime]
+    ) -> bool:
+        """
+        Collapse missed run times of a job into an existing 'missed' job execution for an earlier run time, with a
+        single `UPDATE`, instead of logging them as separate job executions.
+
+        :param lock: The lock to use when updating the database - probably obtained by calling _scheduler._create_lock()
+        :param execution_id: The ID of the 'missed' job execution to add the run times to.
+        :param job_id: The ID to the APScheduler job that missed its run times.
+        :param run_times: The run times that were missed, in ascending order.
+        :return: False if the 'missed' job execution no longer exists.
+        """
+        with lock:
+            run_times = [
+                get_django_internal_datetime(run_time) for run_time in run_times
+            ]
+
+            with transaction.atomic():
+                if not DjangoJobExecution.objects.filter(
+                    id=execution_id, status=DjangoJobExecution.MISSED
+                ).update(
+                    missed_runs=Coalesce(F("missed_runs"), 1) + len(run_times),
+                    last_missed_run_time=run_times[-1],
+                ):
+                    return False
+
+                cls._discard_submitted(job_id, run_times)
+
+        return True
+
+    @classmethod
+    def _discard_submitted(cls, job_id: str, run_times: List[datetime]):
+        """Delete the job executions that were logged when the run times were submitted, with a single `DELETE`"""
+        # Bypass the deletion collector: job executions that have not run yet have no profiles or other related objects
+        DjangoJobExecution.objects.filter(
+            job_id=job_id, run_time__in=run_times, status=DjangoJobExecution.SENT
+        )._raw_delete(DjangoJobExecution.objects.db)
+
+    @classmethod
+    @util.instrumented
+    @util.retry_on_db_operational_error
+    def claim(cls, job_id: str, run_time: datetime) -> bool:
+        """
+        Claim a run of a job by logging it as submitted, unless it has been logged already (e.g. by another scheduler
+        that is about to run the same job). Costs a single `INSERT`: runs that have already been claimed are detected
+        via the `unique_job_executions` constraint, without querying the database first.
+
+        :param job_id: The ID to the APScheduler job that is about to be run.
+        :param run_time: The scheduler runtime of the run.
+        :return: False if the run has already been claimed, or if the job no longer exists.
+        """
+        job_execution = DjangoJobExecution(
+            job_id=job_id,
+            run_time=get_django_internal_datetime(run_time),
+            status=DjangoJobExecution.SENT,
+        )
+
+        try:
+            if transaction.get_connection().in_atomic_block:
+                # Use a savepoint, so that a failed claim does not break the surrounding transaction
+                with transaction.atomic():
+                    job_execution.save(force_insert=True)
+            else:
+                job_execution.save(force_insert=True)
+        except IntegrityError:
+            return False
+
+        return True
+
     def __str__(self):
         return f"{self.id}: job '{self.job_id}' ({self.status})"
 
@@ -219,3 +915,396 @@ class DjangoJobExecution(models.Model):
                 fields=["job_id", "run_time"], name="unique_job_executions"
             )
         ]
+        indexes = [
+            # Allows the Django admin to page through job executions in a stable order without sorting the whole table
+            models.Index(fields=["run_time", "id"], name="job_executions_run_time_id"),
+        ]
+
+
+class DjangoJobExecutionProfile(models.Model):
+    execution = models.OneToOneField(
+        DjangoJobExecution,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="profile",
+        help_text=_("The job execution that was profiled."),
+    )
+
+    stats = models.BinaryField(
+        help_text=_(
+            "Compressed cProfile statistics that were collected for this job execution."
+        )
+    )
+
+    def get_stats(self) -> pstats.Stats:
+        """Return the profiling statistics as a standard `pstats.Stats` instance"""
+        profile = SimpleNamespace(
+            stats=marshal.loads(zlib.decompress(bytes(self.stats))),
+            create_stats=lambda: None,
+        )
+        return pstats.Stats(profile)
+
+    def get_top_functions(self, limit: int = 25) -> List[Tuple[str, int, float, float]]:
+        """
+        Return the functions with the highest cumulative run time.
+
+        :param limit: The maximum number of functions to return.
+        :return: A list of `(function, number of calls, total time, cumulative time)` tuples.
+        """
+        stats = self.get_stats().sort_stats(pstats.SortKey.CUMULATIVE)
+
+        top_functions = []
+        for func in stats.fcn_list[:limit]:
+            _, num_calls, total_time, cumulative_time, _ = stats.stats[func]
+            top_functions.append(
+                (pstats.func_std_string(func), num_calls, total_time, cumulative_time)
+            )
+
+        return top_functions
+
+    def __str__(self):
+        return f"Profile for {self.execution}"
+
+
+class DjangoJobLease(models.Model):
+    """
+    A lease on one of the `max_instances` concurrency slots of a job, which is held while the job is running. Leases
+    are shared by all of the schedulers that use the same database, so that `max_instances` is enforced across
+    processes and nodes (see `executors.DjangoMaxInstancesMixin`).
+
+    Each slot of a job is stored as a separate row, which is kept when the lease on the slot is released. Leases
+    expire, so that the slots that are held by processes that were terminated unexpectedly are freed up again.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+
+    job = models.ForeignKey(
+        DjangoJob,
+        # Leases are also used for jobs that are not stored in the database (e.g. jobs in a `DjangoMemoryJobStore`)
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="leases",
+        help_text=_("The job that this lease relates to."),
+    )
+
+    slot = models.PositiveIntegerField(
+        help_text=_(
+            "The concurrency slot that is held, from 0 up to `max_instances` of the job."
+        ),
+    )
+
+    run_time = models.DateTimeField(
+        help_text=_("The (first) run time of the job run that holds the lease."),
+    )
+
+    owner = models.CharField(
+        max_length=255,
+        help_text=_(
+            "Host name, process ID, and sequence number of the lease that was last acquired on this slot."
+        ),
+    )
+
+    expires_at = models.DateTimeField(
+        help_text=_(
+            "Date and time at which the lease expires, if it has not been released or renewed by then."
+        ),
+    )
+
+    @classmethod
+    @util.instrumented
+    @util.retry_on_db_operational_error
+    def acquire(
+        cls, job_id: str, max_instances: int, run_time: datetime, timeout: float
+    ) -> Union["DjangoJobLease", None]:
+        """
+        Acquire a lease on a free concurrency slot of a job, with a single conditional `UPDATE` of one of the slots
+        whose lease has expired (or has been released). The slots of a job are only created, with a single `INSERT`,
+        if none of them are free, e.g. when the job is run for the first time.
+
+        The lease that is returned is identified by its (unique) `owner`, which is all that is needed to renew or
+        release it.
+
+        :param job_id: The ID of the job to acquire a lease for.
+        :param max_instances: The maximum number of instances of the job that are allowed to run concurrently.
+        :param run_time: The (first) run time of the job run that the lease is for.
+        :param timeout: The number of seconds after which the lease expires, unless it is renewed.
+        :return: The new lease, or None if all of the slots of the job are taken.
+        """
+        now = get_django_internal_datetime(timezone.now())
+        lease = DjangoJobLease(
+            job_id=job_id,
+            run_time=get_django_internal_datetime(run_time),
+            owner=f"{socket.gethostname()}:{os.getpid()}:{next(_lease_sequence)}",
+            expires_at=now + timedelta(seconds=timeout),
+        )
+
+        if cls._take_free_slot(lease, max_instances, now):
+            return lease
+
+        DjangoJobLease.objects.bulk_create(
+            [
+                DjangoJobLease(
+                    job_id=job_id, slot=slot, run_time=now, owner="", expires_at=now
+                )
+                for slot in range(max_instances)
+            ],
+            ignore_conflicts=True,
+        )
+
+        if cls._take_free_slot(lease, max_instances, now):
+            return lease
+
+        return None
+
+    @classmethod
+    def _take_free_slot(
+        cls, lease: "DjangoJobLease", max_instances: int, now: datetime
+    ) -> bool:
+        free_slots = DjangoJobLease.objects.filter(
+            job_id=lease.job_id, slot__lt=max_instances, expires_at__lte=now
+        )
+        first_free_slot = free_slots.order_by("slot").values("pk")[:1]
+        if not connections[DjangoJobLease.objects.db].features.update_can_self_select:
+            # E.g. MySQL, which does not allow selecting from the table that is being updated in a subquery
+            first_free_slot = list(first_free_slot.values_list("pk", flat=True))
+
+        # The conditions are checked again when the row is updated, in case another scheduler took the slot first
+        return bool(
+            free_slots.filter(pk__in=first_free_slot).update(
+                run_time=lease.run_time, owner=lease.owner, expires_at=lease.expires_at
+            )
+        )
+
+    @classmethod
+    @util.instrumented
+    @util.retry_on_db_operational_error
+    def renew(cls, leases: List["DjangoJobLease"], timeout: float) -> int:
+        """
+        Extend the given leases, with a single query. Leases that have already expired are not renewed, as they could
+        have been taken over by another scheduler.
+
+        :param timeout: The number of seconds from now after which the leases expire.
+        :return: The number of leases that were renewed.
+        """
+        now = get_django_internal_datetime(timezone.now())
+        expires_at = now + timedelta(seconds=timeout)
+        renewed = DjangoJobLease.objects.filter(
+            owner__in=[lease.owner for lease in leases], expires_at__gt=now
+        ).update(expires_at=expires_at)
+
+        for lease in leases:
+            lease.expires_at = expires_at
+
+        return renewed
+
+    @util.instrumented
+    @util.retry_on_db_operational_error
+    def release(self):
+        """Release the lease, unless it has expired and has been taken over by another scheduler in the meantime"""
+        DjangoJobLease.objects.filter(job_id=self.job_id, owner=self.owner).update(
+            expires_at=get_django_internal_datetime(timezone.now())
+        )
+
+    @classmethod
+    def is_held(cls, job_id: str, run_time: datetime) -> bool:
+        """Whether a lease is held for the given run of the job, e.g. by another scheduler that is running it"""
+        return DjangoJobLease.objects.filter(
+            job_id=job_id,
+            run_time=get_django_internal_datetime(run_time),
+            expires_at__gt=get_django_internal_datetime(timezone.now()),
+        ).exists()
+
+    def __str__(self):
+        return f"Lease on slot {self.slot} of job '{self.job_id}' ({self.owner})"
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["job", "slot"], name="unique_job_lease_slots")
+        ]
+
+
+class DjangoQueuedJobRunManager(models.Manager):
+    @util.instrumented
+    @util.retry_on_db_operational_error
+    def enqueue(self, job, run_times: List[datetime]):
+        """
+        Add runs of an APScheduler job to the queue, with a single query. Runs that are already queued are skipped.
+
+        :param job: The APScheduler job to run.
+        :param run_times: The run times of the job that should be run.
+        """
+        args = pickle.dumps((tuple(job.args), dict(job.kwargs)))
+        self.bulk_create(
+            [
+                DjangoQueuedJobRun(
+                    job_id=job.id,
+                    run_time=get_django_internal_datetime(run_time),
+                    func_ref=job.func_ref,
+                    args=args,
+                    misfire_grace_time=job.misfire_grace_time,
+                )
+                for run_time in run_times
+            ],
+            ignore_conflicts=True,
+        )
+
+    @util.instrumented
+    @util.retry_on_db_operational_error
+    def claim(self, limit: int, worker_id: str) -> List["DjangoQueuedJobRun"]:
+        """
+        Claim up to `limit` of the oldest queued runs that have not been claimed yet, by marking them as claimed by the
+        given worker. Claimed runs remain in the queue until they have been run (see `DjangoQueuedJobRun.complete`),
+        so that they can be re-queued if the worker goes away before then (see `requeue_stale`).
+
+        Runs are selected with `SELECT ... FOR UPDATE SKIP LOCKED` on databases that support it, so that concurrent
+        workers never wait for each other. On other databases (e.g. SQLite), each run is claimed with a separate
+        conditional `UPDATE` instead, and runs that were claimed by another worker in the meantime are skipped.
+
+        :param limit: The maximum number of runs to claim.
+        :param worker_id: Uniquely identifies the worker that claims the runs.
+        :return: The runs that were claimed, in the order in which they were queued.
+        """
+        claimed_at = timezone.now()
+        unclaimed = self.filter(claimed_at__isnull=True).order_by("id")
+
+        if connections[self.db].features.has_select_for_update_skip_locked:
+            with transaction.atomic(using=self.db):
+                runs = list(unclaimed.select_for_update(skip_locked=True)[:limit])
+                if runs:
+                    self.filter(id__in=[run.id for run in runs]).update(
+                        claimed_at=claimed_at, claimed_by=worker_id
+                    )
+        else:
+            runs = [
+                run
+                for run in unclaimed[:limit]
+                if self.filter(id=run.id, claimed_at__isnull=True).update(
+                    claimed_at=claimed_at, claimed_by=worker_id
+                )
+            ]
+
+        for run in runs:
+            run.claimed_at = claimed_at
+            run.claimed_by = worker_id
+
+        return runs
+
+    @util.instrumented
+    @util.retry_on_db_operational_error
+    def renew_claims(self, runs: List["DjangoQueuedJobRun"], worker_id: str) -> int:
+        """
+        Refresh the claims of a worker on the runs that it is still running, with a single query, so that they are not
+        re-queued by `requeue_stale`.
+
+        :return: The number of claims that were renewed.
+        """
+        return self.filter(
+            id__in=[run.id for run in runs], claimed_by=worker_id
+        ).update(claimed_at=timezone.now())
+
+    @util.instrumented
+    @util.retry_on_db_operational_error
+    def requeue_stale(self, claim_timeout: float) -> int:
+        """
+        Make the runs that were claimed more than `claim_timeout` seconds ago, and that have not been renewed since
+        (e.g. because the worker that claimed them was terminated), available to be claimed again.
+
+        :return: The number of runs that were re-queued.
+        """
+        return self.filter(
+            claimed_at__lt=timezone.now() - timedelta(seconds=claim_timeout)
+        ).update(claimed_at=None, claimed_by="")
+
+
+class DjangoQueuedJobRun(models.Model):
+    """
+    A run of a job that has been submitted to a `DjangoQueueExecutor`, and that is waiting to be picked up by one of the
+    worker processes (see the `runapschedulerworker` management command).
+    """
+
+    id = models.BigAutoField(primary_key=True)
+
+    job = models.ForeignKey(
+        DjangoJob,
+        # Jobs can be queued from any job store
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="queued_runs",
+        help_text=_("The job that should be run."),
+    )
+
+    run_time = models.DateTimeField(
+        help_text=_("Date and time at which the job was scheduled to run."),
+    )
+
+    func_ref = models.CharField(
+        max_length=1000,
+        help_text=_(
+            "Textual reference to the function of the job (e.g. 'myapp.jobs:my_job')."
+        ),
+    )
+
+    args = models.BinaryField(
+        help_text=_("Pickled positional and keyword arguments of the function."),
+    )
+
+    misfire_grace_time = models.PositiveIntegerField(
+        default=None,
+        null=True,
+        help_text=_(
+            "Number of seconds after the run time that the job is still allowed to run, if any."
+        ),
+    )
+
+    queued_at = models.DateTimeField(
+        default=timezone.now,
+        help_text=_("Date and time at which the run was queued."),
+    )
+
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        # Allows workers to find unclaimed and stale runs without scanning the whole queue
+        db_index=True,
+        help_text=_(
+            "Date and time at which the run was claimed by a worker (or its claim was last renewed), if any."
+        ),
+    )
+
+    claimed_by = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        help_text=_("Identifies the worker that claimed the run."),
+    )
+
+    objects = DjangoQueuedJobRunManager()
+
+    def get_args(self) -> Tuple[tuple, dict]:
+        """Return the positional and keyword arguments of the function"""
+        return pickle.loads(bytes(self.args))
+
+    @util.instrumented
+    @util.retry_on_db_operational_error
+    def complete(self) -> bool:
+        """
+        Remove the run from the queue, once it has been run and its execution has been logged.
+
+        :return: False if the run had been re-queued (and possibly claimed by another worker) in the meantime, in which
+        case it is left in the queue.
+        """
+        deleted, _ = DjangoQueuedJobRun.objects.filter(
+            id=self.id, claimed_by=self.claimed_by
+        ).delete()
+
+        return bool(deleted)
+
+    def __str__(self):
+        return (
+            f"Run of job '{self.job_id}' at {util.get_local_dt_format(self.run_time)}"
+        )
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["job", "run_time"], name="unique_queued_job_runs")
+        ]
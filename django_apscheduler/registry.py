@@ -0,0 +1,316 @@
+"""
+A declarative alternative to calling `scheduler.add_job(..., replace_existing=True)` for every job whenever the scheduler
+is started.
+
+Job definitions are registered with a `JobRegistry`, either from the `ready()` method of a Django `AppConfig`, or via
+`settings.APSCHEDULER_JOBS`. A fingerprint is calculated for each definition, and stored along with the corresponding
+`DjangoJob`. When the registry is reconciled with the database, only the jobs whose fingerprint has changed are
+written.
+"""
+
+import hashlib
+import json
+import logging
+import pickle
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import Any, Callable, Dict, List, Union
+
+from apscheduler.job import Job as AppSchedulerJob
+from apscheduler.schedulers.base import BaseScheduler
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.cron.fields import BaseField
+from apscheduler.util import obj_to_ref
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from django_apscheduler import util
+from django_apscheduler.models import DjangoJob
+
+logger = logging.getLogger(__name__)
+
+# Keyword arguments of `scheduler.add_job` that are options of the job itself. All other keyword arguments are passed on
+# to the trigger.
+JOB_OPTIONS = (
+    "args",
+    "kwargs",
+    "name",
+    "misfire_grace_time",
+    "coalesce",
+    "max_instances",
+    "executor",
+)
+
+
+def _to_json(obj) -> Any:
+    """
+    Convert an object that is not supported by `json` into a representation that is the same for equal objects across
+    restarts (unlike `repr`, which often includes the memory address of the object).
+    """
+    if isinstance(obj, BaseTrigger):
+        return {"type": obj_to_ref(type(obj)), "state": obj.__getstate__()}
+    if isinstance(obj, BaseField):
+        return f"{obj.name}={obj}"
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, tzinfo):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=repr)
+    if callable(obj):
+        try:
+            return obj_to_ref(obj)
+        except ValueError:
+            pass
+
+    return hashlib.sha256(pickle.dumps(obj, protocol=4)).hexdigest()
+
+
+class JobDefinition:
+    """The definition of a single job, as registered with a `JobRegistry`"""
+
+    def __init__(
+        self,
+        func: Callable,
+        trigger: Union[str, BaseTrigger],
+        id: str = None,
+        **kwargs,
+    ):
+        self.func = func
+        self.trigger = trigger
+        self.id = id or f"{func.__module__}.{func.__qualname__}"
+        self.options = {key: kwargs.pop(key) for key in JOB_OPTIONS if key in kwargs}
+        self.trigger_args = kwargs
+
+    def get_fingerprint(self, scheduler: BaseScheduler) -> str:
+        """
+        Calculate a hash of everything that determines how the job is run: the function, trigger, and the job options
+        (after applying the job defaults of the scheduler). The next run time of the job is not included.
+
+        Triggers that are specified by alias (e.g. 'cron') are hashed along with the trigger arguments. Trigger
+        instances are hashed by their state (which includes the time zone, jitter, and start and end dates), so an
+        `IntervalTrigger` instance needs an explicit `start_date` to be fingerprinted the same way on every start.
+        """
+        definition = {
+            "func": obj_to_ref(self.func),
+            "trigger": self.trigger,
+            "trigger_args": self.trigger_args,
+            "options": self._get_options(scheduler),
+        }
+        serialized = json.dumps(definition, sort_keys=True, default=_to_json)
+
+        return hashlib.sha256(serialized.encode()).hexdigest()
+
+    def create_job(self, scheduler: BaseScheduler, alias: str) -> AppSchedulerJob:
+        """Create the APScheduler job for this definition, scheduled to run at the next fire time of its trigger"""
+        trigger = scheduler._create_trigger(self.trigger, dict(self.trigger_args))
+        job = AppSchedulerJob(
+            scheduler,
+            id=self.id,
+            func=self.func,
+            trigger=trigger,
+            next_run_time=trigger.get_next_fire_time(
+                None, datetime.now(scheduler.timezone)
+            ),
+            **self._get_options(scheduler),
+        )
+        job._jobstore_alias = alias
+
+        return job
+
+    def _get_options(self, scheduler: BaseScheduler) -> dict:
+        options = {
+            "args": (),
+            "kwargs": {},
+            "name": None,
+            "executor": "default",
+            **scheduler._job_defaults,
+            **self.options,
+        }
+        options["args"] = tuple(options["args"])
+        options["name"] = options["name"] or self.id
+
+        return options
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(id={self.id!r})>"
+
+
+class JobRegistry:
+    """
+    A collection of job definitions that can be reconciled with the jobs in the database in one go.
+
+    Usage::
+
+        from django_apscheduler.registry import registry
+
+        @registry.scheduled_job("cron", hour=3)
+        def my_job():
+            ...
+
+        registry.register(my_other_job, "interval", minutes=5, id="my_other_job")
+
+        # Before starting the scheduler
+        registry.reconcile(scheduler)
+
+    Jobs that are changed at runtime (e.g. paused via the scheduler) keep those changes until their definition is
+    changed.
+    """
+
+    def __init__(self):
+        self._definitions: Dict[str, JobDefinition] = {}
+
+    @property
+    def definitions(self) -> List[JobDefinition]:
+        return list(self._definitions.values())
+
+    def register(
+        self, func: Callable, trigger: Union[str, BaseTrigger], id: str = None, **kwargs
+    ) -> JobDefinition:
+        """
+        Register a job definition. Takes the same arguments as `scheduler.add_job`, apart from `jobstore`,
+        `replace_existing`, and `next_run_time`. A job that is registered with the same ID as an existing definition
+        replaces that definition.
+
+        :param id: The ID of the job. Defaults to the qualified name of `func`.
+        :return: The new job definition.
+        """
+        definition = JobDefinition(func, trigger, id=id, **kwargs)
+        self._definitions[definition.id] = definition
+
+        return definition
+
+    def scheduled_job(self, trigger: Union[str, BaseTrigger], id: str = None, **kwargs):
+        """Decorator version of `register`"""
+
+        def wrapper(func):
+            self.register(func, trigger, id=id, **kwargs)
+            return func
+
+        return wrapper
+
+    def load_settings(self):
+        """
+        Register the job definitions in `settings.APSCHEDULER_JOBS`, which maps job IDs to the keyword arguments of
+        `register`. The `func` of each job is given as a dotted import path, e.g.::
+
+            APSCHEDULER_JOBS = {
+                "cleanup": {"func": "myapp.jobs.cleanup", "trigger": "cron", "hour": 3},
+            }
+        """
+        for job_id, definition in getattr(settings, "APSCHEDULER_JOBS", {}).items():
+            definition = dict(definition)
+            func = definition.pop("func")
+            self.register(
+                import_string(func) if isinstance(func, str) else func,
+                definition.pop("trigger"),
+                id=job_id,
+                **definition,
+            )
+
+    @util.retry_on_db_operational_error
+    def reconcile(
+        self,
+        scheduler: BaseScheduler,
+        jobstore: str = "default",
+        prune: bool = False,
+    ) -> Dict[str, List[str]]:
+        """
+        Bring the jobs in the database in line with the registered job definitions: jobs that do not exist yet are
+        created, and jobs whose definition has changed since they were last reconciled are replaced. All other jobs are
+        left untouched.
+
+        The stored fingerprints are retrieved with a single query, and all new and changed jobs are written in bulk.
+        This should be done before the scheduler is started, so that the scheduler picks up the changes when it loads
+        the jobs from a `DjangoJobStore` (or `DjangoWriteBehindJobStore`).
+
+        :param scheduler: The scheduler that the jobs belong to. Used for its timezone, triggers, and job defaults.
+        :param jobstore: The alias of the job store that the jobs belong to.
+        :param prune: Also remove jobs that were created by a registry, but are no longer registered. Jobs that were
+        added to the scheduler directly are never removed.
+        :return: The IDs of the jobs that were 'created', 'updated', 'unchanged', and 'removed'.
+        """
+        pickle_protocol = getattr(
+            scheduler._jobstores.get(jobstore),
+            "pickle_protocol",
+            pickle.HIGHEST_PROTOCOL,
+        )
+        fingerprints = {
+            definition.id: definition.get_fingerprint(scheduler)
+            for definition in self._definitions.values()
+        }
+
+        # Removed jobs are included, so that they can be revived instead of conflicting with the new jobs
+        stored = DjangoJob._base_manager.filter(id__in=list(fingerprints))
+        if prune:
+            stored |= DjangoJob.objects.filter(fingerprint__isnull=False)
+        stored = {
+            job_id: (fingerprint, removed)
+            for job_id, fingerprint, removed in stored.values_list(
+                "id", "fingerprint", "removed"
+            )
+        }
+
+        result = {"created": [], "updated": [], "unchanged": [], "removed": []}
+        new_jobs = []
+        changed_jobs = []
+        for job_id, fingerprint in fingerprints.items():
+            if job_id in stored and stored[job_id] == (fingerprint, False):
+                result["unchanged"].append(job_id)
+                continue
+
+            job = self._definitions[job_id].create_job(scheduler, jobstore)
+            db_job = DjangoJob(
+                id=job_id,
+                next_run_time=util.get_django_internal_datetime(job.next_run_time),
+                job_state=pickle.dumps(job.__getstate__(), pickle_protocol),
+                fingerprint=fingerprint,
+            )
+
+            if job_id in stored:
+                changed_jobs.append(db_job)
+                result["updated"].append(job_id)
+            else:
+                new_jobs.append(db_job)
+                result["created"].append(job_id)
+
+        if prune:
+            result["removed"] = [
+                job_id
+                for job_id, (_, removed) in stored.items()
+                if job_id not in fingerprints and not removed
+            ]
+
+        if new_jobs or changed_jobs or result["removed"]:
+            self._write(new_jobs, changed_jobs, result["removed"])
+
+        logger.info(
+            f"Reconciled {len(fingerprints)} job definition(s): {len(result['created'])} created, "
+            f"{len(result['updated'])} updated, {len(result['unchanged'])} unchanged, and "
+            f"{len(result['removed'])} removed."
+        )
+
+        return result
+
+    @staticmethod
+    def _write(
+        new_jobs: List[DjangoJob], changed_jobs: List[DjangoJob], removed: List[str]
+    ):
+        with transaction.atomic():
+            DjangoJob.objects.bulk_create(new_jobs, batch_size=1000)
+            DjangoJob._base_manager.bulk_update(
+                changed_jobs,
+                ["next_run_time", "job_state", "fingerprint", "removed"],
+                batch_size=1000,
+            )
+            # The executions of the removed jobs are purged in the background by the job store, so as not to delay
+            # starting the scheduler
+            DjangoJob.objects.filter(id__in=removed).update(
+                removed=True, next_run_time=None
+            )
+
+
+# The default registry, which is reconciled by the `runapscheduler` management command
+registry = JobRegistry()
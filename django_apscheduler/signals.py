@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+# Sent when a job execution took longer to complete than the slow run threshold of the corresponding job.
+#
+# Receivers are called with the following keyword arguments:
+# - `execution`: the DjangoJobExecution that was flagged as being slow.
+# - `threshold`: the slow run threshold (in seconds) that was exceeded.
+job_execution_slow = Signal()
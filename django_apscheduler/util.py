@@ -1,13 +1,30 @@
+import cProfile
 import logging
+import marshal
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
+from contextlib import ExitStack
 from datetime import datetime
-from functools import wraps
+from functools import wraps, partial
+from typing import Callable, Union, Tuple
 
+import django
+from apscheduler.executors.base import run_job
 from apscheduler.schedulers.base import BaseScheduler
 from django import db
 from django.conf import settings
-from django.utils import formats
+from django.utils import dateformat, formats
 from django.utils import timezone
 
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,12 +35,20 @@ def get_dt_format() -> str:
     )
 
 
-def get_local_dt_format(dt: datetime) -> str:
-    """Get the datetime in the localized datetime format"""
+def get_local_dt_format(dt: datetime, dt_format: str = None) -> str:
+    """
+    Get the datetime in the localized datetime format
+
+    :param dt_format: A format string that has already been resolved with `get_dt_format`. Pass this in when formatting
+    many datetimes at once (e.g. for a Django admin changelist) to avoid resolving the format for every single one.
+    """
     if dt and settings.USE_TZ and timezone.is_aware(dt):
         dt = timezone.localtime(dt)
 
-    return formats.date_format(dt, get_dt_format())
+    if dt_format is None:
+        return formats.date_format(dt, get_dt_format())
+
+    return dateformat.format(dt, dt_format)
 
 
 def get_django_internal_datetime(dt: datetime) -> datetime:
@@ -100,6 +125,7 @@ def retry_on_db_operational_error(func):
             logger.warning(
                 f"DB error executing '{func.__name__}' ({e}). Retrying with a new DB connection..."
             )
+            record_operation_retry()
             db.close_old_connections()
             result = func(*args, **kwargs)
 
@@ -131,3 +157,381 @@ def close_old_connections(func):
         return result
 
     return func_wrapper
+
+
+def initialize_worker_process(
+    settings_module: str = None, initializer: Callable = None, initargs=()
+):
+    """
+    Set up Django once in each worker process of a `DjangoProcessPoolExecutor`, before any jobs are run.
+
+    :param settings_module: The `DJANGO_SETTINGS_MODULE` of the scheduler process.
+    :param initializer: Additional initializer to call afterwards (from the `pool_kwargs` of the executor), if any.
+    :param initargs: The arguments to pass to `initializer`.
+    """
+    if settings_module:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
+
+    for connection in db.connections.all():
+        # Connections that were inherited from the scheduler process (if the worker was forked) share their sockets
+        # with the scheduler, so they are discarded instead of being closed.
+        connection.connection = None
+
+    if initializer is not None:
+        initializer(*initargs)
+
+
+# Additional data (resource usage, profiling results, etc.) that job wrappers collected for a specific job run, keyed
+# on `(job_id, run_time)`. This is picked up again by the result store when the corresponding execution is logged.
+_job_run_data = {}
+_job_run_data_lock = threading.Lock()
+
+# Upper bound on the number of job runs for which data is retained. Prevents unbounded growth for runs that are never
+# logged (e.g. jobs that are executed outside of a scheduler that uses one of the django_apscheduler job stores).
+_JOB_RUN_DATA_MAX_ENTRIES = 1000
+
+
+def get_current_job_run() -> Union[Tuple[str, datetime], None]:
+    """
+    Return the `(job_id, run_time)` of the APScheduler job run that is currently being executed by this thread, or None
+    if this method is not being called from within a job.
+
+    APScheduler does not expose the job that is being run to the callable itself, so we look for the `run_job` frame
+    that all of the standard executors use to invoke jobs instead.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code is run_job.__code__:
+            f_locals = frame.f_locals
+            return f_locals["job"].id, f_locals["run_time"]
+
+        frame = frame.f_back
+
+    return None
+
+
+def update_job_run_data(job_run: Tuple[str, datetime], **data):
+    """
+    Attach additional data to the job run identified by `job_run`, to be stored along with the corresponding
+    DjangoJobExecution once the run has been completed.
+    """
+    with _job_run_data_lock:
+        _job_run_data.setdefault(job_run, {}).update(data)
+
+        while len(_job_run_data) > _JOB_RUN_DATA_MAX_ENTRIES:
+            # Discard the oldest entry
+            del _job_run_data[next(iter(_job_run_data))]
+
+
+def pop_job_run_data(job_id: str, run_time: datetime) -> dict:
+    """Remove and return all of the data that was collected for a particular job run (if any)."""
+    with _job_run_data_lock:
+        return _job_run_data.pop((job_id, run_time), {})
+
+
+class QueryCounter:
+    """
+    A database `execute_wrapper` (see: https://docs.djangoproject.com/en/dev/topics/db/instrumentation/) that keeps
+    track of the number of queries that are executed, and the total time spent executing them.
+
+    Can be used as a context manager, in which case it will be installed on all of the Django database connections of
+    the current thread.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self._exit_stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+    def __enter__(self):
+        self._exit_stack = ExitStack()
+        for connection in db.connections.all():
+            self._exit_stack.enter_context(connection.execute_wrapper(self))
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._exit_stack.close()
+        self._exit_stack = None
+
+
+class ResourceUsage:
+    """
+    Context manager that measures the resources consumed by the current thread while the context is active:
+
+    - CPU user and system time (using `resource.getrusage`, or `time.thread_time` on platforms where that is not
+      available);
+    - The increase in the peak resident set size (RSS) of the process;
+    - Optionally, the peak memory allocated by Python itself (using `tracemalloc`); and
+    - The number of Django database queries executed, and the total time spent waiting for them.
+
+    Note that the RSS and `tracemalloc` values are process-wide: they can only be attributed to a single job accurately
+    if that job is not running concurrently with other jobs.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.query_counter = QueryCounter()
+
+        self.cpu_user_time = None
+        self.cpu_system_time = None
+        self.memory_peak_increase = None
+        self.memory_traced_peak = None
+
+        self._started_tracing = False
+
+    @staticmethod
+    def _get_cpu_times() -> Tuple[float, Union[float, None]]:
+        if resource is not None and hasattr(resource, "RUSAGE_THREAD"):
+            usage = resource.getrusage(resource.RUSAGE_THREAD)
+            return usage.ru_utime, usage.ru_stime
+
+        return time.thread_time(), None
+
+    @staticmethod
+    def _get_max_rss() -> Union[int, None]:
+        if resource is None:
+            return None
+
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # `ru_maxrss` is reported in bytes on macOS, and in kilobytes everywhere else
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+    def __enter__(self):
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+
+            self._traced_start = tracemalloc.get_traced_memory()[0]
+            if hasattr(tracemalloc, "reset_peak"):  # Python >= 3.9
+                tracemalloc.reset_peak()
+
+        self._max_rss_start = self._get_max_rss()
+        self._cpu_start = self._get_cpu_times()
+        self.query_counter.__enter__()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.query_counter.__exit__(exc_type, exc_val, exc_tb)
+
+        user_end, system_end = self._get_cpu_times()
+        user_start, system_start = self._cpu_start
+        self.cpu_user_time = user_end - user_start
+        if system_end is not None:
+            self.cpu_system_time = system_end - system_start
+
+        max_rss_end = self._get_max_rss()
+        if max_rss_end is not None:
+            self.memory_peak_increase = max_rss_end - self._max_rss_start
+
+        if self.trace_memory:
+            self.memory_traced_peak = max(
+                tracemalloc.get_traced_memory()[1] - self._traced_start, 0
+            )
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def as_dict(self) -> dict:
+        """Return the measurements, keyed on the corresponding DjangoJobExecution field names"""
+        return {
+            "cpu_user_time": self.cpu_user_time,
+            "cpu_system_time": self.cpu_system_time,
+            "memory_peak_increase": self.memory_peak_increase,
+            "memory_traced_peak": self.memory_traced_peak,
+            "db_query_count": self.query_counter.count,
+            "db_query_time": self.query_counter.duration,
+        }
+
+
+def record_resource_usage(func=None, *, trace_memory: bool = False):
+    """
+    A decorator that measures the CPU time, memory, and number of Django database queries used by each run of an
+    APScheduler job (see `ResourceUsage` for details). The measurements are stored on the corresponding
+    DjangoJobExecution, and can be viewed in the Django admin.
+
+    Usage::
+
+        @util.record_resource_usage
+        def my_job():
+            ...
+
+        @util.record_resource_usage(trace_memory=True)
+        def my_memory_hungry_job():
+            ...
+
+    This decorator is opt-in because it adds a small amount of overhead to each job run (and considerably more when
+    `trace_memory` is enabled). The results can only be logged for jobs that are run by a thread pool or debug
+    executor in the same process as the scheduler.
+
+    :param trace_memory: Also record the peak memory allocated by Python during the job run using `tracemalloc`.
+    """
+    if func is None:
+        return partial(record_resource_usage, trace_memory=trace_memory)
+
+    @wraps(func)
+    def func_wrapper(*args, **kwargs):
+        job_run = get_current_job_run()
+        if job_run is None:
+            # Not being run by the scheduler - nothing to log the results to.
+            return func(*args, **kwargs)
+
+        usage = ResourceUsage(trace_memory=trace_memory)
+        try:
+            with usage:
+                result = func(*args, **kwargs)
+        finally:
+            update_job_run_data(job_run, resource_usage=usage.as_dict())
+
+        return result
+
+    return func_wrapper
+
+
+def profile_job_run(func):
+    """
+    A decorator that profiles each run of an APScheduler job using `cProfile`. The (compressed) profiling statistics are
+    stored in a DjangoJobExecutionProfile that is linked to the corresponding DjangoJobExecution.
+
+    `DjangoJobStore` applies this decorator automatically to jobs that have been flagged for profiling via the Django
+    admin, so there is usually no need to use it directly.
+    """
+
+    @wraps(func)
+    def func_wrapper(*args, **kwargs):
+        job_run = get_current_job_run()
+        if job_run is None:
+            return func(*args, **kwargs)
+
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            profiler.create_stats()
+            update_job_run_data(
+                job_run, profile=zlib.compress(marshal.dumps(profiler.stats))
+            )
+
+    return func_wrapper
+
+
+class OperationStats:
+    """Cumulative statistics for all of the calls to a single instrumented operation (see `instrumented`)"""
+
+    def __init__(self):
+        self.calls = 0
+        self.queries = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.unpickle_time = 0.0
+        self.retries = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "queries": self.queries,
+            "total_time": self.total_time,
+            "max_time": self.max_time,
+            "mean_time": self.total_time / self.calls if self.calls else None,
+            "unpickle_time": self.unpickle_time,
+            "retries": self.retries,
+        }
+
+
+# Statistics of the instrumented operations, keyed on operation name
+_operation_stats = {}
+_operation_stats_lock = threading.Lock()
+
+# The unpickle time and retries of the instrumented operation that is currently being executed by each thread
+_current_operation = threading.local()
+
+
+def instrumented(func):
+    """
+    A decorator that records the number of calls, database queries, latency, unpickle time, and retries of a job store
+    or result store operation, if `settings.APSCHEDULER_INSTRUMENTATION` is enabled. The statistics are recorded under
+    the qualified name of the decorated function (e.g. 'DjangoJobStore.get_due_jobs'), and can be retrieved with
+    `get_operation_stats`.
+
+    Operations that take longer than `settings.APSCHEDULER_SLOW_OPERATION_THRESHOLD` seconds are logged as well.
+
+    This decorator should be applied on top of `retry_on_db_operational_error`, so that retries are attributed to the
+    operation.
+    """
+    operation = func.__qualname__
+
+    @wraps(func)
+    def func_wrapper(*args, **kwargs):
+        if not getattr(settings, "APSCHEDULER_INSTRUMENTATION", False):
+            return func(*args, **kwargs)
+
+        parent = getattr(_current_operation, "sample", None)
+        sample = _current_operation.sample = {"unpickle_time": 0.0, "retries": 0}
+        counter = QueryCounter()
+        started = time.perf_counter()
+        try:
+            with counter:
+                return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_operation.sample = parent
+
+            with _operation_stats_lock:
+                stats = _operation_stats.setdefault(operation, OperationStats())
+                stats.calls += 1
+                stats.queries += counter.count
+                stats.total_time += elapsed
+                stats.max_time = max(stats.max_time, elapsed)
+                stats.unpickle_time += sample["unpickle_time"]
+                stats.retries += sample["retries"]
+
+            threshold = getattr(settings, "APSCHEDULER_SLOW_OPERATION_THRESHOLD", None)
+            if threshold is not None and elapsed > threshold:
+                logger.warning(
+                    f"Operation '{operation}' took {elapsed:.3f} seconds ({counter.count} queries, "
+                    f"{sample['retries']} retries), which exceeds the threshold of {threshold} seconds."
+                )
+
+    return func_wrapper
+
+
+def record_unpickle_time(duration: float):
+    """Attribute time spent unpickling job states to the instrumented operation that is currently being executed"""
+    sample = getattr(_current_operation, "sample", None)
+    if sample is not None:
+        sample["unpickle_time"] += duration
+
+
+def record_operation_retry():
+    """Count a retry of the instrumented operation that is currently being executed"""
+    sample = getattr(_current_operation, "sample", None)
+    if sample is not None:
+        sample["retries"] += 1
+
+
+def get_operation_stats() -> dict:
+    """
+    Return a snapshot of the statistics that have been recorded for each instrumented operation since the process was
+    started (or since `reset_operation_stats` was last called), keyed on operation name.
+    """
+    with _operation_stats_lock:
+        return {
+            operation: stats.as_dict() for operation, stats in _operation_stats.items()
+        }
+
+
+def reset_operation_stats():
+    """Discard all of the statistics that have been recorded for the instrumented operations"""
+    with _operation_stats_lock:
+        _operation_stats.clear()
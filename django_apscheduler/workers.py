@@ -0,0 +1,241 @@
+"""
+Worker processes that run the jobs that have been queued by a `DjangoQueueExecutor`.
+"""
+
+import itertools
+import logging
+import os
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from traceback import format_tb
+from typing import Callable, List
+
+from apscheduler import events
+from apscheduler.events import JobExecutionEvent
+from apscheduler.executors.base import run_job
+from apscheduler.util import ref_to_obj
+from django import db
+from django.utils import timezone
+
+from django_apscheduler.jobstores import DjangoResultStoreMixin
+from django_apscheduler.models import DjangoQueuedJobRun
+
+logger = logging.getLogger(__name__)
+
+# Distinguishes the workers of the same process
+_worker_sequence = itertools.count()
+
+
+class QueuedJob:
+    """The subset of an APScheduler `Job` that is needed to run a queued job with APScheduler's `run_job`"""
+
+    def __init__(self, queued_run: DjangoQueuedJobRun, func: Callable):
+        self.id = queued_run.job_id
+        self.func = func
+        self.args, self.kwargs = queued_run.get_args()
+        self.misfire_grace_time = queued_run.misfire_grace_time
+
+    def __str__(self):
+        return self.id
+
+
+class QueueWorker:
+    """
+    Claims the runs that have been queued by a `DjangoQueueExecutor`, and runs them in a thread pool. Job executions are
+    logged in the same way as by a scheduler that uses one of the django_apscheduler job stores.
+
+    Claimed runs are only removed from the queue once they have been run. While they are running, a background thread
+    renews the worker's claims every `claim_timeout / 3` seconds, and re-queues the runs of other workers whose claims
+    have not been renewed for `claim_timeout` seconds (e.g. because the worker was terminated).
+
+    :param max_workers: the maximum number of jobs to run concurrently
+    :param poll_interval: number of seconds to wait before looking for new runs, if the queue is empty
+    :param job_wrappers: decorators (e.g. `util.record_resource_usage`) to apply to the function of each job that is
+           about to be run
+    :param claim_timeout: number of seconds after which the claim of a worker on a run expires, unless it is renewed
+    """
+
+    # The job store alias that is reported in the events of queued runs
+    jobstore_alias = "default"
+
+    def __init__(
+        self,
+        max_workers: int = 10,
+        poll_interval: float = 1,
+        job_wrappers: List[Callable] = None,
+        claim_timeout: float = 300,
+    ):
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.job_wrappers = job_wrappers or []
+        self.claim_timeout = claim_timeout
+        self.worker_id = (
+            f"{socket.gethostname()}:{os.getpid()}:{next(_worker_sequence)}"
+        )
+
+        self._capacity = threading.BoundedSemaphore(max_workers)
+        self._stopped = threading.Event()
+        # The runs that are currently being run, keyed on ID
+        self._running = {}
+        self._running_lock = threading.Lock()
+
+    def run(self, burst: bool = False) -> int:
+        """
+        Run queued jobs until `stop` is called. Waits for the jobs that are still running before returning.
+
+        :param burst: Stop as soon as the queue is empty.
+        :return: The number of queued runs that were processed.
+        """
+        if DjangoResultStoreMixin.lock is None:
+            # Normally set when a scheduler starts a job store
+            DjangoResultStoreMixin.lock = threading.RLock()
+
+        # Pick up the runs of workers that were terminated while running them
+        self.maintain_claims()
+
+        processed = 0
+        pool = ThreadPoolExecutor(
+            self.max_workers, thread_name_prefix=self.__class__.__name__
+        )
+        maintenance_stopped = threading.Event()
+        maintenance_thread = threading.Thread(
+            target=self._maintain_claims_periodically,
+            args=(maintenance_stopped,),
+            name=f"{self.__class__.__name__}-claims",
+            daemon=True,
+        )
+        maintenance_thread.start()
+        try:
+            while not self._stopped.is_set():
+                capacity = self._reserve_capacity()
+                if not capacity:
+                    continue
+
+                try:
+                    queued_runs = DjangoQueuedJobRun.objects.claim(
+                        capacity, self.worker_id
+                    )
+                except Exception:
+                    logger.exception("Unable to claim queued job runs!")
+                    queued_runs = []
+
+                for _ in range(capacity - len(queued_runs)):
+                    self._capacity.release()
+
+                for queued_run in queued_runs:
+                    with self._running_lock:
+                        self._running[queued_run.id] = queued_run
+                    pool.submit(self._run, queued_run)
+                processed += len(queued_runs)
+
+                if not queued_runs:
+                    if burst:
+                        break
+
+                    self._stopped.wait(self.poll_interval)
+        finally:
+            pool.shutdown(wait=True)
+            maintenance_stopped.set()
+            maintenance_thread.join()
+            db.connection.close()
+
+        return processed
+
+    def maintain_claims(self):
+        """
+        Renew the claims of this worker on the runs that it is running, and re-queue the runs whose claims have expired
+        """
+        try:
+            with self._running_lock:
+                running = list(self._running.values())
+            if running:
+                DjangoQueuedJobRun.objects.renew_claims(running, self.worker_id)
+
+            requeued = DjangoQueuedJobRun.objects.requeue_stale(self.claim_timeout)
+            if requeued:
+                logger.warning(
+                    f"Re-queued {requeued} run(s) that were claimed by a worker that is no longer running them."
+                )
+        except Exception:
+            logger.exception("Unable to maintain the claims on queued job runs!")
+
+    def _maintain_claims_periodically(self, stopped: threading.Event):
+        try:
+            while not stopped.wait(self.claim_timeout / 3):
+                self.maintain_claims()
+        finally:
+            db.connection.close()
+
+    def stop(self):
+        """Stop claiming new runs. Jobs that are already running are allowed to complete."""
+        self._stopped.set()
+
+    def _reserve_capacity(self) -> int:
+        """Wait until at least one worker thread is available, and reserve all of the worker threads that are"""
+        while not self._capacity.acquire(timeout=self.poll_interval):
+            if self._stopped.is_set():
+                return 0
+
+        capacity = 1
+        while capacity < self.max_workers and self._capacity.acquire(blocking=False):
+            capacity += 1
+
+        return capacity
+
+    def _run(self, queued_run: DjangoQueuedJobRun):
+        try:
+            self.run_queued_job(queued_run)
+        except Exception:
+            logger.exception(f"Unable to run {queued_run}!")
+        finally:
+            with self._running_lock:
+                self._running.pop(queued_run.id, None)
+            self._capacity.release()
+            db.close_old_connections()
+
+    def run_queued_job(self, queued_run: DjangoQueuedJobRun) -> List[JobExecutionEvent]:
+        """
+        Run a queued job, log its execution, and remove it from the queue.
+
+        :return: The APScheduler events that were generated for the run.
+        """
+        run_time = queued_run.run_time
+        if timezone.is_naive(run_time):
+            # The inverse of `util.get_django_internal_datetime`
+            run_time = timezone.make_aware(run_time)
+
+        try:
+            func = ref_to_obj(queued_run.func_ref)
+            for wrapper in self.job_wrappers:
+                func = wrapper(func)
+            job = QueuedJob(queued_run, func)
+        except Exception:
+            exc, tb = sys.exc_info()[1:]
+            logger.exception(f"Unable to restore {queued_run}!")
+            job_events = [
+                JobExecutionEvent(
+                    events.EVENT_JOB_ERROR,
+                    queued_run.job_id,
+                    self.jobstore_alias,
+                    run_time,
+                    exception=exc,
+                    traceback="".join(format_tb(tb)),
+                )
+            ]
+        else:
+            job_events = run_job(job, self.jobstore_alias, [run_time], logger.name)
+
+        for event in job_events:
+            if event.code == events.EVENT_JOB_EXECUTED:
+                DjangoResultStoreMixin.handle_execution_event(event)
+            else:
+                DjangoResultStoreMixin.handle_error_event(event)
+
+        if not queued_run.complete():
+            logger.warning(
+                f"{queued_run} was re-queued while it was running, and may run again."
+            )
+
+        return job_events
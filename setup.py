@@ -35,6 +35,7 @@ setup(
     ],
     keywords="django apscheduler django-apscheduler",
     packages=find_packages(exclude=("tests",)),
+    include_package_data=True,
     install_requires=[
         "django>=3.2",
         "apscheduler>=3.2,<4.0",
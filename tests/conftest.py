@@ -10,7 +10,8 @@ from apscheduler.schedulers.blocking import BlockingScheduler
 from django import db
 from django.db import transaction
 
-from django_apscheduler.jobstores import DjangoJobStore
+from django_apscheduler import util
+from django_apscheduler.jobstores import DjangoJobStore, _PurgeRemovedJobsMixin
 from django_apscheduler.models import DjangoJob
 
 
@@ -109,7 +110,18 @@ def create_add_job(timezone, create_job):
 
 
 @pytest.fixture
-def jobstore():
+def synchronous_purge(monkeypatch):
+    # Purge removed jobs in the test thread: background threads do not share the test database transaction. Tests that
+    # exercise the purge thread itself should use a job store that does not depend on this fixture, and a
+    # `transactional_db`.
+    def start_purge(self):
+        DjangoJob.objects.purge_removed_jobs(batch_size=self.purge_batch_size)
+
+    monkeypatch.setattr(_PurgeRemovedJobsMixin, "_start_purge", start_purge)
+
+
+@pytest.fixture
+def jobstore(synchronous_purge):
     # Based on https://github.com/agronholm/apscheduler/blob/8235c03d790b42104e2921d9cff376c9f53dd53d/tests/test_jobstores.py#L57
     store = DjangoJobStore()
     store.start(DummyScheduler(), "djangojobstore")
@@ -127,6 +139,14 @@ def scheduler(jobstore, settings):
     return scheduler
 
 
+@pytest.fixture
+def operation_stats(settings):
+    settings.APSCHEDULER_INSTRUMENTATION = True
+    util.reset_operation_stats()
+    yield
+    util.reset_operation_stats()
+
+
 @pytest.fixture
 def use_seconds_format(settings):
     settings.APSCHEDULER_DATETIME_FORMAT = "N j, Y, f:s"
@@ -17,5 +17,21 @@ DATABASES = {
     },
 }
 
-APSCHEDULER_RUN_NOW_TIMEOUT = 15
+ROOT_URLCONF = "tests.urls"
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "APP_DIRS": True,
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+            ],
+        },
+    },
+]
+
+# Tests call `DjangoJobStore.get_due_jobs` directly, so there is no need to poll for run requests
+APSCHEDULER_RUN_NOW_POLL_INTERVAL = None
 APSCHEDULER_DATETIME_FORMAT = "N j, Y, f:s a"
@@ -1,16 +1,28 @@
 from datetime import timedelta
+from decimal import Decimal
 from unittest import mock
 
 import pytest
-from apscheduler.schedulers.background import BackgroundScheduler
-from django.conf import settings
+from django.contrib.admin import site
 from django.contrib.messages.storage.base import BaseStorage
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.utils.html import format_html
 
-from django_apscheduler.admin import DjangoJobAdmin, DjangoJobExecutionAdmin
-from django_apscheduler.jobstores import DjangoJobStore
-from django_apscheduler.models import DjangoJob, DjangoJobExecution
+from django_apscheduler import util
+from django_apscheduler.admin import (
+    DjangoJobAdmin,
+    DjangoJobExecutionAdmin,
+    DjangoJobExecutionProfileAdmin,
+    EstimatedCountPaginator,
+)
+from django_apscheduler.models import (
+    DjangoJob,
+    DjangoJobExecution,
+    DjangoJobExecutionProfile,
+)
 
 
 class TestDjangoJobAdmin:
@@ -39,11 +51,11 @@ class TestDjangoJobAdmin:
         )  # Most recent job execution
 
         admin = DjangoJobAdmin(DjangoJob, None)
-        admin.get_queryset(rf.get("/admin/django_apscheduler/djangojob"))
+        qs = admin.get_queryset(rf.get("/admin/django_apscheduler/djangojob"))
 
-        assert admin.avg_duration_qs.count() == 1
-        assert admin.avg_duration_qs.first()[0] == job.id
-        assert admin.avg_duration_qs.first()[1] == 7.5
+        assert qs.count() == 1
+        assert qs.first().id == job.id
+        assert qs.first().avg_duration == 7.5
 
     @pytest.mark.django_db
     def test_local_run_time_returns_paused_if_no_run_time_scheduled(self, rf, request):
@@ -55,6 +67,26 @@ class TestDjangoJobAdmin:
 
         assert admin.local_run_time(job) == "(paused)"
 
+    @pytest.mark.django_db
+    def test_get_queryset_does_not_store_state_on_admin(self, rf):
+        # The admin is shared by all of the threads that serve requests
+        admin = DjangoJobAdmin(DjangoJob, None)
+        state = dict(vars(admin))
+
+        admin.get_queryset(rf.get("/admin/django_apscheduler/djangojob"))
+
+        assert vars(admin) == state
+
+    @pytest.mark.django_db
+    def test_local_run_time_formats_next_run_time(self, rf, request):
+        run_time = timezone.now()
+        job = DjangoJob.objects.create(id="test_job", next_run_time=run_time)
+        request.addfinalizer(job.delete)
+
+        admin = DjangoJobAdmin(DjangoJob, None)
+
+        assert admin.local_run_time(job) == util.get_local_dt_format(run_time)
+
     @pytest.mark.django_db
     def test_average_duration_returns_correct_value(self, rf, request):
         now = timezone.now()
@@ -80,9 +112,9 @@ class TestDjangoJobAdmin:
         )  # Most recent job execution
 
         admin = DjangoJobAdmin(DjangoJob, None)
-        admin.get_queryset(rf.get("/admin/django_apscheduler/djangojob"))
+        qs = admin.get_queryset(rf.get("/admin/django_apscheduler/djangojob"))
 
-        assert admin.average_duration(job) == 7.5
+        assert admin.average_duration(qs.get(id=job.id)) == 7.5
 
     @pytest.mark.django_db
     def test_average_duration_no_executions_shows_none_text(self, request, rf):
@@ -94,73 +126,127 @@ class TestDjangoJobAdmin:
 
         admin = DjangoJobAdmin(DjangoJob, None)
         r = rf.get("/django_apscheduler/djangojob/")
-        admin.get_queryset(r)
-
-        assert admin.average_duration(job) == "None"
+        qs = admin.get_queryset(r)
 
-    @pytest.mark.django_db(transaction=True)
-    def test_run_selected_jobs_creates_job_execution_entry(self, rf, monkeypatch):
-        monkeypatch.setattr(
-            settings, "APSCHEDULER_RUN_NOW_TIMEOUT", 1
-        )  # Shorten timeout to reduce test runtime
+        assert admin.average_duration(qs.get(id=job.id)) == "None"
 
-        scheduler = BackgroundScheduler()
-        scheduler.add_jobstore(DjangoJobStore())
-        scheduler.start()
+    @pytest.mark.django_db
+    def test_get_queryset_annotates_job_health(self, rf, settings):
+        settings.APSCHEDULER_ERROR_RATE_WINDOW = 3600
+        now = timezone.now()
 
-        job = scheduler.add_job(print, trigger="interval", seconds=60)
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        DjangoJobExecution.objects.create(
+            job=job,
+            status=DjangoJobExecution.ERROR,
+            run_time=now - timedelta(hours=2),
+        )  # Outside of error rate window
+        for i, status in enumerate(
+            [
+                DjangoJobExecution.SUCCESS,
+                DjangoJobExecution.SUCCESS,
+                DjangoJobExecution.SUCCESS,
+                DjangoJobExecution.ERROR,
+            ]
+        ):
+            DjangoJobExecution.objects.create(
+                job=job, status=status, run_time=now - timedelta(minutes=i)
+            )
 
         admin = DjangoJobAdmin(DjangoJob, None)
+        job = admin.get_queryset(rf.get("/django_apscheduler/djangojob/")).get()
 
-        r = rf.get("/django_apscheduler/djangojob/")
-        # Add support for Django messaging framework
-        r._messages = mock.MagicMock(BaseStorage)
-        r._messages.add = mock.MagicMock()
+        assert job.last_run == now
+        assert admin.last_status(job) == format_html(
+            '<p style="color: green">{}</p>', DjangoJobExecution.SUCCESS
+        )
+        assert admin.error_rate(job) == "25.0%"
 
-        assert not DjangoJobExecution.objects.filter(job_id=job.id).exists()
+    @pytest.mark.django_db
+    def test_health_columns_no_executions_show_none_text(self, rf):
+        DjangoJob.objects.create(id="test_job")
 
-        admin.run_selected_jobs(r, DjangoJob.objects.filter(id=job.id))
+        admin = DjangoJobAdmin(DjangoJob, None)
+        job = admin.get_queryset(rf.get("/django_apscheduler/djangojob/")).get()
 
-        assert DjangoJobExecution.objects.filter(job_id=job.id).exists()
-        r._messages.add.assert_called_with(20, f"Executed job '{job.id}'!", "")
+        assert admin.last_run_time(job) == "None"
+        assert admin.last_status(job) == "None"
+        assert admin.error_rate(job) == "N/A"
 
-        scheduler.shutdown()
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("num_jobs", [1, 10])
+    def test_changelist_query_count_does_not_depend_on_number_of_jobs(
+        self, rf, django_assert_num_queries, num_jobs
+    ):
+        now = timezone.now()
+        for i in range(num_jobs):
+            job = DjangoJob.objects.create(id=f"test_job_{i}", next_run_time=now)
+            DjangoJobExecution.objects.create(
+                job=job, status=DjangoJobExecution.SUCCESS, run_time=now, duration=1
+            )
 
-    @pytest.mark.django_db(transaction=True)
-    def test_run_selected_jobs_job_not_found_skips_execution(self, rf):
-        scheduler = BackgroundScheduler()
-        scheduler.add_jobstore(DjangoJobStore())
-        scheduler.start()
+        admin = DjangoJobAdmin(DjangoJob, None)
 
-        job = DjangoJob.objects.create(id="test_job")
+        with django_assert_num_queries(1):
+            for job in admin.get_queryset(rf.get("/django_apscheduler/djangojob/")):
+                for field in admin.list_display[1:]:
+                    getattr(admin, field)(job)
 
-        admin = DjangoJobAdmin(DjangoJob, None)
+    @pytest.mark.django_db
+    def test_run_selected_jobs_requests_run(self, rf, request):
+        job = DjangoJob.objects.create(id="test_job", next_run_time=None)
+        request.addfinalizer(job.delete)
+
+        admin = DjangoJobAdmin(DjangoJob, site)
 
         r = rf.get("/django_apscheduler/djangojob/")
         # Add support for Django messaging framework
         r._messages = mock.MagicMock(BaseStorage)
         r._messages.add = mock.MagicMock()
 
-        admin.run_selected_jobs(r, DjangoJob.objects.filter(id=job.id))
+        response = admin.run_selected_jobs(r, DjangoJob.objects.filter(id=job.id))
 
-        assert DjangoJobExecution.objects.count() == 0
+        job.refresh_from_db()
+        assert job.run_requested_at is not None
+        assert job.next_run_time is None  # Schedule is left untouched
+        assert not DjangoJobExecution.objects.exists()
+
+        assert response.status_code == 302
+        assert response.url.startswith(
+            "/admin/django_apscheduler/djangojobexecution/?job__id__in=test_job"
+        )
         r._messages.add.assert_called_with(
-            30, "Could not find job test_job in the database! Skipping execution...", ""
+            20,
+            "Requested 1 job(s) to run. Their executions will be listed below as soon as they are picked up by the "
+            "scheduler.",
+            "",
         )
 
-        scheduler.shutdown()
+    @pytest.mark.django_db
+    def test_run_selected_jobs_does_not_execute_jobs_in_request(self, rf, scheduler):
+        job = scheduler.add_job(print, trigger="interval", seconds=60)
+        scheduler.start()
 
-    @pytest.mark.django_db(transaction=True)
-    def test_run_selected_jobs_enforces_timeout(self, rf, monkeypatch):
-        monkeypatch.setattr(
-            settings, "APSCHEDULER_RUN_NOW_TIMEOUT", 1
-        )  # Shorten timeout to reduce test runtime
+        admin = DjangoJobAdmin(DjangoJob, site)
 
-        scheduler = BackgroundScheduler()
-        scheduler.add_jobstore(DjangoJobStore())
-        scheduler.start()
+        r = rf.get("/django_apscheduler/djangojob/")
+        r._messages = mock.MagicMock(BaseStorage)
 
-        job = scheduler.add_job(print, trigger="interval", seconds=60)
+        admin.run_selected_jobs(r, DjangoJob.objects.filter(id=job.id))
+        assert not DjangoJobExecution.objects.exists()
+
+        # The job is only run once the scheduler picks up the request
+        scheduler._process_jobs()
+        assert DjangoJobExecution.objects.filter(
+            job_id=job.id, status=DjangoJobExecution.SUCCESS
+        ).exists()
+
+    @pytest.mark.django_db
+    def test_profile_selected_jobs_sets_profile_runs(self, rf, settings, request):
+        settings.APSCHEDULER_PROFILE_RUNS = 3
+
+        job = DjangoJob.objects.create(id="test_job")
+        request.addfinalizer(job.delete)
 
         admin = DjangoJobAdmin(DjangoJob, None)
 
@@ -169,23 +255,14 @@ class TestDjangoJobAdmin:
         r._messages = mock.MagicMock(BaseStorage)
         r._messages.add = mock.MagicMock()
 
-        with mock.patch("django_apscheduler.admin.BackgroundScheduler.add_listener"):
-            admin.run_selected_jobs(r, DjangoJob.objects.filter(id=job.id))
+        admin.profile_selected_jobs(r, DjangoJob.objects.filter(id=job.id))
 
-        assert DjangoJobExecution.objects.count() == 0
+        job.refresh_from_db()
+        assert job.profile_runs == 3
         r._messages.add.assert_called_with(
-            40,
-            format_html(
-                "Maximum runtime of {} seconds exceeded! Not all jobs could be completed successfully. "
-                "Pending jobs: {}",
-                admin._job_execution_timeout,
-                ",".join({job.id}),
-            ),
-            "",
+            20, "The next 3 runs of 1 job(s) will be profiled.", ""
         )
 
-        scheduler.shutdown()
-
 
 class TestDjangoJobExecutionAdmin:
     @pytest.mark.django_db
@@ -223,3 +300,252 @@ class TestDjangoJobExecutionAdmin:
         admin.get_queryset(rf.get("/admin/django_apscheduler/djangojob"))
 
         assert admin.duration_text(execution) == "N/A"
+
+    @pytest.mark.django_db
+    def test_cpu_time_text_adds_user_and_system_time(self, rf, request):
+        now = timezone.now()
+
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        execution = DjangoJobExecution.objects.create(
+            job=job,
+            status=DjangoJobExecution.SUCCESS,
+            run_time=now,
+            cpu_user_time=1.5,
+            cpu_system_time=0.25,
+        )
+        execution.refresh_from_db()
+
+        admin = DjangoJobExecutionAdmin(DjangoJob, None)
+
+        assert admin.cpu_time_text(execution) == Decimal("1.75")
+
+    @pytest.mark.django_db
+    def test_cpu_time_text_no_usage_recorded_returns_na(self, rf, request):
+        now = timezone.now()
+
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        execution = DjangoJobExecution.objects.create(
+            job=job,
+            status=DjangoJobExecution.SUCCESS,
+            run_time=now,
+        )
+
+        admin = DjangoJobExecutionAdmin(DjangoJob, None)
+
+        assert admin.cpu_time_text(execution) == "N/A"
+
+    @pytest.mark.django_db
+    def test_get_search_results_matches_exact_job_id(self, rf):
+        now = timezone.now()
+        for job_id in ["test_job", "test_job_2"]:
+            job = DjangoJob.objects.create(id=job_id)
+            DjangoJobExecution.objects.create(
+                job=job, status=DjangoJobExecution.SUCCESS, run_time=now
+            )
+
+        admin = DjangoJobExecutionAdmin(DjangoJobExecution, None)
+        qs, may_have_duplicates = admin.get_search_results(
+            rf.get("/admin/django_apscheduler/djangojobexecution"),
+            DjangoJobExecution.objects.all(),
+            " test_job ",
+        )
+
+        assert list(qs.values_list("job_id", flat=True)) == ["test_job"]
+        assert not may_have_duplicates
+
+    @pytest.mark.django_db
+    def test_time_series_view_renders_buckets_per_job(self, rf, admin_user):
+        cache.clear()
+        job = DjangoJob.objects.create(id="test_job")
+        DjangoJobExecution.objects.create(
+            job=job, status=DjangoJobExecution.ERROR, run_time=timezone.now()
+        )
+
+        admin = DjangoJobExecutionAdmin(DjangoJobExecution, site)
+        r = rf.get("/admin/django_apscheduler/djangojobexecution/time_series/")
+        r.user = admin_user
+
+        response = admin.time_series_view(r)
+        response.render()
+
+        assert response.status_code == 200
+        assert response.context_data["resolution"] == "hour"
+        [job_data] = response.context_data["jobs"]
+        assert job_data["id"] == "test_job"
+        assert job_data["buckets"][0]["total"] == 1
+        assert job_data["buckets"][0]["error_rate"] == "100.0%"
+        assert b"test_job" in response.content
+
+    @pytest.mark.django_db
+    def test_time_series_view_caches_time_series(self, rf, admin_user):
+        cache.clear()
+        admin = DjangoJobExecutionAdmin(DjangoJobExecution, site)
+        r = rf.get(
+            "/admin/django_apscheduler/djangojobexecution/time_series/",
+            {"resolution": "minute"},
+        )
+        r.user = admin_user
+
+        with mock.patch.object(
+            DjangoJobExecution.objects, "get_time_series", return_value={}
+        ) as time_series_mock:
+            admin.time_series_view(r)
+            admin.time_series_view(r)
+
+        assert time_series_mock.call_count == 1
+        assert time_series_mock.call_args[0][2] == "minute"
+
+    @pytest.fixture
+    def executions(self):
+        jobs = [DjangoJob.objects.create(id=f"test_job_{i}") for i in range(2)]
+        now = timezone.now()
+        # Two job executions for each run time, to check that ties are broken on `id`
+        return [
+            DjangoJobExecution.objects.create(
+                job=jobs[i % 2],
+                status=DjangoJobExecution.SUCCESS,
+                run_time=now - timedelta(seconds=i // 2),
+            )
+            for i in range(5)
+        ]
+
+    @pytest.fixture
+    def changelist(self, rf, admin_user):
+        admin = DjangoJobExecutionAdmin(DjangoJobExecution, site)
+        admin.list_per_page = 2
+
+        def get(query="?"):
+            r = rf.get(f"/admin/django_apscheduler/djangojobexecution/{query}")
+            r.user = admin_user
+
+            return admin.changelist_view(r)
+
+        return get
+
+    @pytest.mark.django_db
+    def test_changelist_seeks_to_next_page(self, changelist, executions):
+        expected = sorted(executions, key=lambda e: (e.run_time, e.pk), reverse=True)
+
+        pages = []
+        query = "?"
+        while query is not None:
+            response = changelist(query)
+            response.render()
+            cl = response.context_data["cl"]
+            assert cl.seek
+            assert (b"Older" in response.content) == (cl.next_page_url is not None)
+            pages.append(list(cl.result_list))
+            query = cl.next_page_url
+
+        assert pages == [expected[:2], expected[2:4], expected[4:]]
+        assert cl.first_page_url == "?"
+
+    @pytest.mark.django_db
+    def test_changelist_seek_does_not_use_offset(self, changelist, executions):
+        next_page_url = changelist().context_data["cl"].next_page_url
+
+        with CaptureQueriesContext(connection) as queries:
+            changelist(next_page_url)
+
+        assert not any("OFFSET" in query["sql"] for query in queries)
+
+    @pytest.mark.django_db
+    def test_changelist_sorted_on_other_column_uses_numbered_pages(
+        self, changelist, executions
+    ):
+        cl = changelist("?o=2&p=2").context_data["cl"]
+
+        assert not cl.seek
+        assert cl.page_num == 2
+        assert len(cl.result_list) == 2
+
+    @pytest.mark.django_db
+    def test_changelist_invalid_cursor_redirects(self, changelist, executions):
+        response = changelist("?cursor=invalid")
+
+        assert response.status_code == 302
+        assert response.url.endswith("?e=1")
+
+
+class TestEstimatedCountPaginator:
+    @pytest.mark.django_db
+    def test_count_is_capped(self, settings):
+        settings.APSCHEDULER_ADMIN_COUNT_LIMIT = 3
+        job = DjangoJob.objects.create(id="test_job")
+        now = timezone.now()
+        for i in range(5):
+            DjangoJobExecution.objects.create(
+                job=job,
+                status=DjangoJobExecution.SUCCESS,
+                run_time=now - timedelta(seconds=i),
+            )
+
+        paginator = EstimatedCountPaginator(DjangoJobExecution.objects.all(), 2)
+
+        assert paginator.count == 3
+
+    @pytest.mark.django_db
+    def test_count_uses_estimate_for_large_unfiltered_tables(self, settings):
+        settings.APSCHEDULER_ADMIN_COUNT_LIMIT = 3
+
+        paginator = EstimatedCountPaginator(DjangoJobExecution.objects.all(), 2)
+
+        with mock.patch.object(
+            paginator, "_get_estimated_count", return_value=1_000_000
+        ):
+            assert paginator.count == 1_000_000
+
+    @pytest.mark.django_db
+    def test_count_filtered_queryset_does_not_use_estimate(self, settings):
+        paginator = EstimatedCountPaginator(
+            DjangoJobExecution.objects.filter(job_id="test_job"), 2
+        )
+
+        with mock.patch.object(
+            paginator, "_get_estimated_count", return_value=1_000_000
+        ) as estimate_mock:
+            assert paginator.count == 0
+
+        assert estimate_mock.call_count == 0
+
+    @pytest.mark.django_db
+    def test_get_estimated_count_unsupported_backend_returns_none(self):
+        paginator = EstimatedCountPaginator(DjangoJobExecution.objects.all(), 2)
+
+        assert paginator._get_estimated_count() is None
+
+
+class TestDjangoJobExecutionProfileAdmin:
+    @pytest.mark.django_db
+    def test_top_functions_renders_table(self, request):
+        now = timezone.now()
+
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        execution = DjangoJobExecution.objects.create(
+            job=job,
+            status=DjangoJobExecution.SUCCESS,
+            run_time=now,
+        )
+
+        with mock.patch(
+            "django_apscheduler.util.get_current_job_run",
+            return_value=(job.id, now),
+        ):
+            util.profile_job_run(sorted)([3, 2, 1])
+
+        profile = DjangoJobExecutionProfile.objects.create(
+            execution=execution,
+            stats=util.pop_job_run_data(job.id, now)["profile"],
+        )
+
+        admin = DjangoJobExecutionProfileAdmin(DjangoJobExecutionProfile, None)
+        html = admin.top_functions(profile)
+
+        assert html.startswith("<table>")
+        assert "sorted" in html
@@ -3,12 +3,28 @@ from datetime import datetime
 import pytest
 
 from apscheduler.jobstores.base import JobLookupError, ConflictingIdError
+from django.db import transaction
 
-from tests.conftest import dummy_job
+from django_apscheduler.jobstores import DjangoJobStore, DjangoWriteBehindJobStore
+from django_apscheduler.models import DjangoJob
+from tests.conftest import DummyScheduler, dummy_job
 
 pytestmark = pytest.mark.django_db  # Give all tests access to DB
 
 
+@pytest.fixture(
+    params=[DjangoJobStore, lambda: DjangoWriteBehindJobStore(flush_interval=None)],
+    ids=["DjangoJobStore", "DjangoWriteBehindJobStore"],
+)
+def jobstore(request, synchronous_purge):
+    # Run the tests against all of the job stores that persist jobs in the database
+    store = request.param()
+    store.start(DummyScheduler(), "djangojobstore")
+    yield store
+    transaction.on_commit(DjangoJob.objects.all().delete)
+    store.shutdown()
+
+
 # NOTE: These tests are copy / paste equivalents of APScheduler's own jobstore tests.
 # See: https://github.com/agronholm/apscheduler/blob/master/tests/test_jobstores.py
 
@@ -184,6 +200,9 @@ def test_update_job_nonexistent_job(jobstore, create_add_job):
 
 
 def test_one_job_fails_to_load(jobstore, create_add_job, monkeypatch, timezone):
+    if isinstance(jobstore, DjangoWriteBehindJobStore):
+        pytest.skip("Jobs are only restored once, when the job store is started")
+
     job1 = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
     job2 = create_add_job(jobstore, dummy_job2, datetime(2014, 2, 26))
     create_add_job(jobstore, dummy_job3, datetime(2013, 8, 14))
@@ -226,5 +245,5 @@ def test_remove_all_jobs(jobstore, create_add_job):
 def test_repr_jobstore(jobstore):
     assert (
         repr(jobstore)
-        == f"<DjangoJobStore(pickle_protocol={jobstore.pickle_protocol})>"
+        == f"<{type(jobstore).__name__}(pickle_protocol={jobstore.pickle_protocol})>"
     )
@@ -0,0 +1,187 @@
+import gzip
+import json
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.db import DatabaseError
+from django.utils import timezone
+
+from django_apscheduler import archive
+from django_apscheduler.archive import JobExecutionArchiver, load_archive
+from django_apscheduler.models import DjangoJob, DjangoJobExecution
+
+
+@pytest.fixture
+def executions(request):
+    now = timezone.now()
+    job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+    request.addfinalizer(job.delete)
+
+    return [
+        DjangoJobExecution.objects.create(
+            job=job,
+            status=DjangoJobExecution.SUCCESS,
+            run_time=now - timedelta(minutes=i),
+            duration=i,
+        )
+        for i in range(5)
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("compression", ["gzip", "lzma"])
+def test_archive_writes_rotating_files_and_deletes_rows(
+    tmp_path, executions, compression
+):
+    with JobExecutionArchiver(
+        tmp_path, compression=compression, rows_per_file=2, batch_size=1
+    ) as archiver:
+        assert archiver.archive(DjangoJobExecution.objects.all()) == 5
+
+    assert archiver.rows_archived == 5
+    assert [manifest["rows"] for manifest in archiver.manifests] == [2, 2, 1]
+    assert len(list(tmp_path.glob("*.manifest.json"))) == 3
+    assert not DjangoJobExecution.objects.exists()
+
+
+@pytest.mark.django_db
+def test_archive_deletes_each_batch_once_it_is_recorded_in_manifest(
+    tmp_path, executions
+):
+    calls = []
+
+    def compress(data):
+        if len(calls) == 2:
+            raise OSError("Disk full")
+
+        calls.append(data)
+        return gzip.compress(data)
+
+    with mock.patch.dict(
+        archive.COMPRESSION_FORMATS, {"gzip": (".jsonl.gz", compress, gzip.open)}
+    ):
+        with pytest.raises(OSError, match="Disk full"):
+            with JobExecutionArchiver(tmp_path, batch_size=2) as archiver:
+                archiver.archive(DjangoJobExecution.objects.all())
+
+    manifest_path = next(tmp_path.glob("*.manifest.json"))
+    assert json.loads(manifest_path.read_text())["rows"] == 4
+    assert DjangoJobExecution.objects.count() == 1
+
+    assert load_archive(manifest_path) == (4, 0)
+    assert DjangoJobExecution.objects.count() == 5
+
+
+@pytest.mark.django_db
+def test_archive_keep_does_not_delete_rows(tmp_path, executions):
+    with JobExecutionArchiver(tmp_path, delete=False) as archiver:
+        archiver.archive(DjangoJobExecution.objects.all())
+
+    assert DjangoJobExecution.objects.count() == 5
+
+
+@pytest.mark.django_db
+def test_archive_unsupported_compression_raises_exception(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported compression format"):
+        JobExecutionArchiver(tmp_path, compression="zip")
+
+
+@pytest.mark.django_db
+def test_load_archive_restores_job_executions(tmp_path, executions):
+    with JobExecutionArchiver(tmp_path) as archiver:
+        archiver.archive(DjangoJobExecution.objects.filter(duration__gte=2))
+
+    assert DjangoJobExecution.objects.count() == 2
+
+    manifest = next(tmp_path.glob("*.manifest.json"))
+    assert load_archive(manifest) == (3, 0)
+    assert DjangoJobExecution.objects.count() == 5
+
+    # Loading the same archive twice skips existing job executions
+    assert load_archive(manifest) == (0, 3)
+
+
+@pytest.mark.django_db
+def test_load_archive_checksum_mismatch_raises_exception(tmp_path, executions):
+    with JobExecutionArchiver(tmp_path) as archiver:
+        archiver.archive(DjangoJobExecution.objects.all())
+
+    manifest_path = next(tmp_path.glob("*.manifest.json"))
+    manifest = json.loads(manifest_path.read_text())
+    manifest["sha256"] = "invalid"
+    manifest_path.write_text(json.dumps(manifest))
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        load_archive(manifest_path)
+
+
+@pytest.mark.django_db
+def test_load_archive_ignores_batch_that_is_not_recorded_in_manifest(
+    tmp_path, executions
+):
+    with JobExecutionArchiver(tmp_path) as archiver:
+        archiver.archive(DjangoJobExecution.objects.filter(duration__gte=2))
+
+    # Simulate a batch that was being appended when the archiver was interrupted
+    with open(tmp_path / archiver.manifests[0]["file"], "ab") as f:
+        f.write(gzip.compress(b'{"id": 1}\n'))
+
+    manifest = next(tmp_path.glob("*.manifest.json"))
+    assert load_archive(manifest) == (3, 0)
+
+
+@pytest.mark.django_db
+def test_archive_never_writes_to_files_of_other_archiver(tmp_path, executions):
+    now = timezone.now()
+
+    with mock.patch.object(
+        archive.timezone, "now", return_value=now
+    ), mock.patch.object(archive.uuid, "uuid4", return_value=mock.Mock(hex="00000000")):
+        with JobExecutionArchiver(tmp_path) as archiver:
+            archiver.archive(DjangoJobExecution.objects.filter(duration__gte=2))
+
+        with pytest.raises(FileExistsError):
+            with JobExecutionArchiver(tmp_path) as other_archiver:
+                other_archiver.archive(DjangoJobExecution.objects.all())
+
+    assert DjangoJobExecution.objects.count() == 2
+    manifest_path = next(tmp_path.glob("*.manifest.json"))
+    assert load_archive(manifest_path) == (3, 0)
+
+
+@pytest.mark.django_db
+def test_archive_started_in_same_second_writes_separate_files(tmp_path, executions):
+    with mock.patch.object(archive.timezone, "now", return_value=timezone.now()):
+        with JobExecutionArchiver(tmp_path) as archiver:
+            archiver.archive(DjangoJobExecution.objects.filter(duration__gte=2))
+
+        with JobExecutionArchiver(tmp_path) as other_archiver:
+            other_archiver.archive(DjangoJobExecution.objects.all())
+
+    manifests = sorted(tmp_path.glob("*.manifest.json"))
+    assert len(manifests) == 2
+    assert sum(load_archive(manifest)[0] for manifest in manifests) == 5
+
+
+@pytest.mark.django_db
+def test_archive_deletes_pending_batch_of_interrupted_archiver(tmp_path, executions):
+    with mock.patch.object(
+        DjangoJobExecution.objects,
+        "delete_batch",
+        side_effect=DatabaseError("Connection lost"),
+    ):
+        with pytest.raises(DatabaseError):
+            with JobExecutionArchiver(tmp_path) as archiver:
+                archiver.archive(DjangoJobExecution.objects.all())
+
+    manifest_path = next(tmp_path.glob("*.manifest.json"))
+    assert len(json.loads(manifest_path.read_text())["pending_ids"]) == 5
+    assert DjangoJobExecution.objects.count() == 5
+
+    with JobExecutionArchiver(tmp_path) as archiver:
+        assert archiver.archive(DjangoJobExecution.objects.all()) == 0
+
+    assert not DjangoJobExecution.objects.exists()
+    assert list(tmp_path.glob("*.manifest.json")) == [manifest_path]
+    assert json.loads(manifest_path.read_text())["pending_ids"] == []
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from django_apscheduler import benchmarks
+from django_apscheduler.benchmarks import load
+from django_apscheduler.models import DjangoJob, DjangoJobExecution
+
+SMALL_OPTIONS = {
+    "repeat": 2,
+    "num_jobs": 5,
+    "job_counts": [10],
+    "num_due": 2,
+    "thread_counts": [1, 2],
+    "events_per_thread": 4,
+    "num_executions": 10,
+    "memory_job_counts": [10],
+    "num_operations": 3,
+}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_run_benchmarks_runs_all_scenarios():
+    results = benchmarks.run_benchmarks(**SMALL_OPTIONS)
+
+    # Results should be JSON serializable
+    results = json.loads(json.dumps(results))
+
+    assert results["environment"]["database"] == "sqlite"
+    assert {result["scenario"] for result in results["results"]} == set(
+        benchmarks.SCENARIOS
+    )
+    # Benchmark data should be cleaned up afterwards
+    assert not DjangoJob._base_manager.exists()
+    assert not DjangoJobExecution.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_run_benchmarks_reports_metrics():
+    results = benchmarks.run_benchmarks(
+        ["get_due_jobs", "atomic_update_or_create", "retention"], **SMALL_OPTIONS
+    )["results"]
+
+    due_jobs, next_run_time, *atomic_update_or_create, retention = results
+    assert due_jobs["params"] == {
+        "operation": "get_due_jobs",
+        "num_jobs": 10,
+        "num_due": 2,
+    }
+    assert set(due_jobs["metrics"]["latency"]) == {"min", "median", "p95", "max"}
+    assert [result["params"]["threads"] for result in atomic_update_or_create] == [
+        1,
+        2,
+    ]
+    assert all(result["metrics"]["errors"] == 0 for result in atomic_update_or_create)
+    assert retention["metrics"]["deleted"] == 10
+
+
+def test_run_benchmarks_unknown_scenario_raises_exception():
+    with pytest.raises(ValueError, match="Unknown scenario"):
+        benchmarks.run_benchmarks(["does_not_exist"])
+
+
+@pytest.mark.django_db(transaction=True)
+def test_run_load_test_reports_lag():
+    result = load.run_load_test(
+        num_jobs=3,
+        window=1.5,
+        trigger_mix={"interval": 1, "date": 1},
+        min_interval=0.5,
+        max_interval=0.5,
+        max_duration=0,
+        seed=1,
+    )
+
+    # Results should be JSON serializable
+    result = json.loads(json.dumps(result))
+
+    assert sum(result["params"]["trigger_mix"].values()) == 3
+    metrics = result["metrics"]
+    assert metrics["fired"] > 0
+    assert set(metrics["lag"]) == {"min", "median", "p90", "p95", "p99", "max"}
+    assert metrics["lag"]["min"] >= 0
+    assert metrics["db_queries"] > 0
+    # Load test data should be cleaned up afterwards
+    assert not DjangoJob._base_manager.exists()
+    assert not DjangoJobExecution.objects.exists()
+
+
+def test_run_load_test_unknown_trigger_type_raises_exception():
+    with pytest.raises(ValueError, match="Unknown trigger type"):
+        load.run_load_test(trigger_mix={"does_not_exist": 1})
+
+
+def test_memory_jobstore_benchmark_compares_stores():
+    results = benchmarks.run_benchmarks(["memory_jobstore"], **SMALL_OPTIONS)["results"]
+
+    assert {result["params"]["store"] for result in results} == {
+        "DjangoMemoryJobStore",
+        "DjangoIndexedMemoryJobStore",
+    }
+    assert {result["params"]["operation"] for result in results} == {
+        "add_job",
+        "update_job",
+        "remove_job",
+        "get_due_jobs",
+    }
@@ -0,0 +1,273 @@
+import json
+import pickle
+import signal
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import pytest
+from apscheduler import events
+from apscheduler.events import SchedulerEvent
+from apscheduler.executors.pool import ProcessPoolExecutor
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import STATE_RUNNING
+from django import db
+from django.core.management import call_command
+from django.utils import timezone
+
+from django_apscheduler import util
+from django_apscheduler.executors import DjangoProcessPoolExecutor
+from django_apscheduler.management.commands import runapscheduler
+from django_apscheduler.models import DjangoJob, DjangoJobExecution, DjangoQueuedJobRun
+from django_apscheduler.registry import JobRegistry
+from django_apscheduler.workers import QueueWorker
+
+
+@pytest.mark.django_db
+def test_applyretentionpolicies_deletes_job_executions(request, settings):
+    settings.APSCHEDULER_RETENTION_POLICY = {"max_age": 3600}
+
+    now = timezone.now()
+    job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+    request.addfinalizer(job.delete)
+
+    for run_time in [now, now - timedelta(hours=2)]:
+        DjangoJobExecution.objects.create(
+            job=job, status=DjangoJobExecution.SUCCESS, run_time=run_time
+        )
+
+    out = StringIO()
+    call_command("applyretentionpolicies", "--batch-size=10", stdout=out)
+
+    assert "Deleted 1 job executions." in out.getvalue()
+    assert DjangoJobExecution.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_archivejobexecutions_and_loadjobexecutions(request, tmp_path):
+    now = timezone.now()
+    job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+    request.addfinalizer(job.delete)
+
+    for run_time in [now, now - timedelta(hours=2)]:
+        DjangoJobExecution.objects.create(
+            job=job, status=DjangoJobExecution.SUCCESS, run_time=run_time
+        )
+
+    out = StringIO()
+    call_command("archivejobexecutions", str(tmp_path), "--max-age=3600", stdout=out)
+
+    assert "Archived 1 job executions to 1 file(s)." in out.getvalue()
+    assert DjangoJobExecution.objects.count() == 1
+
+    out = StringIO()
+    manifest = next(tmp_path.glob("*.manifest.json"))
+    call_command("loadjobexecutions", str(manifest), stdout=out)
+
+    assert "loaded 1 job executions, skipped 0." in out.getvalue()
+    assert DjangoJobExecution.objects.count() == 2
+
+
+def start_and_shut_down(scheduler):
+    # Stands in for `BackgroundScheduler.start`, for a scheduler that is shut down as soon as it has started
+    scheduler._dispatch_event(SchedulerEvent(events.EVENT_SCHEDULER_STARTED))
+    scheduler._dispatch_event(SchedulerEvent(events.EVENT_SCHEDULER_SHUTDOWN))
+
+
+class TestRunAPScheduler:
+    def test_create_scheduler_configures_executors_from_settings(self, settings):
+        settings.APSCHEDULER_EXECUTORS = {
+            "default": {"type": "threadpool", "max_workers": 3},
+            "processpool": {"type": "processpool", "max_workers": 2},
+        }
+        settings.APSCHEDULER_JOB_DEFAULTS = {"coalesce": True}
+
+        scheduler, jobstore = runapscheduler.Command().create_scheduler(
+            max_workers=5, record_resource_usage=True
+        )
+
+        assert scheduler._executors["default"]._pool._max_workers == 5
+        assert isinstance(scheduler._executors["processpool"], ProcessPoolExecutor)
+        assert scheduler._job_defaults["coalesce"] is True
+        assert scheduler._jobstores["default"] is jobstore
+        assert jobstore.job_wrappers == [util.record_resource_usage]
+        # The settings should not be modified
+        assert settings.APSCHEDULER_EXECUTORS["default"]["max_workers"] == 3
+
+    def test_create_scheduler_process_pool(self):
+        scheduler, _ = runapscheduler.Command().create_scheduler(process_pool=True)
+
+        assert isinstance(scheduler._executors["default"], DjangoProcessPoolExecutor)
+
+    def test_preload_job_modules_registers_jobs(self, settings):
+        settings.APSCHEDULER_JOB_MODULES = ["myapp.jobs"]
+        scheduler = mock.Mock()
+
+        with mock.patch.object(
+            runapscheduler.importlib, "import_module"
+        ) as import_mock:
+            modules = runapscheduler.Command().preload_job_modules(scheduler)
+
+        import_mock.assert_called_once_with("myapp.jobs")
+        assert modules == [import_mock.return_value]
+        import_mock.return_value.register_jobs.assert_called_once_with(scheduler)
+
+    def test_signal_handler_requests_shutdown(self):
+        shutdown_requested = threading.Event()
+        command = runapscheduler.Command(stdout=StringIO())
+
+        with mock.patch.object(runapscheduler.signal, "signal") as signal_mock:
+            command.install_signal_handlers(shutdown_requested)
+
+            handler = signal_mock.call_args[0][1]
+            signal_mock.reset_mock()
+
+            handler(signal.SIGTERM, None)
+
+        assert shutdown_requested.is_set()
+        assert signal_mock.call_args_list == [
+            mock.call(signum, signal.SIG_DFL) for signum in command.shutdown_signals
+        ]
+
+    @pytest.mark.django_db
+    def test_runapscheduler_drains_running_jobs_after_shutdown_is_requested(self):
+        def start(scheduler):
+            scheduler.state = STATE_RUNNING
+
+        def install_signal_handlers(self, shutdown_requested):
+            # Simulate a signal that is received once the scheduler is running
+            threading.Timer(0.1, shutdown_requested.set).start()
+
+        out = StringIO()
+        with mock.patch.object(
+            runapscheduler.Command, "install_signal_handlers", install_signal_handlers
+        ), mock.patch.object(
+            BackgroundScheduler, "start", autospec=True, side_effect=start
+        ), mock.patch.object(
+            BackgroundScheduler, "shutdown", autospec=True
+        ) as shutdown_mock:
+            call_command("runapscheduler", stdout=out)
+
+        assert shutdown_mock.call_args_list == [mock.call(mock.ANY, wait=True)]
+        assert "Waiting for running jobs to complete..." in out.getvalue()
+        assert "Scheduler shut down successfully!" in out.getvalue()
+
+    @pytest.mark.django_db
+    def test_runapscheduler_reports_startup_timing(self):
+        out = StringIO()
+        with mock.patch.object(
+            runapscheduler.Command, "install_signal_handlers"
+        ), mock.patch.object(
+            BackgroundScheduler, "start", autospec=True, side_effect=start_and_shut_down
+        ):
+            call_command("runapscheduler", stdout=out)
+
+        output = out.getvalue()
+        assert "Preloaded 0 job module(s)" in output
+        assert "Loaded 0 job(s) from the job store" in output
+        assert "Scheduler started in" in output
+        assert "Scheduler shut down successfully!" in output
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmarkapscheduler_writes_json(tmp_path):
+    output = tmp_path / "results.json"
+
+    with mock.patch.object(
+        db.connection.creation, "create_test_db"
+    ) as create_mock, mock.patch.object(
+        db.connection.creation, "destroy_test_db"
+    ) as destroy_mock:
+        call_command(
+            "benchmarkapscheduler",
+            "--scenario=retention",
+            "--num-executions=10",
+            f"--output={output}",
+            stdout=StringIO(),
+        )
+
+    assert create_mock.call_count == 1
+    assert destroy_mock.call_count == 1
+
+    results = json.loads(output.read_text())
+    assert [result["scenario"] for result in results["results"]] == ["retention"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_loadtestapscheduler_writes_json(tmp_path):
+    output = tmp_path / "results.json"
+
+    with mock.patch.object(
+        db.connection.creation, "create_test_db"
+    ) as create_mock, mock.patch.object(
+        db.connection.creation, "destroy_test_db"
+    ) as destroy_mock:
+        call_command(
+            "loadtestapscheduler",
+            "--num-jobs=2",
+            "--window=0.5",
+            "--trigger-mix",
+            "interval=1",
+            "cron=1",
+            f"--output={output}",
+            stdout=StringIO(),
+        )
+
+    assert create_mock.call_count == 1
+    assert destroy_mock.call_count == 1
+
+    results = json.loads(output.read_text())
+    assert results["params"]["num_jobs"] == 2
+    assert set(results["params"]["trigger_mix"]) == {"interval", "cron"}
+    assert "lag" in results["metrics"]
+
+
+@pytest.mark.django_db
+def test_runapscheduler_reconciles_registered_jobs(settings):
+    settings.APSCHEDULER_JOBS = {
+        "from_settings": {
+            "func": "tests.conftest.dummy_job",
+            "trigger": "interval",
+            "minutes": 5,
+        }
+    }
+
+    out = StringIO()
+    with mock.patch.object(
+        runapscheduler, "registry", JobRegistry()
+    ), mock.patch.object(
+        BackgroundScheduler, "start", autospec=True, side_effect=start_and_shut_down
+    ):
+        call_command("runapscheduler", stdout=out)
+
+    assert "Reconciled 1 registered job(s) in" in out.getvalue()
+    assert "1 created, 0 updated, 0 removed." in out.getvalue()
+    assert DjangoJob.objects.filter(id="from_settings").exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_runapschedulerworker_burst_processes_queued_runs(settings):
+    settings.APSCHEDULER_JOB_WRAPPERS = [
+        "django_apscheduler.util.record_resource_usage"
+    ]
+    job = DjangoJob.objects.create(id="test_job", next_run_time=None)
+    DjangoQueuedJobRun.objects.create(
+        job=job,
+        run_time=timezone.now(),
+        func_ref="tests.conftest:dummy_job",
+        args=pickle.dumps(((), {})),
+    )
+
+    out = StringIO()
+    with mock.patch.object(
+        QueueWorker, "run", autospec=True, side_effect=QueueWorker.run
+    ) as run_mock:
+        call_command("runapschedulerworker", "--burst", "--max-workers=2", stdout=out)
+
+    worker = run_mock.call_args[0][0]
+    assert worker.max_workers == 2
+    assert worker.job_wrappers == [util.record_resource_usage]
+    assert "after processing 1 queued run(s)!" in out.getvalue()
+    assert not DjangoQueuedJobRun.objects.exists()
+    assert DjangoJobExecution.objects.get().status == DjangoJobExecution.SUCCESS
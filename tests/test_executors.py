@@ -0,0 +1,443 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from unittest import mock
+
+import pytest
+from apscheduler import events
+from apscheduler.executors.base import MaxInstancesReachedError
+from apscheduler.executors.debug import DebugExecutor
+from apscheduler.executors.pool import ProcessPoolExecutor
+from django import db
+from django.utils import timezone
+
+from django_apscheduler import executors, util
+from django_apscheduler.executors import (
+    DjangoAtMostOnceMixin,
+    DjangoMaxInstancesMixin,
+    DjangoProcessPoolExecutor,
+    DjangoQueueExecutor,
+    DjangoThreadPoolExecutor,
+)
+from django_apscheduler.models import (
+    DjangoJobExecution,
+    DjangoJobLease,
+    DjangoQueuedJobRun,
+)
+from tests.conftest import DummyScheduler
+
+
+class DebugMaxInstancesExecutor(DjangoMaxInstancesMixin, DebugExecutor):
+    """Runs jobs synchronously, in the test thread that has access to the test database"""
+
+
+class DebugAtMostOnceExecutor(DjangoAtMostOnceMixin, DebugExecutor):
+    """Runs jobs synchronously, in the test thread that has access to the test database"""
+
+
+def record_job_run():
+    util.update_job_run_data(util.get_current_job_run(), pid=os.getpid())
+
+
+def double(func):
+    def wrapped():
+        func()
+        func()
+
+    return wrapped
+
+
+@pytest.fixture
+def executor():
+    executor = DebugMaxInstancesExecutor(lease_timeout=60)
+    executor.start(DummyScheduler(), "default")
+
+    return executor
+
+
+@pytest.fixture
+def job(create_job):
+    func = mock.Mock(__name__="func")
+    job = create_job(
+        func=func,
+        trigger="date",
+        trigger_args={"run_date": datetime(2016, 5, 3)},
+        id="test_job",
+    )
+    job._jobstore_alias = "default"
+    job.misfire_grace_time = None
+
+    return job
+
+
+class TestDjangoMaxInstancesMixin:
+    @pytest.mark.django_db
+    def test_submit_job_releases_lease_after_run(self, executor, job):
+        now = timezone.now()
+        with mock.patch.object(
+            DjangoJobLease, "acquire", wraps=DjangoJobLease.acquire
+        ) as acquire_mock:
+            executor.submit_job(job, [now])
+
+        assert job.func.call_count == 1
+        assert acquire_mock.call_count == 1
+        assert not DjangoJobLease.is_held(job.id, now)
+        assert executor._leases == {}
+
+    @pytest.mark.django_db
+    def test_submit_job_slots_taken_by_other_scheduler_raises_exception(
+        self, executor, job
+    ):
+        now = timezone.now()
+        DjangoJobLease.acquire(job.id, 1, now - timedelta(minutes=1), 60)
+
+        with pytest.raises(MaxInstancesReachedError):
+            executor.submit_job(job, [now])
+
+        assert job.func.call_count == 0
+
+    @pytest.mark.django_db
+    def test_submit_job_run_held_by_other_scheduler_skips_run(self, executor, job):
+        now = timezone.now()
+        DjangoJobLease.acquire(job.id, 1, now, 60)
+
+        executor.submit_job(job, [now])
+
+        assert job.func.call_count == 0
+        assert DjangoJobLease.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_submit_job_error_releases_lease(self, executor, job):
+        now = timezone.now()
+        with mock.patch.object(
+            DebugExecutor, "_do_submit_job", side_effect=RuntimeError
+        ):
+            with pytest.raises(RuntimeError):
+                executor.submit_job(job, [now])
+
+        assert not DjangoJobLease.is_held(job.id, now)
+        assert executor._leases == {}
+
+    @pytest.mark.django_db
+    def test_instances_finishing_out_of_order_release_their_own_leases(
+        self, executor, job
+    ):
+        job.max_instances = 2
+        now = timezone.now()
+        run_times = [now - timedelta(minutes=1), now]
+        with mock.patch.object(DebugExecutor, "_do_submit_job"):
+            for run_time in run_times:
+                executor.submit_job(job, [run_time])
+
+        executor._run_job_success(
+            job.id,
+            [
+                events.JobExecutionEvent(
+                    events.EVENT_JOB_EXECUTED, job.id, "default", run_times[1]
+                )
+            ],
+        )
+
+        assert DjangoJobLease.is_held(job.id, run_times[0])
+        assert not DjangoJobLease.is_held(job.id, run_times[1])
+        assert list(executor._leases) == [(job.id, run_times[0])]
+
+        executor._run_job_success(
+            job.id,
+            [
+                events.JobExecutionEvent(
+                    events.EVENT_JOB_EXECUTED, job.id, "default", run_times[0]
+                )
+            ],
+        )
+
+        assert not DjangoJobLease.is_held(job.id, run_times[0])
+        assert executor._leases == {}
+
+    @pytest.mark.django_db
+    def test_run_job_error_releases_lease_once_no_instances_remain(self, executor, job):
+        job.max_instances = 2
+        now = timezone.now()
+        run_times = [now - timedelta(minutes=1), now]
+        with mock.patch.object(DebugExecutor, "_do_submit_job"):
+            for run_time in run_times:
+                executor.submit_job(job, [run_time])
+
+        # The run that failed is not known
+        executor._run_job_error(job.id, RuntimeError("Pool broken"))
+
+        assert DjangoJobLease.is_held(job.id, run_times[0])
+        assert DjangoJobLease.is_held(job.id, run_times[1])
+
+        executor._run_job_success(
+            job.id,
+            [
+                events.JobExecutionEvent(
+                    events.EVENT_JOB_EXECUTED, job.id, "default", run_times[1]
+                )
+            ],
+        )
+
+        assert not DjangoJobLease.is_held(job.id, run_times[0])
+        assert executor._leases == {}
+
+    @pytest.mark.django_db
+    def test_renew_leases_renews_leases_of_running_jobs(self, executor, job):
+        now = timezone.now()
+        lease = DjangoJobLease.acquire(job.id, 1, now, 60)
+        executor._leases[(job.id, now)] = lease
+
+        with mock.patch.object(
+            DjangoJobLease, "renew", wraps=DjangoJobLease.renew
+        ) as renew_mock:
+            assert executor.renew_leases() == 1
+
+        renew_mock.assert_called_once_with([lease], 60)
+
+    def test_renew_leases_nothing_running_does_nothing(self, executor):
+        with mock.patch.object(DjangoJobLease, "renew") as renew_mock:
+            assert executor.renew_leases() == 0
+
+        renew_mock.assert_not_called()
+
+    def test_start_starts_lease_renewal_thread(self):
+        executor = DebugMaxInstancesExecutor(lease_timeout=60)
+
+        with mock.patch.object(executor, "_renew_leases_periodically"):
+            executor.start(DummyScheduler(), "default")
+            assert executor._renewal_thread is not None
+            executor.shutdown()
+
+        assert executor._renewal_thread is None
+
+    def test_thread_pool_executor_accepts_lease_timeout(self):
+        executor = DjangoThreadPoolExecutor(max_workers=2, lease_timeout=10)
+
+        assert executor.lease_timeout == 10
+        assert executor._pool._max_workers == 2
+
+
+class TestDjangoAtMostOnceMixin:
+    @pytest.fixture
+    def executor(self, scheduler):
+        executor = DebugAtMostOnceExecutor()
+        executor.start(scheduler, "default")
+
+        return executor
+
+    @pytest.fixture
+    def stored_job(self, jobstore, create_add_job):
+        job = create_add_job(jobstore, mock.Mock(__name__="func"), id="test_job")
+        job._jobstore_alias = "default"
+        job.misfire_grace_time = None
+
+        return job
+
+    @pytest.mark.django_db(transaction=True)
+    def test_submit_job_claims_run_times(
+        self, executor, stored_job, django_assert_num_queries
+    ):
+        now = timezone.now()
+
+        with mock.patch.object(
+            DebugExecutor, "_do_submit_job"
+        ) as submit_mock, django_assert_num_queries(1):
+            executor.submit_job(stored_job, [now])
+
+        submit_mock.assert_called_once_with(stored_job, [now])
+        assert DjangoJobExecution.objects.get().status == DjangoJobExecution.SENT
+
+    @pytest.mark.django_db
+    def test_submit_job_skips_run_times_claimed_by_other_scheduler(
+        self, executor, stored_job
+    ):
+        now = timezone.now()
+        earlier = now - timedelta(minutes=1)
+        assert DjangoJobExecution.claim(stored_job.id, earlier)
+
+        with mock.patch.object(DebugExecutor, "_do_submit_job") as submit_mock:
+            executor.submit_job(stored_job, [earlier, now])
+            with pytest.raises(executors.RunAlreadyClaimedError):
+                executor.submit_job(stored_job, [earlier, now])
+
+        submit_mock.assert_called_once_with(stored_job, [now])
+
+    @pytest.mark.django_db
+    def test_run_claimed_by_other_scheduler_is_not_submitted(
+        self, scheduler, executor, jobstore, create_job, caplog
+    ):
+        jobstore.start(scheduler, "default")
+        scheduler.add_executor(executor, "at_most_once")
+        run_time = timezone.now() - timedelta(seconds=30)
+        job = create_job(
+            func=mock.Mock(__name__="func"),
+            trigger="interval",
+            trigger_args={"minutes": 1, "start_date": run_time},
+            id="test_job",
+            executor="at_most_once",
+            misfire_grace_time=None,
+            next_run_time=run_time,
+        )
+        jobstore.add_job(job)
+        assert DjangoJobExecution.claim(job.id, job.next_run_time)
+        dispatched = []
+        scheduler.add_listener(dispatched.append, events.EVENT_ALL)
+
+        scheduler._process_jobs()
+
+        assert not [event.code for event in dispatched if event.job_id == job.id]
+        assert DjangoJobExecution.objects.count() == 1
+        assert "Error submitting job" not in caplog.text
+
+    @pytest.mark.django_db
+    def test_submit_job_from_other_jobstore_is_not_claimed(self, executor, job):
+        executor._scheduler.add_jobstore("memory", "memory")
+        job._jobstore_alias = "memory"
+
+        executor.submit_job(job, [timezone.now()])
+
+        assert job.func.call_count == 1
+        assert not DjangoJobExecution.objects.exists()
+
+
+class TestDjangoQueueExecutor:
+    @pytest.fixture
+    def executor(self, scheduler):
+        executor = DjangoQueueExecutor()
+        executor.start(scheduler, "default")
+
+        return executor
+
+    @pytest.mark.django_db
+    def test_submit_job_queues_runs(self, executor, jobstore, create_add_job):
+        job = create_add_job(jobstore, id="test_job")
+        job._jobstore_alias = "default"
+        now = timezone.now()
+
+        executor.submit_job(job, [now])
+        executor.submit_job(job, [now])
+
+        run = DjangoQueuedJobRun.objects.get()
+        assert (run.job_id, run.run_time) == ("test_job", now)
+        assert run.func_ref == "tests.conftest:dummy_job"
+        assert executor._instances == {}
+
+
+class TestRunDjangoJob:
+    @pytest.fixture(autouse=True)
+    def worker_job_count(self, monkeypatch):
+        monkeypatch.setattr(executors, "_worker_job_count", 0)
+
+    def test_applies_job_wrappers_and_returns_run_data(self, job):
+        job.func = record_job_run
+        now = timezone.now()
+
+        with mock.patch.object(
+            db, "close_old_connections"
+        ) as close_mock, mock.patch.object(
+            util, "update_job_run_data", wraps=util.update_job_run_data
+        ) as update_mock:
+            job_events, run_data, recycle = executors.run_django_job(
+                job, "default", [now], "test", job_wrappers=[double]
+            )
+
+        assert [event.code for event in job_events] == [events.EVENT_JOB_EXECUTED]
+        assert update_mock.call_count == 2
+        assert close_mock.call_count == 4
+        assert run_data == {now: {"pid": os.getpid()}}
+        assert recycle is False
+        assert util.pop_job_run_data(job.id, now) == {}
+
+    def test_recycles_worker_after_max_jobs(self, job):
+        job.func = util.close_old_connections(lambda: None)
+
+        results = [
+            executors.run_django_job(
+                job, "default", [timezone.now()], "test", max_jobs_per_worker=2
+            )
+            for _ in range(2)
+        ]
+
+        assert [recycle for _, _, recycle in results] == [False, True]
+
+    def test_recycles_worker_above_memory_ceiling(self, job):
+        job.func = record_job_run
+
+        with mock.patch.object(
+            util.ResourceUsage, "_get_max_rss", return_value=200 * 1024 * 1024
+        ):
+            _, _, recycle = executors.run_django_job(
+                job, "default", [timezone.now()], "test", max_memory_per_worker=100
+            )
+
+        assert recycle is True
+
+
+class TestDjangoProcessPoolExecutor:
+    def test_initializes_workers_with_django_settings(self):
+        def initializer():
+            pass
+
+        executor = DjangoProcessPoolExecutor(
+            max_workers=2, pool_kwargs={"initializer": initializer, "initargs": (1,)}
+        )
+
+        assert executor.pool_kwargs["initializer"] is util.initialize_worker_process
+        assert executor.pool_kwargs["initargs"] == (
+            os.environ["DJANGO_SETTINGS_MODULE"],
+            initializer,
+            (1,),
+        )
+        executor.shutdown()
+
+    def test_does_not_depend_on_pool_kwargs_support_of_apscheduler(self):
+        # `ProcessPoolExecutor` only accepts `max_workers` before APScheduler 3.9
+        def init(self, max_workers=10):
+            raise AssertionError("Not expected to be called")
+
+        with mock.patch.object(ProcessPoolExecutor, "__init__", init):
+            executor = DjangoProcessPoolExecutor(max_workers=2)
+
+        assert executor._pool._max_workers == 2
+        executor.shutdown()
+
+    def test_replace_pool_uses_max_workers_of_executor(self):
+        executor = DjangoProcessPoolExecutor(max_workers=2)
+        executor.start(DummyScheduler(), "default")
+        pool = executor._pool
+
+        executor._replace_pool(pool)
+
+        assert executor._pool is not pool
+        assert executor._pool._max_workers == 2
+        assert executor._pool._initializer is util.initialize_worker_process
+        executor.shutdown()
+
+    @pytest.mark.django_db
+    def test_submit_job_reports_run_data_and_recycles_workers(self, scheduler, job):
+        executor = DjangoProcessPoolExecutor(max_workers=1, max_jobs_per_worker=1)
+        executor.start(scheduler, "default")
+        scheduler._jobstores["default"].job_wrappers = [double]
+        job.func = record_job_run
+        job.func_ref = "tests.test_executors:record_job_run"
+
+        completed = threading.Event()
+        results = []
+
+        def run_job_success(job_id, job_events):
+            results.append(
+                util.pop_job_run_data(job_id, job_events[0].scheduled_run_time)
+            )
+            completed.set()
+
+        pool = executor._pool
+        with mock.patch.object(
+            executor, "_run_job_success", side_effect=run_job_success
+        ):
+            executor.submit_job(job, [timezone.now()])
+            assert completed.wait(30)
+
+        executor.shutdown()
+
+        assert results[0]["pid"] != os.getpid()
+        assert executor._pool is not pool
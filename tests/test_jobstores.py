@@ -1,15 +1,27 @@
+import random
+import threading
 import warnings
-from datetime import datetime
+from threading import RLock
+from datetime import datetime, timedelta
 from unittest import mock
 
 import pytest
 from apscheduler import events
 from apscheduler.events import JobExecutionEvent, JobSubmissionEvent
+from apscheduler.executors.base import MaxInstancesReachedError
+from apscheduler.jobstores.base import ConflictingIdError, JobLookupError
+from apscheduler.jobstores.memory import MemoryJobStore
 from django import db
 from django.utils import timezone
 
+from django_apscheduler import signals, util
 from django_apscheduler.jobstores import (
+    RETENTION_JOB_ID,
     DjangoJobStore,
+    DjangoIndexedMemoryJobStore,
+    DjangoMemoryJobStore,
+    DjangoResultStoreMixin,
+    DjangoWriteBehindJobStore,
     register_job,
     register_events,
 )
@@ -62,6 +74,280 @@ class TestDjangoResultStoreMixin:
 
         assert not DjangoJobExecution.objects.filter(job_id=event.job_id).exists()
 
+    @pytest.fixture
+    def missed_runs(self, monkeypatch):
+        monkeypatch.setattr(DjangoResultStoreMixin, "_missed_runs", {})
+
+    @pytest.mark.django_db
+    def test_handle_submission_event_several_run_times_creates_job_executions(
+        self, missed_runs, jobstore, create_add_job, django_assert_max_num_queries
+    ):
+        job = create_add_job(
+            jobstore, dummy_job, datetime(2016, 5, 3), misfire_grace_time=None
+        )
+        now = timezone.now()
+        run_times = [now - timedelta(seconds=seconds) for seconds in (30, 20, 10)]
+        event = JobSubmissionEvent(
+            events.EVENT_JOB_SUBMITTED, job.id, jobstore, run_times
+        )
+
+        with django_assert_max_num_queries(3):
+            execution_id = jobstore.handle_submission_event(event)
+
+        assert DjangoJobExecution.objects.get(id=execution_id).run_time == run_times[0]
+        assert (
+            DjangoJobExecution.objects.filter(status=DjangoJobExecution.SENT).count()
+            == 3
+        )
+
+    @pytest.mark.django_db
+    def test_handle_error_event_collapses_missed_runs(
+        self, missed_runs, jobstore, create_add_job, django_assert_num_queries
+    ):
+        job = create_add_job(
+            jobstore, dummy_job, datetime(2016, 5, 3), misfire_grace_time=15
+        )
+        now = timezone.now()
+        run_times = [now - timedelta(seconds=seconds) for seconds in (40, 30, 10, 5)]
+        jobstore.handle_submission_event(
+            JobSubmissionEvent(
+                events.EVENT_JOB_SUBMITTED, job.id, jobstore, run_times[:3]
+            )
+        )
+
+        # Already logged when the run times were submitted
+        with django_assert_num_queries(0):
+            for run_time in run_times[:2]:
+                jobstore.handle_error_event(
+                    JobExecutionEvent(
+                        events.EVENT_JOB_MISSED, job.id, jobstore, run_time
+                    )
+                )
+        jobstore.handle_execution_event(
+            JobExecutionEvent(events.EVENT_JOB_EXECUTED, job.id, jobstore, run_times[2])
+        )
+        jobstore.handle_error_event(
+            JobExecutionEvent(events.EVENT_JOB_MISSED, job.id, jobstore, run_times[3])
+        )
+
+        assert list(
+            DjangoJobExecution.objects.order_by("run_time").values_list(
+                "status", "missed_runs", "last_missed_run_time"
+            )
+        ) == [
+            (DjangoJobExecution.MISSED, 2, run_times[1]),
+            (DjangoJobExecution.SUCCESS, None, None),
+            (DjangoJobExecution.MISSED, None, None),
+        ]
+
+    @pytest.mark.django_db
+    def test_handle_submission_event_received_late_skips_missed_runs(
+        self, missed_runs, jobstore, create_add_job
+    ):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        now = timezone.now()
+        run_times = [now - timedelta(seconds=seconds) for seconds in (30, 20, 10)]
+
+        for run_time in run_times[:2]:
+            jobstore.handle_error_event(
+                JobExecutionEvent(events.EVENT_JOB_MISSED, job.id, jobstore, run_time)
+            )
+        jobstore.handle_submission_event(
+            JobSubmissionEvent(events.EVENT_JOB_SUBMITTED, job.id, jobstore, run_times)
+        )
+
+        assert list(
+            DjangoJobExecution.objects.order_by("run_time").values_list(
+                "status", "missed_runs"
+            )
+        ) == [(DjangoJobExecution.MISSED, 2), (DjangoJobExecution.SENT, None)]
+
+    @pytest.mark.django_db
+    def test_handle_submission_event_logs_missed_runs_in_single_query(
+        self, missed_runs, jobstore, create_add_job, django_assert_max_num_queries
+    ):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        now = timezone.now()
+        run_times = [now - timedelta(minutes=minutes) for minutes in range(20, 0, -1)]
+
+        with django_assert_max_num_queries(5) as captured:
+            jobstore.handle_submission_event(
+                JobSubmissionEvent(
+                    events.EVENT_JOB_SUBMITTED, job.id, jobstore, run_times
+                )
+            )
+            for run_time in run_times:
+                jobstore.handle_error_event(
+                    JobExecutionEvent(
+                        events.EVENT_JOB_MISSED, job.id, jobstore, run_time
+                    )
+                )
+
+        writes = [
+            query["sql"].split()[0]
+            for query in captured.captured_queries
+            if not query["sql"].startswith(("SELECT", "SAVEPOINT", "RELEASE"))
+        ]
+        assert writes == ["DELETE", "INSERT"]
+        assert list(
+            DjangoJobExecution.objects.values_list(
+                "status", "missed_runs", "last_missed_run_time"
+            )
+        ) == [(DjangoJobExecution.MISSED, 20, run_times[-1])]
+
+    @pytest.mark.django_db
+    def test_remove_job_discards_missed_runs(
+        self, missed_runs, jobstore, create_add_job
+    ):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        jobstore.handle_error_event(
+            JobExecutionEvent(events.EVENT_JOB_MISSED, job.id, jobstore, timezone.now())
+        )
+        assert job.id in jobstore._missed_runs
+
+        jobstore.remove_job(job.id)
+
+        assert job.id not in jobstore._missed_runs
+
+    @pytest.mark.django_db
+    def test_remove_job_before_any_events_are_handled(
+        self, monkeypatch, jobstore, create_add_job
+    ):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        monkeypatch.setattr(DjangoResultStoreMixin, "lock", None)
+
+        jobstore.remove_job(job.id)
+        jobstore.remove_all_jobs()
+
+        assert not DjangoJob.objects.exists()
+
+    @pytest.fixture
+    def single_write(self, settings, monkeypatch):
+        settings.APSCHEDULER_SINGLE_WRITE_EXECUTIONS = True
+        monkeypatch.setattr(DjangoResultStoreMixin, "_running_executions", {})
+
+    @pytest.mark.django_db
+    def test_handle_submission_event_single_write_does_not_create_job_execution(
+        self, single_write, jobstore, create_add_job
+    ):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        run_time = timezone.now()
+        jobstore.handle_submission_event(
+            JobSubmissionEvent(events.EVENT_JOB_SUBMITTED, job.id, jobstore, [run_time])
+        )
+
+        assert not DjangoJobExecution.objects.exists()
+
+        jobstore.handle_execution_event(
+            JobExecutionEvent(events.EVENT_JOB_EXECUTED, job.id, jobstore, run_time)
+        )
+
+        execution = DjangoJobExecution.objects.get(job_id=job.id)
+        assert execution.status == DjangoJobExecution.SUCCESS
+        assert jobstore._running_executions == {}
+
+    @pytest.mark.django_db
+    def test_checkpoint_running_executions_writes_long_running_executions(
+        self, single_write, jobstore, create_add_job
+    ):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        run_time = timezone.now()
+        jobstore.handle_submission_event(
+            JobSubmissionEvent(events.EVENT_JOB_SUBMITTED, job.id, jobstore, [run_time])
+        )
+
+        assert jobstore.checkpoint_running_executions(3600) == 0
+        assert not DjangoJobExecution.objects.exists()
+
+        assert jobstore.checkpoint_running_executions() == 1
+        assert DjangoJobExecution.objects.get().status == DjangoJobExecution.SENT
+
+        jobstore.handle_error_event(
+            JobExecutionEvent(
+                events.EVENT_JOB_ERROR, job.id, jobstore, run_time, exception=None
+            )
+        )
+
+        execution = DjangoJobExecution.objects.get()
+        assert execution.status == DjangoJobExecution.ERROR
+        assert execution.duration is not None
+
+    @pytest.mark.django_db
+    def test_checkpoint_running_executions_after_execution_keeps_outcome(
+        self, single_write, jobstore, create_add_job
+    ):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        run_time = timezone.now()
+        # APScheduler does not guarantee the order in which events are received
+        jobstore.handle_execution_event(
+            JobExecutionEvent(events.EVENT_JOB_EXECUTED, job.id, jobstore, run_time)
+        )
+        jobstore.handle_submission_event(
+            JobSubmissionEvent(events.EVENT_JOB_SUBMITTED, job.id, jobstore, [run_time])
+        )
+
+        assert jobstore.checkpoint_running_executions() == 1
+        assert DjangoJobExecution.objects.get().status == DjangoJobExecution.SUCCESS
+
+    @pytest.fixture
+    def no_checkpoint_thread(self, monkeypatch):
+        monkeypatch.setattr(DjangoResultStoreMixin, "_checkpoint_stores", set())
+        monkeypatch.setattr(DjangoResultStoreMixin, "_checkpoint_thread", None)
+
+    def test_start_single_write_starts_checkpoint_thread(
+        self, single_write, no_checkpoint_thread, monkeypatch
+    ):
+        monkeypatch.setattr(
+            DjangoResultStoreMixin, "_checkpoint_periodically", mock.Mock()
+        )
+
+        DjangoMemoryJobStore().start(DummyScheduler(), "memory")
+        DjangoMemoryJobStore().start(DummyScheduler(), "other")
+
+        DjangoResultStoreMixin._checkpoint_thread.join()
+        assert DjangoResultStoreMixin._checkpoint_periodically.call_count == 1
+
+    def test_shutdown_stops_checkpoint_thread_after_last_job_store(
+        self, single_write, no_checkpoint_thread
+    ):
+        jobstores = [DjangoMemoryJobStore(), DjangoMemoryJobStore()]
+        for alias, jobstore in enumerate(jobstores):
+            jobstore.start(DummyScheduler(), str(alias))
+        thread = DjangoResultStoreMixin._checkpoint_thread
+        DjangoResultStoreMixin._running_executions[("test_job", 1)] = 0
+
+        jobstores[0].shutdown()
+        assert thread.is_alive()
+
+        jobstores[1].shutdown()
+        assert not thread.is_alive()
+        assert DjangoResultStoreMixin._checkpoint_thread is None
+        assert DjangoResultStoreMixin._running_executions == {}
+
+    @pytest.fixture
+    def checkpoints_disabled(self, settings):
+        settings.APSCHEDULER_EXECUTION_CHECKPOINT_INTERVAL = 0
+
+    @pytest.mark.django_db
+    def test_handle_submission_event_without_checkpoints_does_not_track_execution(
+        self,
+        single_write,
+        checkpoints_disabled,
+        no_checkpoint_thread,
+        jobstore,
+        create_add_job,
+    ):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+
+        jobstore.handle_submission_event(
+            JobSubmissionEvent(
+                events.EVENT_JOB_SUBMITTED, job.id, jobstore, [timezone.now()]
+            )
+        )
+
+        assert jobstore._running_executions == {}
+        assert not DjangoJobExecution.objects.exists()
+
     @pytest.mark.django_db
     def test_handle_execution_event_not_supported_raises_exception(self, jobstore):
         event = JobExecutionEvent(
@@ -146,6 +432,134 @@ class TestDjangoResultStoreMixin:
 
         assert not DjangoJobExecution.objects.filter(job_id=event.job_id).exists()
 
+    @pytest.mark.django_db
+    def test_handle_execution_event_flags_slow_runs(
+        self, jobstore, create_add_job, settings
+    ):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        settings.APSCHEDULER_SLOW_RUN_THRESHOLDS = {job.id: 1}
+
+        receiver = mock.MagicMock()
+        signals.job_execution_slow.connect(receiver)
+
+        try:
+            event = JobExecutionEvent(
+                events.EVENT_JOB_EXECUTED,
+                job.id,
+                jobstore,
+                timezone.now() - timedelta(seconds=5),
+            )
+            jobstore.handle_execution_event(event)
+        finally:
+            signals.job_execution_slow.disconnect(receiver)
+
+        ex = DjangoJobExecution.objects.get(job_id=event.job_id)
+
+        assert ex.slow
+        assert receiver.call_count == 1
+        assert receiver.call_args[1]["execution"] == ex
+        assert receiver.call_args[1]["threshold"] == 1
+
+    @pytest.mark.django_db
+    def test_handle_error_event_does_not_flag_fast_runs(
+        self, jobstore, create_add_job, settings
+    ):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        settings.APSCHEDULER_SLOW_RUN_THRESHOLDS = {job.id: 60}
+
+        event = JobExecutionEvent(
+            events.EVENT_JOB_ERROR, job.id, jobstore, timezone.now()
+        )
+        jobstore.handle_error_event(event)
+
+        assert not DjangoJobExecution.objects.get(job_id=event.job_id).slow
+
+    @pytest.mark.django_db
+    def test_get_slow_run_threshold_disabled_returns_none(self, jobstore):
+        assert jobstore.get_slow_run_threshold("test_job") is None
+
+    @pytest.mark.django_db
+    def test_get_slow_run_threshold_derives_threshold_from_history(
+        self, jobstore, create_add_job, settings, monkeypatch
+    ):
+        monkeypatch.setattr(DjangoResultStoreMixin, "_slow_run_thresholds", {})
+        settings.APSCHEDULER_SLOW_RUN_P95_MULTIPLIER = 2
+        settings.APSCHEDULER_SLOW_RUN_MIN_SAMPLES = 1
+
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        DjangoJobExecution.objects.create(
+            job_id=job.id,
+            status=DjangoJobExecution.SUCCESS,
+            run_time=timezone.now(),
+            duration=3,
+        )
+
+        assert jobstore.get_slow_run_threshold(job.id) == 6
+
+        # Derived thresholds are cached
+        DjangoJobExecution.objects.update(duration=10)
+        assert jobstore.get_slow_run_threshold(job.id) == 6
+
+    def test_get_slow_run_threshold_is_refreshed_by_one_thread_at_a_time(
+        self, settings, monkeypatch
+    ):
+        monkeypatch.setattr(DjangoResultStoreMixin, "_slow_run_thresholds", {})
+        settings.APSCHEDULER_SLOW_RUN_P95_MULTIPLIER = 2
+
+        refreshing = threading.Event()
+        refreshed = threading.Event()
+
+        def get_duration_percentile(*args, **kwargs):
+            refreshing.set()
+            assert refreshed.wait(5)
+            return 3
+
+        with mock.patch.object(
+            DjangoJobExecution.objects,
+            "get_duration_percentile",
+            side_effect=get_duration_percentile,
+        ) as percentile_mock:
+            thread = threading.Thread(
+                target=DjangoResultStoreMixin.get_slow_run_threshold,
+                args=("test_job",),
+            )
+            thread.start()
+            assert refreshing.wait(5)
+
+            # Uses the current threshold while another thread is refreshing it
+            assert DjangoResultStoreMixin.get_slow_run_threshold("test_job") is None
+
+            refreshed.set()
+            thread.join(5)
+
+        assert percentile_mock.call_count == 1
+        assert DjangoResultStoreMixin.get_slow_run_threshold("test_job") == 6
+
+    @pytest.mark.django_db
+    def test_start_schedules_retention_job_once(self, settings):
+        settings.APSCHEDULER_RETENTION_INTERVAL = 3600
+
+        scheduler = DummyScheduler()
+        scheduler.add_jobstore(DjangoJobStore(), "default")
+        scheduler.add_jobstore(DjangoMemoryJobStore(), "memory")
+        scheduler.start()
+
+        try:
+            jobs = [job for job in scheduler.get_jobs() if job.id == RETENTION_JOB_ID]
+
+            assert len(jobs) == 1
+            assert jobs[0].trigger.interval == timedelta(seconds=3600)
+        finally:
+            scheduler.remove_all_jobs()
+
+    @pytest.mark.django_db
+    def test_start_retention_interval_not_configured_does_not_schedule_job(
+        self, scheduler
+    ):
+        scheduler.start()
+
+        assert scheduler.get_job(RETENTION_JOB_ID) is None
+
     @pytest.mark.django_db
     def test_register_event_listeners_registers_listeners(self, jobstore):
         jobstore.register_event_listeners()
@@ -268,6 +682,194 @@ class TestDjangoJobStore:
 
             assert close_mock.call_count == 1
 
+    @pytest.mark.django_db
+    def test_remove_job_purges_execution_history(self, jobstore, create_add_job):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        DjangoJobExecution.objects.create(
+            job_id=job.id, run_time=timezone.now(), status=DjangoJobExecution.SUCCESS
+        )
+
+        jobstore.remove_job(job.id)
+
+        assert not DjangoJob.objects.exists()
+        assert not DjangoJob._base_manager.exists()
+        assert not DjangoJobExecution.objects.exists()
+
+    @pytest.mark.django_db
+    def test_remove_job_does_not_delete_job_inline(
+        self, jobstore, create_add_job, monkeypatch
+    ):
+        monkeypatch.setattr(DjangoJobStore, "_start_purge", mock.Mock())
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        DjangoJobExecution.objects.create(
+            job_id=job.id, run_time=timezone.now(), status=DjangoJobExecution.SUCCESS
+        )
+
+        jobstore.remove_job(job.id)
+
+        assert jobstore.lookup_job(job.id) is None
+        assert jobstore.get_all_jobs() == []
+        assert DjangoJob._base_manager.get(id=job.id).removed
+        assert DjangoJobExecution.objects.count() == 1
+        assert jobstore._start_purge.call_count == 1
+
+    @pytest.mark.django_db
+    def test_add_job_restores_removed_job(self, jobstore, create_add_job, monkeypatch):
+        monkeypatch.setattr(DjangoJobStore, "_start_purge", mock.Mock())
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        jobstore.remove_job(job.id)
+
+        create_add_job(jobstore, dummy_job, datetime(2016, 5, 4), id=job.id)
+
+        assert jobstore.lookup_job(job.id) is not None
+        assert DjangoJob._base_manager.count() == 1
+
+    @pytest.mark.django_db
+    def test_remove_all_jobs_purges_execution_history(self, jobstore, create_add_job):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        DjangoJobExecution.objects.create(
+            job_id=job.id, run_time=timezone.now(), status=DjangoJobExecution.SUCCESS
+        )
+
+        jobstore.remove_all_jobs()
+
+        assert not DjangoJob._base_manager.exists()
+        assert not DjangoJobExecution.objects.exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_remove_job_purges_execution_history_in_background_thread(
+        self, create_add_job
+    ):
+        store = DjangoJobStore()
+        store.start(DummyScheduler(), "djangojobstore")
+        job = create_add_job(store, dummy_job, datetime(2016, 5, 3))
+        DjangoJobExecution.objects.create(
+            job_id=job.id, run_time=timezone.now(), status=DjangoJobExecution.SUCCESS
+        )
+
+        purge_threads = []
+        purge_removed_jobs = DjangoJob.objects.purge_removed_jobs
+
+        def purge(**kwargs):
+            purge_threads.append(threading.current_thread())
+            return purge_removed_jobs(**kwargs)
+
+        with mock.patch.object(
+            DjangoJob.objects, "purge_removed_jobs", side_effect=purge
+        ):
+            store.remove_job(job.id)
+            purge_thread = store._purge_thread
+            if purge_thread is not None:
+                purge_thread.join(timeout=5)
+
+        assert purge_threads
+        assert threading.current_thread() not in purge_threads
+        assert store._purge_thread is None
+        assert not DjangoJob._base_manager.exists()
+        assert not DjangoJobExecution.objects.exists()
+
+    def test_purge_removed_jobs_repeats_while_pending(self):
+        store = DjangoJobStore()
+        store._purge_pending = True
+
+        def purge(**kwargs):
+            if purge_mock.call_count == 1:
+                # Another job is removed while the first purge is in progress
+                store._purge_pending = True
+
+        with mock.patch.object(
+            DjangoJob.objects, "purge_removed_jobs", side_effect=purge
+        ) as purge_mock:
+            with mock.patch.object(db.connection, "close") as close_mock:
+                store._purge_removed_jobs()
+
+        assert purge_mock.call_count == 2
+        assert close_mock.call_count == 1
+        assert store._purge_thread is None
+
+    @pytest.mark.django_db
+    def test_get_due_jobs_submits_requested_runs(self, scheduler, jobstore):
+        job = scheduler.add_job(dummy_job, trigger="interval", seconds=60)
+        scheduler.start()
+        next_run_time = DjangoJob.objects.get(id=job.id).next_run_time
+        DjangoJob.objects.filter(id=job.id).update(run_requested_at=timezone.now())
+
+        due_jobs = jobstore.get_due_jobs(datetime.now(scheduler.timezone))
+
+        assert due_jobs == []
+        assert DjangoJobExecution.objects.filter(
+            job_id=job.id, status=DjangoJobExecution.SUCCESS
+        ).exists()
+
+        django_job = DjangoJob.objects.get(id=job.id)
+        assert django_job.run_requested_at is None
+        assert django_job.next_run_time == next_run_time
+
+    @pytest.mark.django_db
+    def test_get_due_jobs_requested_run_max_instances_reached_logs_execution(
+        self, scheduler, jobstore
+    ):
+        job = scheduler.add_job(dummy_job, trigger="interval", seconds=60)
+        scheduler.start()
+        DjangoJob.objects.filter(id=job.id).update(run_requested_at=timezone.now())
+
+        with mock.patch.object(
+            scheduler._lookup_executor("default"),
+            "submit_job",
+            side_effect=MaxInstancesReachedError(job),
+        ):
+            jobstore.get_due_jobs(datetime.now(scheduler.timezone))
+
+        assert DjangoJobExecution.objects.filter(
+            job_id=job.id, status=DjangoJobExecution.MAX_INSTANCES
+        ).exists()
+        assert DjangoJob.objects.get(id=job.id).run_requested_at is None
+
+    @pytest.mark.django_db
+    def test_poll_run_requests_wakes_up_scheduler(self, jobstore):
+        DjangoJob.objects.create(id="test_job", run_requested_at=timezone.now())
+        jobstore._run_request_poll_interval = 1
+
+        with mock.patch.object(jobstore, "_scheduler") as scheduler_mock:
+            with mock.patch.object(
+                jobstore._run_request_poller_stopped, "wait", side_effect=[False, True]
+            ):
+                with mock.patch.object(db, "close_old_connections"):
+                    with mock.patch.object(db.connection, "close"):
+                        jobstore._poll_run_requests()
+
+        assert scheduler_mock.wakeup.call_count == 1
+        assert jobstore._run_requested.is_set()
+
+    @pytest.mark.django_db
+    def test_get_due_jobs_only_submits_requested_runs_after_poller_found_any(
+        self, jobstore
+    ):
+        jobstore._run_request_poll_interval = 1
+        now = timezone.now()
+
+        with mock.patch.object(jobstore, "_submit_requested_runs") as submit_mock:
+            jobstore.get_due_jobs(now)
+            jobstore.get_due_jobs(now)
+            jobstore._run_requested.set()
+            jobstore.get_due_jobs(now)
+
+        assert submit_mock.call_count == 2
+        assert not jobstore._run_requested.is_set()
+
+    @pytest.mark.django_db
+    def test_get_due_jobs_polling_disabled_always_submits_requested_runs(
+        self, jobstore
+    ):
+        jobstore._run_request_poll_interval = None
+        now = timezone.now()
+
+        with mock.patch.object(jobstore, "_submit_requested_runs") as submit_mock:
+            jobstore.get_due_jobs(now)
+            jobstore.get_due_jobs(now)
+
+        assert submit_mock.call_count == 2
+
     @pytest.mark.django_db(transaction=True)
     def test_get_jobs_does_retry_on_db_operational_error(self, jobstore):
         with mock.patch.object(db.connection, "close") as close_mock:
@@ -280,6 +882,353 @@ class TestDjangoJobStore:
 
             assert close_mock.call_count == 1
 
+    @pytest.mark.django_db
+    def test_update_job_next_run_time_only_does_not_rewrite_job_state(
+        self, jobstore, create_add_job
+    ):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        jobstore.update_job(job)
+        job_state = DjangoJob.objects.get(id=job.id).job_state
+
+        job.next_run_time += timedelta(days=1)
+        jobstore.update_job(job)
+
+        assert DjangoJob.objects.get(id=job.id).job_state == job_state
+        restored = jobstore.lookup_job(job.id)
+        assert restored.next_run_time == job.next_run_time
+        assert restored.next_run_time.tzinfo.zone == job.next_run_time.tzinfo.zone
+        assert jobstore.get_due_jobs(job.next_run_time)[0].next_run_time == (
+            job.next_run_time
+        )
+
+    @pytest.mark.django_db
+    def test_update_job_changed_job_state_rewrites_job_state(
+        self, jobstore, create_add_job
+    ):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        jobstore.update_job(job)
+        job_state = DjangoJob.objects.get(id=job.id).job_state
+
+        job.max_instances = 5
+        jobstore.update_job(job)
+
+        assert DjangoJob.objects.get(id=job.id).job_state != job_state
+        assert jobstore.lookup_job(job.id).max_instances == 5
+
+    @pytest.mark.django_db
+    def test_update_job_does_not_overwrite_run_requests(self, jobstore, create_add_job):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        DjangoJob.objects.filter(id=job.id).update(run_requested_at=timezone.now())
+
+        jobstore.update_job(job)
+
+        assert DjangoJob.objects.get(id=job.id).run_requested_at is not None
+
+
+class TestIndexedMemoryJobStore:
+    """
+    IndexedMemoryJobStore is verified against APScheduler's own MemoryJobStore, which it is meant to replace.
+    """
+
+    @pytest.fixture
+    def indexed_jobstore(self):
+        store = DjangoIndexedMemoryJobStore()
+        store.start(DummyScheduler(), "indexed")
+        yield store
+        store.shutdown()
+
+    def test_matches_memory_jobstore(self, indexed_jobstore, create_job, timezone):
+        # Apply the same random sequence of operations to both job stores, and compare the results
+        memory_jobstore = MemoryJobStore()
+        rng = random.Random(0)
+        start = timezone.localize(datetime(2016, 5, 3))
+
+        def create_random_job(job_id):
+            job = create_job(
+                func=dummy_job,
+                id=job_id,
+                trigger="date",
+                trigger_args={"run_date": start},
+            )
+            if rng.random() > 0.1:  # Some of the jobs are paused
+                job.next_run_time = start + timedelta(seconds=rng.randrange(100))
+            return job
+
+        for i in range(500):
+            job_id = f"job_{rng.randrange(50)}"
+            exists = memory_jobstore.lookup_job(job_id) is not None
+            operation = rng.choice(["add", "update", "remove"])
+
+            if operation == "add" and not exists:
+                job = create_random_job(job_id)
+                memory_jobstore.add_job(job)
+                indexed_jobstore.add_job(job)
+            elif operation == "update" and exists:
+                job = create_random_job(job_id)
+                memory_jobstore.update_job(job)
+                indexed_jobstore.update_job(job)
+            elif operation == "remove" and exists:
+                memory_jobstore.remove_job(job_id)
+                indexed_jobstore.remove_job(job_id)
+
+            now = start + timedelta(seconds=rng.randrange(100))
+            assert indexed_jobstore.get_due_jobs(now) == memory_jobstore.get_due_jobs(
+                now
+            )
+            assert (
+                indexed_jobstore.get_next_run_time()
+                == memory_jobstore.get_next_run_time()
+            )
+
+        assert indexed_jobstore.get_all_jobs() == memory_jobstore.get_all_jobs()
+
+    def test_removed_entries_are_compacted(self, indexed_jobstore, create_add_job):
+        jobs = [
+            create_add_job(indexed_jobstore, dummy_job, datetime(2016, 5, i + 1))
+            for i in range(10)
+        ]
+
+        for job in jobs[:6]:
+            indexed_jobstore.remove_job(job.id)
+
+        assert len(indexed_jobstore._heap) == 4
+        assert indexed_jobstore._removed_entries == 0
+        assert indexed_jobstore.get_all_jobs() == jobs[6:]
+
+    def test_pause_and_resume_job_does_not_compare_entries(
+        self, indexed_jobstore, create_add_job, timezone
+    ):
+        jobs = [
+            create_add_job(indexed_jobstore, dummy_job, datetime(2016, 5, 3, i))
+            for i in range(20)
+        ]
+
+        for job in jobs:
+            next_run_time = job.next_run_time
+            job._modify(next_run_time=None)
+            indexed_jobstore.update_job(job)
+            job._modify(next_run_time=next_run_time)
+            indexed_jobstore.update_job(job)
+
+        now = timezone.localize(datetime(2016, 5, 4))
+        assert indexed_jobstore.get_due_jobs(now) == jobs
+        assert indexed_jobstore.get_next_run_time() == jobs[0].next_run_time
+
+    def test_remove_and_add_job_same_run_time_does_not_compare_entries(
+        self, indexed_jobstore, create_add_job, timezone
+    ):
+        jobs = [
+            create_add_job(indexed_jobstore, dummy_job, datetime(2016, 5, 3, i))
+            for i in range(20)
+        ]
+
+        for i, job in enumerate(jobs):
+            indexed_jobstore.remove_job(job.id)
+            jobs[i] = create_add_job(
+                indexed_jobstore, dummy_job, datetime(2016, 5, 3, i), id=job.id
+            )
+
+        now = timezone.localize(datetime(2016, 5, 4))
+        assert indexed_jobstore.get_due_jobs(now) == jobs
+
+    def test_update_job_same_run_time_keeps_entry(
+        self, indexed_jobstore, create_add_job
+    ):
+        job = create_add_job(indexed_jobstore, dummy_job, datetime(2016, 5, 3))
+
+        indexed_jobstore.update_job(job)
+
+        assert len(indexed_jobstore._heap) == 1
+        assert indexed_jobstore._removed_entries == 0
+
+    def test_update_job_nonexistent_job_raises_exception(
+        self, indexed_jobstore, create_job
+    ):
+        with pytest.raises(JobLookupError):
+            indexed_jobstore.update_job(create_job(id="foo", func=dummy_job))
+
+    def test_add_job_conflicting_id_raises_exception(
+        self, indexed_jobstore, create_add_job
+    ):
+        job = create_add_job(indexed_jobstore, dummy_job, datetime(2016, 5, 3))
+
+        with pytest.raises(ConflictingIdError):
+            create_add_job(indexed_jobstore, dummy_job, datetime(2016, 5, 3), id=job.id)
+
+    def test_remove_nonexistent_job_raises_exception(self, indexed_jobstore):
+        with pytest.raises(JobLookupError):
+            indexed_jobstore.remove_job("foo")
+
+
+class TestDjangoWriteBehindJobStore:
+    """
+    We use the APScheduler tests to verify that DjangoWriteBehindJobStore implements the interface correctly.
+
+    This test class should only contain tests that are specific to DjangoWriteBehindJobStore
+
+    See 'test_apscheduler_jobstore.py' for details
+    """
+
+    @pytest.fixture
+    def write_behind_jobstore(self, synchronous_purge):
+        store = DjangoWriteBehindJobStore(flush_interval=None)
+        store.start(DummyScheduler(), "write_behind")
+        yield store
+        store.shutdown()
+
+    @pytest.mark.django_db
+    def test_start_loads_jobs_from_database(self, jobstore, create_add_job):
+        job1 = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        job2 = create_add_job(jobstore, dummy_job, datetime(2013, 8, 14))
+        paused = create_add_job(jobstore, dummy_job, datetime(2013, 7, 11), paused=True)
+
+        store = DjangoWriteBehindJobStore(flush_interval=None)
+        store.start(DummyScheduler(), "write_behind")
+
+        assert store.get_all_jobs() == [job2, job1, paused]
+        assert store.lookup_job(job1.id)._jobstore_alias == "write_behind"
+
+    @pytest.mark.django_db
+    def test_start_restores_next_run_time_that_was_updated_separately(
+        self, jobstore, create_add_job
+    ):
+        job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+        jobstore.update_job(job)
+        job.next_run_time += timedelta(days=1)
+        jobstore.update_job(job)
+
+        store = DjangoWriteBehindJobStore(flush_interval=None)
+        store.start(DummyScheduler(), "write_behind")
+
+        assert store.lookup_job(job.id).next_run_time == job.next_run_time
+
+    @pytest.mark.django_db
+    def test_start_removes_jobs_that_cannot_be_restored(self, synchronous_purge):
+        DjangoJob.objects.create(id="corrupt", job_state=b"not a pickle")
+
+        store = DjangoWriteBehindJobStore(flush_interval=None)
+        store.start(DummyScheduler(), "write_behind")
+
+        assert store.get_all_jobs() == []
+        assert store.flush() == 1
+        assert not DjangoJob._base_manager.filter(id="corrupt").exists()
+
+    @pytest.mark.django_db
+    def test_scheduling_does_not_query_database(
+        self, write_behind_jobstore, create_add_job, django_assert_num_queries
+    ):
+        job = create_add_job(write_behind_jobstore, dummy_job, datetime(2016, 5, 3))
+
+        with django_assert_num_queries(0):
+            assert write_behind_jobstore.get_due_jobs(timezone.now()) == [job]
+            assert write_behind_jobstore.get_next_run_time() == job.next_run_time
+            job._modify(next_run_time=job.next_run_time + timedelta(days=1))
+            write_behind_jobstore.update_job(job)
+
+    @pytest.mark.django_db
+    def test_add_job_writes_job_straight_away_so_that_executions_are_logged(
+        self, create_add_job
+    ):
+        store = DjangoWriteBehindJobStore(flush_interval=60)
+        with mock.patch.object(store, "_flush_periodically"):
+            store.start(DummyScheduler(), "write_behind")
+        job = create_add_job(store, dummy_job, datetime(2016, 5, 3))
+
+        store.handle_submission_event(
+            JobSubmissionEvent(
+                events.EVENT_JOB_SUBMITTED, job.id, "write_behind", [job.next_run_time]
+            )
+        )
+        store.shutdown()
+
+        assert DjangoJobExecution.objects.get().job_id == job.id
+
+    @pytest.mark.django_db
+    def test_flush_writes_latest_state_of_each_job(
+        self, write_behind_jobstore, create_add_job
+    ):
+        job = create_add_job(write_behind_jobstore, dummy_job, datetime(2016, 5, 3))
+        initial_next_run_time = job.next_run_time
+        for days in range(1, 3):
+            job._modify(next_run_time=initial_next_run_time + timedelta(days=days))
+            write_behind_jobstore.update_job(job)
+        next_run_time = job.next_run_time
+
+        assert DjangoJob.objects.get(
+            id=job.id
+        ).next_run_time == initial_next_run_time.replace(tzinfo=None)
+        assert write_behind_jobstore.flush() == 1
+        assert write_behind_jobstore.flush() == 0
+
+        db_job = DjangoJob.objects.get(id=job.id)
+        assert db_job.next_run_time == next_run_time.replace(tzinfo=None)
+
+    @pytest.mark.django_db
+    def test_flush_removes_jobs(self, write_behind_jobstore, create_add_job):
+        job = create_add_job(write_behind_jobstore, dummy_job, datetime(2016, 5, 3))
+        write_behind_jobstore.flush()
+        DjangoJobExecution.objects.create(
+            job_id=job.id, status=DjangoJobExecution.SUCCESS, run_time=timezone.now()
+        )
+
+        write_behind_jobstore.remove_job(job.id)
+        write_behind_jobstore.flush()
+
+        assert not DjangoJob._base_manager.exists()
+        assert not DjangoJobExecution.objects.exists()
+
+    @pytest.mark.django_db
+    def test_flush_remove_all_jobs_removes_jobs_that_are_not_in_memory(
+        self, write_behind_jobstore, create_add_job
+    ):
+        DjangoJob.objects.create(id="not_loaded", next_run_time=None)
+        job = create_add_job(write_behind_jobstore, dummy_job, datetime(2016, 5, 3))
+
+        write_behind_jobstore.remove_all_jobs()
+        write_behind_jobstore.flush()
+
+        assert not DjangoJob._base_manager.exists()
+        assert write_behind_jobstore.lookup_job(job.id) is None
+
+    @pytest.mark.django_db
+    def test_flush_error_retries_on_next_flush(
+        self, write_behind_jobstore, create_add_job
+    ):
+        with mock.patch.object(
+            write_behind_jobstore, "_write", side_effect=db.DatabaseError("Some error")
+        ):
+            job = create_add_job(write_behind_jobstore, dummy_job, datetime(2016, 5, 3))
+            assert write_behind_jobstore.flush() == 0
+
+        assert not DjangoJob.objects.exists()
+
+        assert write_behind_jobstore.flush() == 1
+        assert DjangoJob.objects.filter(id=job.id).exists()
+
+    @pytest.mark.django_db
+    def test_shutdown_flushes_without_removing_jobs(self, create_add_job):
+        store = DjangoWriteBehindJobStore(flush_interval=None)
+        store.start(DummyScheduler(), "write_behind")
+        job = create_add_job(store, dummy_job, datetime(2016, 5, 3))
+
+        store.shutdown()
+
+        assert store.get_all_jobs() == []
+        assert DjangoJob.objects.filter(id=job.id).exists()
+
+    @pytest.mark.django_db
+    def test_start_starts_flush_thread(self):
+        store = DjangoWriteBehindJobStore(flush_interval=60)
+
+        with mock.patch.object(store, "_flush_periodically"):
+            store.start(DummyScheduler(), "write_behind")
+            try:
+                assert store._flush_thread is not None
+            finally:
+                store.shutdown()
+
+        assert store._flush_thread is None
+
 
 @pytest.mark.django_db
 def test_register_events_raises_deprecation_warning(scheduler, jobstore):
@@ -309,3 +1258,124 @@ def test_register_job_raises_deprecation_warning(scheduler, jobstore):
         assert len(w) == 1
         assert issubclass(w[-1].category, DeprecationWarning)
         assert "deprecated" in str(w[-1].message)
+
+
+@pytest.mark.django_db
+def test_get_due_jobs_profiles_flagged_jobs(jobstore, create_add_job):
+    job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+    DjangoJob.objects.filter(id=job.id).update(profile_runs=2)
+
+    due_jobs = jobstore.get_due_jobs(timezone.now())
+
+    assert due_jobs[0].func is not dummy_job
+    assert due_jobs[0].func.__wrapped__ is dummy_job
+    # Only counted down once the profile of a run has been stored
+    assert DjangoJob.objects.get(id=job.id).profile_runs == 2
+
+
+@pytest.mark.django_db
+def test_get_due_jobs_does_not_profile_unflagged_jobs(jobstore, create_add_job):
+    job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+
+    due_jobs = jobstore.get_due_jobs(timezone.now())
+
+    assert due_jobs[0].func is dummy_job
+    assert DjangoJob.objects.get(id=job.id).profile_runs == 0
+
+
+@pytest.mark.django_db
+def test_get_due_jobs_applies_job_wrappers(jobstore, create_add_job):
+    def wrapper(func):
+        return mock.Mock(wraps=func, __wrapped__=func)
+
+    create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+    jobstore.job_wrappers = [wrapper]
+
+    due_jobs = jobstore.get_due_jobs(timezone.now())
+
+    assert due_jobs[0].func.__wrapped__ is dummy_job
+    assert jobstore.get_all_jobs()[0].func is dummy_job
+    assert jobstore.lookup_job(due_jobs[0].id).func is dummy_job
+
+
+@pytest.mark.django_db
+def test_get_all_jobs_does_not_profile_flagged_jobs(jobstore, create_add_job):
+    job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+    DjangoJob.objects.filter(id=job.id).update(profile_runs=2)
+
+    assert jobstore.get_all_jobs()[0].func is dummy_job
+    assert DjangoJob.objects.get(id=job.id).profile_runs == 2
+
+
+@pytest.mark.django_db
+def test_profiled_job_run_stores_profile(scheduler):
+    scheduler.add_job(
+        dummy_job,
+        trigger="interval",
+        minutes=1,
+        next_run_time=timezone.now(),
+        id="test_job",
+    )
+    scheduler.start()
+    DjangoJob.objects.filter(id="test_job").update(profile_runs=1)
+
+    scheduler._process_jobs()
+
+    execution = DjangoJobExecution.objects.get(job_id="test_job")
+    functions = [func for func, *_ in execution.profile.get_top_functions()]
+
+    assert any("dummy_job" in func for func in functions)
+    assert DjangoJob.objects.get(id="test_job").profile_runs == 0
+
+
+@pytest.mark.django_db
+def test_skipped_run_of_profiled_job_does_not_count_down_profile_runs(scheduler):
+    scheduler.add_job(
+        dummy_job,
+        trigger="interval",
+        minutes=1,
+        next_run_time=timezone.now(),
+        id="test_job",
+    )
+    scheduler.start()
+    DjangoJob.objects.filter(id="test_job").update(profile_runs=1)
+
+    with mock.patch.object(
+        scheduler._executors["default"],
+        "submit_job",
+        side_effect=MaxInstancesReachedError(scheduler.get_job("test_job")),
+    ):
+        scheduler._process_jobs()
+
+    assert DjangoJob.objects.get(id="test_job").profile_runs == 1
+    assert not DjangoJobExecution.objects.filter(profile__isnull=False).exists()
+
+
+@pytest.mark.django_db
+def test_jobstore_operations_are_instrumented(
+    jobstore, create_add_job, operation_stats
+):
+    create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+    jobstore.get_due_jobs(timezone.now())
+
+    stats = util.get_operation_stats()
+
+    assert stats["DjangoJobStore.add_job"]["calls"] == 1
+    # Tombstone check, run requests, and the due jobs themselves
+    assert stats["DjangoJobStore.get_due_jobs"]["queries"] == 3
+    assert stats["DjangoJobStore.get_due_jobs"]["unpickle_time"] > 0
+
+
+@pytest.mark.django_db
+def test_atomic_update_or_create_is_instrumented(
+    jobstore, create_add_job, operation_stats
+):
+    job = create_add_job(jobstore, dummy_job, datetime(2016, 5, 3))
+
+    DjangoJobExecution.atomic_update_or_create(
+        RLock(), job.id, timezone.now(), DjangoJobExecution.SENT
+    )
+
+    stats = util.get_operation_stats()["DjangoJobExecution.atomic_update_or_create"]
+    assert stats["calls"] == 1
+    assert stats["queries"] > 0
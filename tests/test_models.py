@@ -6,14 +6,25 @@ from unittest import mock
 import pytest
 from apscheduler import events
 from django import db
+from django.db.models import QuerySet
 from django.utils import timezone
 
-from django_apscheduler.models import DjangoJobExecution, DjangoJob
+from django_apscheduler.models import (
+    DjangoJobExecution,
+    DjangoJob,
+    DjangoJobExecutionProfile,
+    DjangoJobLease,
+    DjangoQueuedJobRun,
+)
 from tests import conftest
 
 logging.basicConfig()
 
 
+def job_with_args(*args, **kwargs):
+    pass
+
+
 class TestDjangoJob:
     @pytest.mark.django_db
     def test_str(self, request):
@@ -30,6 +41,55 @@ class TestDjangoJob:
         assert str(job) == "test_job (paused)"
 
 
+class TestDjangoJobManager:
+    @pytest.mark.django_db
+    def test_default_manager_excludes_removed_jobs(self):
+        DjangoJob.objects.create(id="test_job", removed=True)
+
+        assert not DjangoJob.objects.exists()
+        assert DjangoJob._base_manager.count() == 1
+
+    @pytest.mark.django_db
+    def test_purge_removed_jobs_deletes_executions_in_batches(self):
+        removed_job = DjangoJob.objects.create(id="removed_job", removed=True)
+        job = DjangoJob.objects.create(id="test_job")
+        now = timezone.now()
+
+        for job_ in [removed_job, job]:
+            for i in range(5):
+                DjangoJobExecution.objects.create(
+                    job=job_,
+                    status=DjangoJobExecution.SUCCESS,
+                    run_time=now - timedelta(seconds=i),
+                )
+
+        with mock.patch.object(
+            DjangoJobExecution.objects,
+            "delete_batch",
+            wraps=DjangoJobExecution.objects.delete_batch,
+        ) as delete_batch_mock:
+            assert DjangoJob.objects.purge_removed_jobs(batch_size=2) == 5
+
+        assert delete_batch_mock.call_count == 3
+        assert list(DjangoJob._base_manager.values_list("id", flat=True)) == [
+            "test_job"
+        ]
+        assert DjangoJobExecution.objects.filter(job=job).count() == 5
+
+    @pytest.mark.django_db
+    def test_purge_removed_jobs_deletes_leases(self):
+        DjangoJob.objects.create(id="removed_job", removed=True)
+        DjangoJob.objects.create(id="test_job")
+        for job_id in ["removed_job", "test_job"]:
+            DjangoJobLease.acquire(job_id, 1, timezone.now(), 60)
+
+        DjangoJob.objects.purge_removed_jobs()
+
+        assert list(DjangoJobLease.objects.values_list("job_id", flat=True)) == [
+            "test_job"
+        ]
+
+
 class TestDjangoJobExecutionManager:
     @pytest.mark.django_db
     def test_delete_old_job_executions_deletes_old_jobs(
@@ -65,6 +125,252 @@ class TestDjangoJobExecutionManager:
 
         assert DjangoJobExecution.objects.count() == 1
 
+    @pytest.mark.django_db
+    def test_delete_old_job_executions_deletes_in_batches(self, request):
+        now = timezone.now()
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        for i in range(1, 8):
+            DjangoJobExecution.objects.create(
+                job=job,
+                status=DjangoJobExecution.SUCCESS,
+                run_time=now - timedelta(minutes=i),
+            )
+
+        progress = []
+        deleted = DjangoJobExecution.objects.delete_old_job_executions(
+            90, batch_size=2, progress_callback=progress.append
+        )
+
+        assert deleted == 6
+        assert progress == [2, 4, 6]
+        assert DjangoJobExecution.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_delete_old_job_executions_deletes_related_objects(self, request):
+        now = timezone.now()
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        ex = DjangoJobExecution.objects.create(
+            job=job,
+            status=DjangoJobExecution.SUCCESS,
+            run_time=now - timedelta(minutes=1),
+        )
+        DjangoJobExecutionProfile.objects.create(execution=ex, stats=b"")
+
+        assert DjangoJobExecution.objects.delete_old_job_executions(0) == 1
+        assert not DjangoJobExecutionProfile.objects.exists()
+
+    @pytest.mark.django_db
+    def test_delete_old_job_executions_stops_when_max_runtime_exceeded(self, request):
+        now = timezone.now()
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        for i in range(1, 6):
+            DjangoJobExecution.objects.create(
+                job=job,
+                status=DjangoJobExecution.SUCCESS,
+                run_time=now - timedelta(minutes=i),
+            )
+
+        deleted = DjangoJobExecution.objects.delete_old_job_executions(
+            0, batch_size=2, max_runtime=0
+        )
+
+        assert deleted == 2
+        assert DjangoJobExecution.objects.count() == 3
+
+    @pytest.mark.django_db
+    def test_apply_retention_policies_max_age_per_status(self, request):
+        now = timezone.now()
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        for i, status in enumerate(
+            [DjangoJobExecution.SUCCESS, DjangoJobExecution.ERROR]
+        ):
+            DjangoJobExecution.objects.create(
+                job=job, status=status, run_time=now - timedelta(hours=2, seconds=i)
+            )
+
+        deleted = DjangoJobExecution.objects.apply_retention_policies(
+            default_policy={
+                "max_age": {
+                    DjangoJobExecution.SUCCESS: 3600,
+                    DjangoJobExecution.ERROR: 86400,
+                }
+            },
+            job_policies={},
+        )
+
+        assert deleted == 1
+        assert DjangoJobExecution.objects.get().status == DjangoJobExecution.ERROR
+
+    @pytest.mark.django_db
+    def test_apply_retention_policies_job_policy_overrides_default_policy(
+        self, request
+    ):
+        now = timezone.now()
+        for job_id in ["job_1", "job_2"]:
+            job = DjangoJob.objects.create(id=job_id, next_run_time=now)
+            request.addfinalizer(job.delete)
+
+            DjangoJobExecution.objects.create(
+                job=job,
+                status=DjangoJobExecution.SUCCESS,
+                run_time=now - timedelta(hours=2),
+            )
+
+        deleted = DjangoJobExecution.objects.apply_retention_policies(
+            default_policy={"max_age": 3600},
+            job_policies={"job_2": {"max_age": 86400}},
+        )
+
+        assert deleted == 1
+        assert DjangoJobExecution.objects.get().job_id == "job_2"
+
+    @pytest.mark.django_db
+    def test_apply_retention_policies_max_executions(self, request):
+        now = timezone.now()
+        for job_id in ["job_1", "job_2"]:
+            job = DjangoJob.objects.create(id=job_id, next_run_time=now)
+            request.addfinalizer(job.delete)
+
+            for i in range(5):
+                DjangoJobExecution.objects.create(
+                    job=job,
+                    status=DjangoJobExecution.SUCCESS,
+                    run_time=now - timedelta(minutes=i),
+                )
+
+        progress = []
+        deleted = DjangoJobExecution.objects.apply_retention_policies(
+            default_policy={"max_executions": 3},
+            job_policies={"job_2": {"max_executions": 1}},
+            progress_callback=progress.append,
+        )
+
+        assert deleted == 6
+        assert progress == [2, 6]
+        assert DjangoJobExecution.objects.filter(job_id="job_1").count() == 3
+        assert DjangoJobExecution.objects.get(job_id="job_2").run_time == now
+
+    @pytest.mark.django_db
+    def test_apply_retention_policies_defaults_to_settings(self, request, settings):
+        settings.APSCHEDULER_RETENTION_POLICY = {"max_executions": 1}
+
+        now = timezone.now()
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        for i in range(3):
+            DjangoJobExecution.objects.create(
+                job=job,
+                status=DjangoJobExecution.SUCCESS,
+                run_time=now - timedelta(minutes=i),
+            )
+
+        assert DjangoJobExecution.objects.apply_retention_policies() == 2
+
+    @pytest.mark.django_db
+    def test_get_querysets_to_purge_do_not_overlap(self, request):
+        now = timezone.now()
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        for i in range(5):
+            DjangoJobExecution.objects.create(
+                job=job,
+                status=DjangoJobExecution.SUCCESS,
+                run_time=now - timedelta(hours=i),
+            )
+
+        querysets = DjangoJobExecution.objects.get_querysets_to_purge(
+            default_policy={"max_age": 9000, "max_executions": 2}, job_policies={}
+        )
+        pks = [pk for qs in querysets for pk in qs.values_list("pk", flat=True)]
+
+        assert len(querysets) == 2
+        assert len(pks) == len(set(pks)) == 3
+
+    @pytest.mark.django_db
+    def test_get_duration_percentile(self, request):
+        now = timezone.now()
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        for i in range(1, 21):
+            DjangoJobExecution.objects.create(
+                job=job,
+                status=DjangoJobExecution.SUCCESS,
+                run_time=now - timedelta(minutes=i),
+                duration=i,
+            )
+
+        assert DjangoJobExecution.objects.get_duration_percentile(job.id, 95) == 19
+        assert DjangoJobExecution.objects.get_duration_percentile(job.id, 50) == 10
+
+    @pytest.mark.django_db
+    def test_get_duration_percentile_not_enough_samples_returns_none(self, request):
+        now = timezone.now()
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        DjangoJobExecution.objects.create(
+            job=job,
+            status=DjangoJobExecution.SUCCESS,
+            run_time=now,
+            duration=1,
+        )
+
+        assert (
+            DjangoJobExecution.objects.get_duration_percentile(job.id, min_samples=2)
+            is None
+        )
+
+    @pytest.mark.django_db
+    def test_get_time_series_aggregates_executions_per_bucket(self):
+        job = DjangoJob.objects.create(id="test_job")
+        start = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+        for minutes, status, duration in [
+            (1, DjangoJobExecution.SUCCESS, 1),
+            (2, DjangoJobExecution.SUCCESS, 3),
+            (3, DjangoJobExecution.ERROR, None),
+            (61, DjangoJobExecution.SUCCESS, 4),
+            (150, DjangoJobExecution.SUCCESS, 4),  # Outside of time range
+        ]:
+            DjangoJobExecution.objects.create(
+                job=job,
+                status=status,
+                run_time=start + timedelta(minutes=minutes),
+                duration=duration,
+            )
+
+        time_series = DjangoJobExecution.objects.get_time_series(
+            start, start + timedelta(hours=2), "hour"
+        )
+
+        assert list(time_series) == ["test_job"]
+        first, second = time_series["test_job"]
+        assert first["bucket"] == start
+        assert first["total"] == 3
+        assert first["statuses"][DjangoJobExecution.SUCCESS] == 2
+        assert first["statuses"][DjangoJobExecution.ERROR] == 1
+        assert first["statuses"][DjangoJobExecution.MISSED] == 0
+        assert first["avg_duration"] == 2
+        assert second["bucket"] == start + timedelta(hours=1)
+        assert second["total"] == 1
+
+    def test_get_time_series_unsupported_resolution_raises_exception(self):
+        with pytest.raises(ValueError, match="Unsupported resolution"):
+            DjangoJobExecution.objects.get_time_series(
+                timezone.now(), timezone.now(), "week"
+            )
+
 
 class TestDjangoJobExecution:
     @pytest.mark.django_db
@@ -142,6 +448,103 @@ class TestDjangoJobExecution:
         assert ex.duration is None
         assert ex.finished is None
 
+    @pytest.mark.django_db
+    def test_atomic_bulk_create_leaves_existing_job_executions_untouched(
+        self, request, jobstore
+    ):
+        now = timezone.now()
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        run_times = [now - timedelta(seconds=seconds) for seconds in (30, 20, 10)]
+        DjangoJobExecution.objects.create(
+            job_id=job.id, run_time=run_times[0], status=DjangoJobExecution.SUCCESS
+        )
+
+        DjangoJobExecution.atomic_bulk_create(
+            RLock(), job.id, run_times, DjangoJobExecution.SENT
+        )
+
+        assert list(
+            DjangoJobExecution.objects.order_by("run_time").values_list(
+                "status", "duration"
+            )
+        ) == [
+            (DjangoJobExecution.SUCCESS, None),
+            (DjangoJobExecution.SENT, None),
+            (DjangoJobExecution.SENT, None),
+        ]
+
+    @pytest.mark.django_db
+    def test_atomic_add_missed_runs_collapses_run_times(self, request, jobstore):
+        now = timezone.now()
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        ex = DjangoJobExecution.objects.create(
+            job_id=job.id,
+            run_time=now - timedelta(seconds=20),
+            status=DjangoJobExecution.MISSED,
+        )
+        DjangoJobExecution.objects.create(
+            job_id=job.id,
+            run_time=now - timedelta(seconds=10),
+            status=DjangoJobExecution.SENT,
+        )
+
+        assert DjangoJobExecution.atomic_add_missed_runs(
+            RLock(), ex.id, job.id, [now - timedelta(seconds=10)]
+        )
+        assert DjangoJobExecution.atomic_add_missed_runs(
+            RLock(), ex.id, job.id, [now - timedelta(seconds=5), now]
+        )
+
+        ex.refresh_from_db()
+        assert ex.missed_runs == 4
+        assert ex.last_missed_run_time == now
+        assert DjangoJobExecution.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_atomic_create_missed_runs_logs_single_job_execution(
+        self, request, jobstore
+    ):
+        now = timezone.now()
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+        run_times = [now - timedelta(seconds=seconds) for seconds in (30, 20, 10)]
+        DjangoJobExecution.objects.create(
+            job_id=job.id, run_time=run_times[0], status=DjangoJobExecution.SENT
+        )
+
+        ex = DjangoJobExecution.atomic_create_missed_runs(RLock(), job.id, run_times)
+
+        assert list(
+            DjangoJobExecution.objects.values_list(
+                "id", "status", "missed_runs", "last_missed_run_time"
+            )
+        ) == [(ex.id, DjangoJobExecution.MISSED, 3, run_times[-1])]
+
+    @pytest.mark.django_db
+    def test_atomic_add_missed_runs_execution_no_longer_exists_returns_false(
+        self, request, jobstore
+    ):
+        now = timezone.now()
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        assert not DjangoJobExecution.atomic_add_missed_runs(RLock(), 1, job.id, [now])
+
+    @pytest.mark.django_db
+    def test_claim_run_that_was_already_claimed_returns_false(self, request, jobstore):
+        now = timezone.now()
+        job = DjangoJob.objects.create(id="test_job", next_run_time=now)
+        request.addfinalizer(job.delete)
+
+        assert DjangoJobExecution.claim(job.id, now)
+        assert not DjangoJobExecution.claim(job.id, now)
+
+        assert DjangoJobExecution.objects.get().status == DjangoJobExecution.SENT
+
     @pytest.mark.django_db(transaction=True)
     def test_atomic_update_or_create_does_retry_on_db_operational_error(
             self, request, jobstore
@@ -189,3 +592,222 @@ class TestDjangoJobExecution:
         )
 
         assert str(ex) == f"{ex.id}: job '{job.id}' ({DjangoJobExecution.SUCCESS})"
+
+
+class TestDjangoJobLease:
+    @pytest.mark.django_db
+    def test_acquire_respects_max_instances(self):
+        now = timezone.now()
+
+        first = DjangoJobLease.acquire("test_job", 2, now, 60)
+        second = DjangoJobLease.acquire("test_job", 2, now, 60)
+
+        assert list(
+            DjangoJobLease.objects.order_by("slot").values_list("slot", "owner")
+        ) == [(0, first.owner), (1, second.owner)]
+        assert DjangoJobLease.acquire("test_job", 2, now, 60) is None
+        assert DjangoJobLease.acquire("other_job", 2, now, 60) is not None
+
+    @pytest.mark.django_db
+    def test_acquire_takes_over_expired_lease(self):
+        now = timezone.now()
+        expired = DjangoJobLease.acquire("test_job", 1, now, -1)
+
+        lease = DjangoJobLease.acquire("test_job", 1, now, 60)
+
+        assert lease.owner != expired.owner
+        db_lease = DjangoJobLease.objects.get()
+        assert (db_lease.owner, db_lease.expires_at) == (lease.owner, lease.expires_at)
+
+    @pytest.mark.django_db
+    def test_acquire_free_slot_uses_single_query(self, django_assert_num_queries):
+        now = timezone.now()
+        DjangoJobLease.acquire("test_job", 2, now, 60).release()
+
+        with django_assert_num_queries(1):
+            assert DjangoJobLease.acquire("test_job", 2, now, 60) is not None
+
+    @pytest.mark.django_db
+    def test_renew_extends_leases_that_have_not_expired(self):
+        now = timezone.now()
+        lease = DjangoJobLease.acquire("test_job", 1, now, 60)
+        expired = DjangoJobLease.acquire("expired_job", 1, now, -1)
+
+        assert DjangoJobLease.renew([lease, expired], 3600) == 1
+
+        assert DjangoJobLease.objects.get(owner=lease.owner).expires_at == (
+            lease.expires_at
+        )
+        assert not DjangoJobLease.is_held("expired_job", now)
+
+    @pytest.mark.django_db
+    def test_release_frees_slot(self):
+        now = timezone.now()
+        lease = DjangoJobLease.acquire("test_job", 1, now, 60)
+
+        lease.release()
+
+        assert DjangoJobLease.acquire("test_job", 1, now, 60) is not None
+
+    @pytest.mark.django_db
+    def test_release_lease_that_was_taken_over_does_nothing(self):
+        now = timezone.now()
+        expired = DjangoJobLease.acquire("test_job", 1, now, -1)
+        DjangoJobLease.acquire("test_job", 1, now, 60)
+
+        expired.release()
+
+        assert DjangoJobLease.is_held("test_job", now)
+
+    @pytest.mark.django_db
+    def test_is_held(self):
+        now = timezone.now()
+        DjangoJobLease.acquire("test_job", 1, now, 60)
+        DjangoJobLease.acquire("expired_job", 1, now, -1)
+
+        assert DjangoJobLease.is_held("test_job", now)
+        assert not DjangoJobLease.is_held("test_job", now - timedelta(seconds=1))
+        assert not DjangoJobLease.is_held("expired_job", now)
+
+
+class TestDjangoQueuedJobRunManager:
+    @pytest.fixture
+    def job(self, create_job):
+        job = create_job(
+            func=job_with_args,
+            trigger="date",
+            trigger_args={"run_date": timezone.now()},
+            id="test_job",
+            args=(1,),
+            kwargs={"a": 2},
+        )
+        job.misfire_grace_time = 10
+
+        return job
+
+    @pytest.mark.django_db
+    def test_enqueue_skips_runs_that_are_already_queued(self, job):
+        now = timezone.now()
+        earlier = now - timedelta(minutes=1)
+
+        DjangoQueuedJobRun.objects.enqueue(job, [now])
+        DjangoQueuedJobRun.objects.enqueue(job, [earlier, now])
+
+        assert DjangoQueuedJobRun.objects.count() == 2
+        run = DjangoQueuedJobRun.objects.get(run_time=now)
+        assert run.func_ref == "tests.test_models:job_with_args"
+        assert run.get_args() == ((1,), {"a": 2})
+        assert run.misfire_grace_time == 10
+
+    @pytest.mark.django_db
+    def test_claim_marks_oldest_runs_as_claimed(self, job):
+        now = timezone.now()
+        run_times = [now - timedelta(minutes=i) for i in range(3)]
+        DjangoQueuedJobRun.objects.enqueue(job, run_times)
+
+        claimed = DjangoQueuedJobRun.objects.claim(2, "worker")
+
+        assert [run.run_time for run in claimed] == run_times[:2]
+        assert all(run.claimed_by == "worker" for run in claimed)
+        assert DjangoQueuedJobRun.objects.count() == 3
+        claimed_by = DjangoQueuedJobRun.objects.values_list("run_time", "claimed_by")
+        assert dict(claimed_by) == {
+            run_times[0]: "worker",
+            run_times[1]: "worker",
+            run_times[2]: "",
+        }
+
+    @pytest.mark.django_db
+    def test_claim_skips_runs_claimed_by_other_worker(self, job):
+        now = timezone.now()
+        DjangoQueuedJobRun.objects.enqueue(job, [now - timedelta(minutes=1), now])
+        runs = list(DjangoQueuedJobRun.objects.order_by("id"))
+        update = QuerySet.update
+
+        def update_after_other_worker(queryset, **kwargs):
+            # Claimed by another worker after the runs were selected
+            update(
+                DjangoQueuedJobRun.objects.filter(id=runs[0].id, claimed_at=None),
+                claimed_at=now,
+                claimed_by="other",
+            )
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(
+            QuerySet, "update", autospec=True, side_effect=update_after_other_worker
+        ):
+            claimed = DjangoQueuedJobRun.objects.claim(2, "worker")
+
+        assert claimed == runs[1:]
+        assert dict(DjangoQueuedJobRun.objects.values_list("id", "claimed_by")) == {
+            runs[0].id: "other",
+            runs[1].id: "worker",
+        }
+
+    @pytest.mark.django_db
+    def test_claim_with_skip_locked_marks_selected_runs(self, job):
+        now = timezone.now()
+        DjangoQueuedJobRun.objects.enqueue(job, [now - timedelta(minutes=1), now])
+
+        with mock.patch.object(
+            db.connection.features, "has_select_for_update_skip_locked", True
+        ), mock.patch.object(
+            QuerySet,
+            "select_for_update",
+            autospec=True,
+            side_effect=QuerySet.select_for_update,
+        ) as select_for_update_mock:
+            claimed = DjangoQueuedJobRun.objects.claim(5, "worker")
+
+        select_for_update_mock.assert_called_once_with(mock.ANY, skip_locked=True)
+        assert [run.run_time for run in claimed] == [now - timedelta(minutes=1), now]
+        assert set(DjangoQueuedJobRun.objects.values_list("claimed_by", flat=True)) == {
+            "worker"
+        }
+
+    @pytest.mark.django_db
+    def test_renew_claims_only_renews_own_claims(self, job):
+        now = timezone.now()
+        DjangoQueuedJobRun.objects.enqueue(job, [now - timedelta(minutes=1), now])
+        runs = DjangoQueuedJobRun.objects.claim(2, "worker")
+        DjangoQueuedJobRun.objects.filter(id=runs[1].id).update(claimed_by="other")
+        DjangoQueuedJobRun.objects.update(claimed_at=now - timedelta(minutes=10))
+
+        assert DjangoQueuedJobRun.objects.renew_claims(runs, "worker") == 1
+
+        assert DjangoQueuedJobRun.objects.get(id=runs[0].id).claimed_at > now
+        assert DjangoQueuedJobRun.objects.get(
+            id=runs[1].id
+        ).claimed_at == now - timedelta(minutes=10)
+
+    @pytest.mark.django_db
+    def test_requeue_stale_releases_expired_claims(self, job):
+        now = timezone.now()
+        DjangoQueuedJobRun.objects.enqueue(job, [now - timedelta(minutes=1), now])
+        stale, fresh = DjangoQueuedJobRun.objects.claim(2, "worker")
+        DjangoQueuedJobRun.objects.filter(id=stale.id).update(
+            claimed_at=now - timedelta(minutes=10)
+        )
+
+        assert DjangoQueuedJobRun.objects.requeue_stale(60) == 1
+
+        assert DjangoQueuedJobRun.objects.claim(2, "other") == [stale]
+        assert DjangoQueuedJobRun.objects.get(id=fresh.id).claimed_by == "worker"
+
+    @pytest.mark.django_db
+    def test_complete_removes_run_from_queue(self, job):
+        DjangoQueuedJobRun.objects.enqueue(job, [timezone.now()])
+        (run,) = DjangoQueuedJobRun.objects.claim(1, "worker")
+
+        assert run.complete()
+        assert not DjangoQueuedJobRun.objects.exists()
+
+    @pytest.mark.django_db
+    def test_complete_keeps_run_that_was_claimed_by_other_worker(self, job):
+        DjangoQueuedJobRun.objects.enqueue(job, [timezone.now()])
+        (run,) = DjangoQueuedJobRun.objects.claim(1, "worker")
+        DjangoQueuedJobRun.objects.requeue_stale(-1)
+        DjangoQueuedJobRun.objects.claim(1, "other")
+
+        assert not run.complete()
+        assert DjangoQueuedJobRun.objects.get().claimed_by == "other"
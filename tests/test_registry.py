@@ -0,0 +1,223 @@
+from datetime import datetime
+
+import pytest
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from django_apscheduler.jobstores import DjangoJobStore
+from django_apscheduler.models import DjangoJob, DjangoJobExecution
+from django_apscheduler.registry import JobDefinition, JobRegistry
+from tests.conftest import dummy_job
+
+
+def other_dummy_job():
+    pass
+
+
+class Unrepresentable:
+    """An argument whose `repr` includes its memory address"""
+
+    def __eq__(self, other):
+        return isinstance(other, Unrepresentable)
+
+
+@pytest.fixture
+def scheduler(settings):
+    scheduler = BlockingScheduler(timezone=settings.TIME_ZONE)
+    scheduler.add_jobstore(DjangoJobStore(), "default")
+
+    return scheduler
+
+
+@pytest.fixture
+def registry():
+    registry = JobRegistry()
+    registry.register(dummy_job, "interval", minutes=5)
+    registry.register(other_dummy_job, "cron", id="other", hour=3, max_instances=2)
+
+    return registry
+
+
+class TestJobDefinition:
+    def test_splits_job_options_from_trigger_args(self):
+        definition = JobDefinition(dummy_job, "cron", hour=3, coalesce=False)
+
+        assert definition.id == "tests.conftest.dummy_job"
+        assert definition.options == {"coalesce": False}
+        assert definition.trigger_args == {"hour": 3}
+
+    def test_get_fingerprint_is_stable(self, scheduler):
+        fingerprint = JobDefinition(dummy_job, "cron", hour=3).get_fingerprint(
+            scheduler
+        )
+
+        assert (
+            JobDefinition(dummy_job, "cron", hour=3).get_fingerprint(scheduler)
+            == fingerprint
+        )
+        assert (
+            JobDefinition(dummy_job, "cron", hour=4).get_fingerprint(scheduler)
+            != fingerprint
+        )
+        assert (
+            JobDefinition(dummy_job, "cron", hour=3, max_instances=2).get_fingerprint(
+                scheduler
+            )
+            != fingerprint
+        )
+        assert (
+            JobDefinition(other_dummy_job, "cron", hour=3).get_fingerprint(scheduler)
+            != fingerprint
+        )
+
+    def test_get_fingerprint_trigger_instance_is_stable(self, scheduler):
+        def fingerprint(**kwargs):
+            trigger = IntervalTrigger(
+                minutes=5, start_date=datetime(2016, 5, 3), **kwargs
+            )
+            return JobDefinition(dummy_job, trigger).get_fingerprint(scheduler)
+
+        assert fingerprint() == fingerprint()
+        assert fingerprint(timezone="Asia/Tokyo") != fingerprint()
+        assert fingerprint(jitter=10) != fingerprint()
+        assert fingerprint(end_date=datetime(2017, 5, 3)) != fingerprint()
+
+    def test_get_fingerprint_cron_trigger_instance_is_stable(self, scheduler):
+        fingerprints = {
+            JobDefinition(dummy_job, CronTrigger(hour=hour)).get_fingerprint(scheduler)
+            for hour in (3, 3, 4)
+        }
+
+        assert len(fingerprints) == 2
+
+    def test_get_fingerprint_does_not_depend_on_memory_addresses(self, scheduler):
+        fingerprints = {
+            JobDefinition(
+                dummy_job, "cron", hour=3, args=(Unrepresentable(),)
+            ).get_fingerprint(scheduler)
+            for _ in range(2)
+        }
+
+        assert len(fingerprints) == 1
+
+    def test_create_job_applies_scheduler_defaults(self, scheduler):
+        job = JobDefinition(dummy_job, "interval", minutes=5).create_job(
+            scheduler, "default"
+        )
+
+        assert job.id == "tests.conftest.dummy_job"
+        assert job.name == job.id
+        assert job.max_instances == 1
+        assert job.next_run_time is not None
+
+
+class TestJobRegistry:
+    def test_scheduled_job_registers_definition(self):
+        registry = JobRegistry()
+
+        @registry.scheduled_job("interval", id="decorated", seconds=10)
+        def decorated():
+            pass
+
+        assert [definition.id for definition in registry.definitions] == ["decorated"]
+
+    def test_load_settings_registers_definitions(self, settings):
+        settings.APSCHEDULER_JOBS = {
+            "from_settings": {
+                "func": "tests.conftest.dummy_job",
+                "trigger": "cron",
+                "hour": 3,
+            }
+        }
+        registry = JobRegistry()
+
+        registry.load_settings()
+
+        (definition,) = registry.definitions
+        assert definition.id == "from_settings"
+        assert definition.func is dummy_job
+        assert definition.trigger_args == {"hour": 3}
+
+    @pytest.mark.django_db
+    def test_reconcile_creates_jobs(self, scheduler, registry):
+        result = registry.reconcile(scheduler)
+
+        assert result == {
+            "created": ["tests.conftest.dummy_job", "other"],
+            "updated": [],
+            "unchanged": [],
+            "removed": [],
+        }
+        jobs = {job.id: job for job in scheduler._jobstores["default"].get_all_jobs()}
+        assert jobs["other"].max_instances == 2
+        assert DjangoJob.objects.filter(fingerprint__isnull=False).count() == 2
+
+    @pytest.mark.django_db
+    def test_reconcile_unchanged_jobs_only_queries_fingerprints(
+        self, scheduler, registry, django_assert_num_queries
+    ):
+        registry.reconcile(scheduler)
+
+        with django_assert_num_queries(1):
+            result = registry.reconcile(scheduler)
+
+        assert result["unchanged"] == ["tests.conftest.dummy_job", "other"]
+
+    @pytest.mark.django_db
+    def test_reconcile_updates_changed_jobs(self, scheduler, registry):
+        registry.reconcile(scheduler)
+        job_state = DjangoJob.objects.get(id="tests.conftest.dummy_job").job_state
+
+        registry.register(other_dummy_job, "cron", id="other", hour=4)
+        result = registry.reconcile(scheduler)
+
+        assert result["updated"] == ["other"]
+        assert result["unchanged"] == ["tests.conftest.dummy_job"]
+        assert (
+            DjangoJob.objects.get(id="tests.conftest.dummy_job").job_state == job_state
+        )
+        job = scheduler._jobstores["default"].lookup_job("other")
+        assert str(job.trigger.fields[5]) == "4"  # hour
+
+    @pytest.mark.django_db
+    def test_reconcile_replaces_jobs_that_were_added_directly(
+        self, scheduler, registry
+    ):
+        DjangoJob.objects.create(id="other", next_run_time=None, job_state=b"")
+
+        result = registry.reconcile(scheduler)
+
+        assert result["updated"] == ["other"]
+        assert DjangoJob.objects.get(id="other").fingerprint is not None
+
+    @pytest.mark.django_db
+    def test_reconcile_revives_removed_jobs(self, scheduler, registry):
+        registry.reconcile(scheduler)
+        DjangoJob.objects.filter(id="other").update(removed=True, next_run_time=None)
+
+        result = registry.reconcile(scheduler)
+
+        assert result["updated"] == ["other"]
+        assert DjangoJob.objects.filter(id="other").exists()
+
+    @pytest.mark.django_db
+    def test_reconcile_prune_removes_stale_registered_jobs(self, scheduler, registry):
+        registry.reconcile(scheduler)
+        DjangoJob.objects.create(id="added_directly", next_run_time=None)
+        DjangoJobExecution.objects.create(
+            job_id="other", status=DjangoJobExecution.SUCCESS, run_time="2016-05-03"
+        )
+
+        registry._definitions.pop("other")
+        assert registry.reconcile(scheduler)["removed"] == []
+
+        result = registry.reconcile(scheduler, prune=True)
+
+        assert result["removed"] == ["other"]
+        assert set(DjangoJob.objects.values_list("id", flat=True)) == {
+            "tests.conftest.dummy_job",
+            "added_directly",
+        }
+        # Purging the executions of removed jobs is left to the job store
+        assert DjangoJobExecution.objects.filter(job_id="other").exists()
@@ -8,6 +8,7 @@ from django import db
 from django.utils import timezone
 
 from django_apscheduler import util
+from django_apscheduler.models import DjangoJobExecution, DjangoJob
 
 
 def test_get_dt_format_default():
@@ -39,6 +40,17 @@ def test_get_local_dt_format_aware(use_tz):
     assert localized_dt_hour == local_dt_hour
 
 
+def test_get_local_dt_format_uses_resolved_format(use_hour_format):
+    dt = datetime.utcnow()
+    dt_format = util.get_dt_format()
+
+    with mock.patch("django_apscheduler.util.formats.get_format") as get_format_mock:
+        localized_dt_hour = util.get_local_dt_format(dt, dt_format)
+
+    assert localized_dt_hour == dt.strftime("%H")
+    assert get_format_mock.call_count == 0
+
+
 def test_get_django_internal_datetime_makes_naive_if_django_timzone_support_disabled(
     settings,
 ):
@@ -172,3 +184,173 @@ def test_close_old_connections_even_if_exception_is_raised():
             job_mock()
 
     assert close_old_connections_mock.call_count == 2
+
+
+@util.record_resource_usage
+def resource_usage_job():
+    return list(DjangoJob.objects.all())
+
+
+@util.record_resource_usage(trace_memory=True)
+def traced_resource_usage_job():
+    return [0] * 100_000
+
+
+def test_initialize_worker_process_discards_inherited_connections():
+    initializer = mock.Mock()
+    connection = mock.Mock()
+
+    with mock.patch.object(
+        db.connections, "all", return_value=[connection]
+    ), mock.patch.object(util.django, "setup") as setup_mock:
+        util.initialize_worker_process("tests.settings", initializer, (1,))
+
+    setup_mock.assert_called_once_with()
+    assert connection.connection is None
+    connection.close.assert_not_called()
+    initializer.assert_called_once_with(1)
+
+
+def test_get_current_job_run_outside_of_job_returns_none():
+    assert util.get_current_job_run() is None
+
+
+def test_pop_job_run_data_returns_collected_data():
+    run_time = timezone.now()
+    util.update_job_run_data(("test_job", run_time), foo=1)
+    util.update_job_run_data(("test_job", run_time), bar=2)
+
+    assert util.pop_job_run_data("test_job", run_time) == {"foo": 1, "bar": 2}
+    assert util.pop_job_run_data("test_job", run_time) == {}
+
+
+def test_update_job_run_data_discards_oldest_entries(monkeypatch):
+    monkeypatch.setattr(util, "_JOB_RUN_DATA_MAX_ENTRIES", 2)
+    run_time = timezone.now()
+
+    for job_id in ["first", "second", "third"]:
+        util.update_job_run_data((job_id, run_time), foo=1)
+
+    assert util.pop_job_run_data("first", run_time) == {}
+    assert util.pop_job_run_data("third", run_time) == {"foo": 1}
+    util.pop_job_run_data("second", run_time)
+
+
+@pytest.mark.django_db
+def test_query_counter_counts_queries():
+    with util.QueryCounter() as counter:
+        list(DjangoJob.objects.all())
+        DjangoJob.objects.exists()
+
+    assert counter.count == 2
+    assert counter.duration > 0
+
+
+def test_resource_usage_measures_cpu_time():
+    with util.ResourceUsage(trace_memory=True) as usage:
+        sum(i * i for i in range(100_000))
+
+    results = usage.as_dict()
+
+    assert results["cpu_user_time"] > 0
+    assert results["memory_traced_peak"] is not None
+    assert results["db_query_count"] == 0
+
+
+@pytest.mark.django_db
+def test_record_resource_usage_outside_of_job_does_not_record_anything():
+    assert resource_usage_job() == []
+    assert not util._job_run_data
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("job", [resource_usage_job, traced_resource_usage_job])
+def test_record_resource_usage_stores_results_on_job_execution(scheduler, job):
+    scheduler.add_job(
+        job,
+        trigger="interval",
+        minutes=1,
+        next_run_time=timezone.now(),
+        id="test_job",
+    )
+    scheduler.start()
+    scheduler._process_jobs()
+
+    execution = DjangoJobExecution.objects.get(job_id="test_job")
+
+    assert execution.status == DjangoJobExecution.SUCCESS
+    assert execution.cpu_user_time is not None
+    assert execution.db_query_count is not None
+    assert (execution.memory_traced_peak is not None) == (
+        job is traced_resource_usage_job
+    )
+
+
+@util.instrumented
+@util.retry_on_db_operational_error
+def instrumented_db_op(fail_first: bool = False):
+    if fail_first and not getattr(instrumented_db_op, "failed", False):
+        instrumented_db_op.failed = True
+        raise db.OperationalError("Some DB-related error")
+
+    util.record_unpickle_time(0.5)
+    return DjangoJob.objects.count()
+
+
+@pytest.mark.django_db
+def test_instrumented_records_operation_stats(operation_stats):
+    instrumented_db_op()
+    instrumented_db_op()
+
+    stats = util.get_operation_stats()["instrumented_db_op"]
+
+    assert stats["calls"] == 2
+    assert stats["queries"] == 2
+    assert stats["total_time"] >= stats["max_time"] > 0
+    assert stats["mean_time"] == stats["total_time"] / 2
+    assert stats["unpickle_time"] == 1.0
+    assert stats["retries"] == 0
+
+
+@pytest.mark.django_db
+def test_instrumented_counts_retries(operation_stats):
+    with mock.patch.object(db.connection, "close"):
+        instrumented_db_op(fail_first=True)
+
+    assert util.get_operation_stats()["instrumented_db_op"]["retries"] == 1
+
+
+@pytest.mark.django_db
+def test_instrumented_disabled_does_not_record_anything(settings):
+    settings.APSCHEDULER_INSTRUMENTATION = False
+    util.reset_operation_stats()
+
+    instrumented_db_op()
+
+    assert util.get_operation_stats() == {}
+
+
+@pytest.mark.django_db
+def test_instrumented_logs_slow_operations(operation_stats, settings, caplog):
+    settings.APSCHEDULER_SLOW_OPERATION_THRESHOLD = 0
+
+    instrumented_db_op()
+
+    assert "Operation 'instrumented_db_op' took" in caplog.text
+    assert "(1 queries, 0 retries)" in caplog.text
+
+
+@pytest.mark.django_db
+def test_reset_operation_stats(operation_stats):
+    instrumented_db_op()
+    assert "instrumented_db_op" in util.get_operation_stats()
+
+    util.reset_operation_stats()
+    assert util.get_operation_stats() == {}
+
+
+def test_record_operation_retry_outside_of_operation_is_ignored(operation_stats):
+    util.record_operation_retry()
+    util.record_unpickle_time(1.0)
+
+    assert util.get_operation_stats() == {}
@@ -0,0 +1,174 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from apscheduler import events
+from django.utils import timezone
+
+from django_apscheduler import util
+from django_apscheduler.jobstores import DjangoResultStoreMixin
+from django_apscheduler.models import DjangoJobExecution, DjangoQueuedJobRun
+from django_apscheduler.workers import QueueWorker
+
+calls = []
+
+
+def queued_job(*args, **kwargs):
+    calls.append((args, kwargs, util.get_current_job_run()))
+
+
+def failing_job():
+    raise RuntimeError("Job failed")
+
+
+@pytest.fixture(autouse=True)
+def result_store_lock(monkeypatch):
+    monkeypatch.setattr(DjangoResultStoreMixin, "lock", threading.RLock())
+    calls.clear()
+
+
+@pytest.fixture
+def queue_run(jobstore, create_add_job):
+    def queue(func, run_times=None, misfire_grace_time=None, **kwargs):
+        job = create_add_job(
+            jobstore,
+            func,
+            id=func.__name__,
+            misfire_grace_time=misfire_grace_time,
+            **kwargs
+        )
+        run_times = run_times or [timezone.now()]
+        # Logged by the scheduler when the runs are submitted to the executor
+        DjangoJobExecution.atomic_bulk_create(
+            DjangoResultStoreMixin.lock, job.id, run_times, DjangoJobExecution.SENT
+        )
+        DjangoQueuedJobRun.objects.enqueue(job, run_times)
+
+        return list(DjangoQueuedJobRun.objects.filter(job_id=job.id).order_by("id"))
+
+    return queue
+
+
+class TestQueueWorker:
+    @pytest.mark.django_db
+    def test_run_queued_job_logs_execution(self, queue_run):
+        (queued_run,) = queue_run(queued_job, args=(1,), kwargs={"a": 2})
+
+        (event,) = QueueWorker().run_queued_job(queued_run)
+
+        assert event.code == events.EVENT_JOB_EXECUTED
+        assert calls == [((1,), {"a": 2}, ("queued_job", event.scheduled_run_time))]
+        execution = DjangoJobExecution.objects.get()
+        assert execution.status == DjangoJobExecution.SUCCESS
+        assert execution.run_time == queued_run.run_time
+
+    @pytest.mark.django_db
+    def test_run_queued_job_applies_job_wrappers(self, queue_run):
+        (queued_run,) = queue_run(queued_job)
+
+        def wrapper(func):
+            def wrapped(*args, **kwargs):
+                return func("wrapped", *args, **kwargs)
+
+            return wrapped
+
+        QueueWorker(job_wrappers=[wrapper]).run_queued_job(queued_run)
+
+        assert calls[0][0] == ("wrapped",)
+
+    @pytest.mark.django_db
+    def test_run_queued_job_error_logs_exception(self, queue_run):
+        (queued_run,) = queue_run(failing_job)
+
+        (event,) = QueueWorker().run_queued_job(queued_run)
+
+        assert event.code == events.EVENT_JOB_ERROR
+        execution = DjangoJobExecution.objects.get()
+        assert execution.status == DjangoJobExecution.ERROR
+        assert "Job failed" in execution.exception
+
+    @pytest.mark.django_db
+    def test_run_queued_job_missed_logs_missed_run(self, queue_run):
+        (queued_run,) = queue_run(
+            queued_job,
+            run_times=[timezone.now() - timedelta(minutes=1)],
+            misfire_grace_time=1,
+        )
+
+        (event,) = QueueWorker().run_queued_job(queued_run)
+
+        assert event.code == events.EVENT_JOB_MISSED
+        assert calls == []
+        assert DjangoJobExecution.objects.get().status == DjangoJobExecution.MISSED
+
+    @pytest.mark.django_db
+    def test_run_queued_job_function_that_cannot_be_imported_logs_error(
+        self, queue_run
+    ):
+        (queued_run,) = queue_run(queued_job)
+        queued_run.func_ref = "tests.test_workers:does_not_exist"
+
+        (event,) = QueueWorker().run_queued_job(queued_run)
+
+        assert event.code == events.EVENT_JOB_ERROR
+        assert DjangoJobExecution.objects.get().status == DjangoJobExecution.ERROR
+
+    @pytest.mark.django_db(transaction=True)
+    def test_run_burst_processes_all_queued_runs(self, queue_run):
+        now = timezone.now()
+        queue_run(queued_job, run_times=[now - timedelta(seconds=i) for i in range(3)])
+
+        # A single worker thread, as the in-memory SQLite test database cannot claim and complete runs concurrently
+        assert QueueWorker(max_workers=1, poll_interval=0.1).run(burst=True) == 3
+
+        assert len(calls) == 3
+        assert not DjangoQueuedJobRun.objects.exists()
+        assert set(DjangoJobExecution.objects.values_list("status", flat=True)) == {
+            DjangoJobExecution.SUCCESS
+        }
+
+    @pytest.mark.django_db
+    def test_run_queued_job_that_was_requeued_is_not_removed_from_queue(
+        self, queue_run
+    ):
+        queue_run(queued_job)
+        (queued_run,) = DjangoQueuedJobRun.objects.claim(1, "worker")
+        DjangoQueuedJobRun.objects.requeue_stale(-1)
+
+        QueueWorker().run_queued_job(queued_run)
+
+        assert DjangoQueuedJobRun.objects.get().claimed_at is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_run_requeues_runs_of_worker_that_went_away(self, queue_run):
+        queue_run(queued_job)
+        DjangoQueuedJobRun.objects.update(
+            claimed_at=timezone.now() - timedelta(minutes=10), claimed_by="dead-worker"
+        )
+
+        assert QueueWorker(claim_timeout=60).run(burst=True) == 1
+
+        assert len(calls) == 1
+        assert not DjangoQueuedJobRun.objects.exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_maintain_claims_renews_claims_of_running_runs(self, queue_run):
+        queue_run(queued_job)
+        worker = QueueWorker(claim_timeout=60)
+        (queued_run,) = DjangoQueuedJobRun.objects.claim(1, worker.worker_id)
+        worker._running[queued_run.id] = queued_run
+        DjangoQueuedJobRun.objects.update(
+            claimed_at=timezone.now() - timedelta(seconds=50)
+        )
+
+        worker.maintain_claims()
+
+        claimed_at = DjangoQueuedJobRun.objects.get().claimed_at
+        assert claimed_at > timezone.now() - timedelta(seconds=10)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stop_stops_polling(self):
+        worker = QueueWorker(poll_interval=0.1)
+        threading.Timer(0.2, worker.stop).start()
+
+        assert worker.run() == 0